@@ -0,0 +1,304 @@
+"""
+Admission Control and Overload Mode
+
+Three layers keep one client or one busy classroom from saturating the node:
+
+1. Rate limits: a token bucket per socket and event type. Events over the
+   limit are dropped (callback events get {'error': 'rate_limited'}) and the
+   client is told once per second with `rate_limited {event, retryAfter}`.
+   Editor-state events (LATEST_WINS) are not lost: the newest one over the
+   limit is held and applied once the bucket refills. A limited run_code
+   gets a code_done carrying the error, so the client's run finishes.
+   Limits are "rate:burst" per event in RATE_LIMITS, e.g.
+   RATE_LIMITS="code_change=20:40,run_code=1:3"; anything not listed uses
+   RATE_LIMIT_DEFAULT.
+
+2. Caps: MAX_ROOMS per node and MAX_STUDENTS_PER_ROOM, checked by
+   handle_join_room via check_join().
+
+3. Overload mode: a monitor samples event-loop lag and process CPU every
+   OVERLOAD_SAMPLE_SECONDS. Above OVERLOAD_LAG_MS or OVERLOAD_CPU the server
+   enters overload mode, and leaves it once both have stayed under half the
+   threshold for OVERLOAD_RECOVER_SECONDS. While overloaded, rate limits
+   are scaled by OVERLOAD_RATE_FACTOR, code_update to teachers is sent at
+   most every OVERLOAD_CODE_UPDATE_INTERVAL per student (latest code wins),
+   and background analysis/similarity work is skipped. Every client gets
+   `server_load {overloaded, reason}` on each transition.
+"""
+
+import os
+import time
+import asyncio
+
+from app.outbound.outbound import send
+
+
+def _parse_limit(text):
+    rate, _, burst = text.partition(':')
+    return float(rate), float(burst or rate)
+
+
+def _parse_limits(text):
+    limits = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        event, _, limit = item.partition('=')
+        limits[event.strip()] = _parse_limit(limit)
+    return limits
+
+
+# {event: (tokens per second, burst)}
+RATE_LIMITS = {
+    'code_change': (20, 40),
+    'teacher_code_change': (20, 40),
+    'run_code': (1, 3),
+    'run_all': (0.1, 1),
+    'code_input': (20, 40),
+    'join_room': (1, 5),
+    'validate_room': (2, 10),
+}
+RATE_LIMITS.update(_parse_limits(os.environ.get('RATE_LIMITS', '')))
+RATE_LIMIT_DEFAULT = _parse_limit(os.environ.get('RATE_LIMIT_DEFAULT', '50:100'))
+
+MAX_ROOMS = int(os.environ.get('MAX_ROOMS', 200))
+MAX_STUDENTS_PER_ROOM = int(os.environ.get('MAX_STUDENTS_PER_ROOM', 150))
+
+OVERLOAD_SAMPLE_SECONDS = float(os.environ.get('OVERLOAD_SAMPLE_SECONDS', 0.5))
+OVERLOAD_LAG_MS = float(os.environ.get('OVERLOAD_LAG_MS', 100))
+OVERLOAD_CPU = float(os.environ.get('OVERLOAD_CPU', 0.9))
+OVERLOAD_RECOVER_SECONDS = float(os.environ.get('OVERLOAD_RECOVER_SECONDS', 5))
+OVERLOAD_RATE_FACTOR = float(os.environ.get('OVERLOAD_RATE_FACTOR', 0.5))
+OVERLOAD_CODE_UPDATE_INTERVAL = float(os.environ.get('OVERLOAD_CODE_UPDATE_INTERVAL', 1.0))
+
+# Events never rate limited (connection lifecycle)
+_EXEMPT = {'connect', 'disconnect'}
+
+# Events carrying the full editor state: only the newest one matters, so the
+# newest one over the limit is held and applied when a token is available
+LATEST_WINS = {'code_change', 'teacher_code_change'}
+
+
+class TokenBucket:
+    """Classic token bucket; refill is computed lazily on each take()."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def take(self, factor=1.0):
+        """Take one token. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        rate = self.rate * factor
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / rate if rate > 0 else 60.0
+
+
+# {sid: {event: TokenBucket}}
+_buckets = {}
+
+# {(sid, event): monotonic time the client was last told it is limited}
+_notified = {}
+
+# {(sid, event): args of the newest held LATEST_WINS event}
+_held = {}
+# {(sid, event): task applying _held[(sid, event)] once the bucket refills}
+_held_tasks = {}
+
+state = {
+    'overloaded': False,
+    'reason': None,
+    'lagMs': 0.0,
+    'cpu': 0.0,
+    'since': None,
+    'transitions': 0,
+}
+
+counters = {'rateLimited': 0, 'heldApplied': 0, 'joinsRejected': 0, 'codeUpdatesDeferred': 0}
+
+# {(teacher_sid, student_sid): latest code_update payload} while overloaded
+_deferred_updates = {}
+_flush_task = None
+
+
+def allow(sid, event):
+    """Spend a token for (sid, event). Returns 0 if allowed, else retry-after seconds."""
+    if event in _EXEMPT:
+        return 0
+    per_sid = _buckets.setdefault(sid, {})
+    bucket = per_sid.get(event)
+    if bucket is None:
+        bucket = per_sid[event] = TokenBucket(*RATE_LIMITS.get(event, RATE_LIMIT_DEFAULT))
+    return bucket.take(OVERLOAD_RATE_FACTOR if state['overloaded'] else 1.0)
+
+
+def forget(sid):
+    """Drop a disconnected socket's buckets."""
+    _buckets.pop(sid, None)
+    for key in [k for k in _notified if k[0] == sid]:
+        del _notified[key]
+    for key in [k for k in _held_tasks if k[0] == sid]:
+        _held_tasks.pop(key).cancel()
+        _held.pop(key, None)
+
+
+def install_rate_limits(sio):
+    """Wrap every registered Socket.IO handler with its token bucket."""
+    handlers = sio.handlers.get('/', {})
+    for event, handler in list(handlers.items()):
+        if event not in _EXEMPT:
+            handlers[event] = _limited(sio, event, handler)
+    print(f'[ADMISSION] Rate limits on {len(handlers)} events, '
+          f'caps: {MAX_ROOMS} rooms, {MAX_STUDENTS_PER_ROOM} students/room')
+
+
+def _limited(sio, event, handler):
+    async def limited_handler(sid, *args):
+        retry_after = allow(sid, event)
+        if not retry_after:
+            if event in LATEST_WINS:
+                # This event is newer than anything held back
+                _discard_held(sid, event)
+            return await handler(sid, *args)
+        counters['rateLimited'] += 1
+        if event in LATEST_WINS:
+            _held[(sid, event)] = args
+            if (sid, event) not in _held_tasks:
+                _held_tasks[(sid, event)] = asyncio.create_task(
+                    _apply_held(sid, event, handler, retry_after))
+        elif event == 'run_code':
+            # The client waits for code_done to unlock its Run button
+            await sio.emit('code_done', {
+                'exit_code': 1,
+                'output': '',
+                'error': f'Too many runs, try again in {retry_after:.1f}s',
+                'telemetry': None,
+                'rateLimited': True
+            }, to=sid)
+        now = time.monotonic()
+        if now - _notified.get((sid, event), 0) >= 1.0:
+            _notified[(sid, event)] = now
+            await sio.emit('rate_limited', {
+                'event': event,
+                'retryAfter': round(retry_after, 3)
+            }, to=sid)
+            print(f'[ADMISSION] Rate limited {event} from {sid}')
+        return {'error': 'rate_limited', 'retryAfter': round(retry_after, 3)}
+
+    limited_handler.__name__ = getattr(handler, '__name__', event)
+    return limited_handler
+
+
+def _discard_held(sid, event):
+    task = _held_tasks.pop((sid, event), None)
+    if task is not None:
+        task.cancel()
+    _held.pop((sid, event), None)
+
+
+async def _apply_held(sid, event, handler, delay):
+    """Wait for a token, then run the handler with the newest held event."""
+    while delay:
+        await asyncio.sleep(delay)
+        delay = allow(sid, event)
+    # Unregister before running so a drop during the handler holds anew
+    del _held_tasks[(sid, event)]
+    args = _held.pop((sid, event))
+    counters['heldApplied'] += 1
+    await handler(sid, *args)
+
+
+def check_join(rooms, room_id):
+    """
+    Enforce room and student caps for a join.
+    Returns None if allowed, else the reason to send with join_rejected.
+    """
+    room = rooms.get(room_id)
+    if room is None:
+        if len(rooms) >= MAX_ROOMS:
+            reason = 'This server is hosting the maximum number of sessions. Try again later.'
+        else:
+            return None
+    elif len(room.get('students', {})) >= MAX_STUDENTS_PER_ROOM:
+        reason = 'This session is full.'
+    else:
+        return None
+    counters['joinsRejected'] += 1
+    return reason
+
+
+def is_overloaded():
+    return state['overloaded']
+
+
+def forward_code_update(sio, teacher_sid, student_sid, code):
+    """
+    Send a student's code to the teacher: right away normally, batched to
+    every OVERLOAD_CODE_UPDATE_INTERVAL while overloaded.
+    """
+    payload = {'studentId': student_sid, 'code': code}
+    if not state['overloaded']:
+        send(sio, teacher_sid, 'code_update', payload)
+        return
+    if (teacher_sid, student_sid) in _deferred_updates:
+        counters['codeUpdatesDeferred'] += 1
+    _deferred_updates[(teacher_sid, student_sid)] = payload
+    global _flush_task
+    if _flush_task is None or _flush_task.done():
+        _flush_task = asyncio.create_task(_flush_deferred(sio))
+
+
+async def _flush_deferred(sio):
+    while _deferred_updates:
+        await asyncio.sleep(OVERLOAD_CODE_UPDATE_INTERVAL)
+        pending = list(_deferred_updates.items())
+        _deferred_updates.clear()
+        for (teacher_sid, _), payload in pending:
+            send(sio, teacher_sid, 'code_update', payload)
+
+
+async def monitor_load(sio):
+    """Sample loop lag and CPU forever, switching overload mode with hysteresis."""
+    calm_since = None
+    last_wall, last_cpu = time.monotonic(), time.process_time()
+    while True:
+        expected = time.monotonic() + OVERLOAD_SAMPLE_SECONDS
+        await asyncio.sleep(OVERLOAD_SAMPLE_SECONDS)
+        now = time.monotonic()
+        lag_ms = max(0.0, (now - expected) * 1000)
+        cpu_now = time.process_time()
+        cpu = (cpu_now - last_cpu) / max(now - last_wall, 1e-6)
+        last_wall, last_cpu = now, cpu_now
+        state['lagMs'] = round(lag_ms, 1)
+        state['cpu'] = round(cpu, 3)
+
+        if not state['overloaded']:
+            if lag_ms > OVERLOAD_LAG_MS or cpu > OVERLOAD_CPU:
+                reason = (f'event loop lag {lag_ms:.0f} ms' if lag_ms > OVERLOAD_LAG_MS
+                          else f'CPU {cpu:.0%}')
+                await _set_overloaded(sio, True, reason)
+                calm_since = None
+        elif lag_ms < OVERLOAD_LAG_MS / 2 and cpu < OVERLOAD_CPU / 2:
+            calm_since = calm_since or now
+            if now - calm_since >= OVERLOAD_RECOVER_SECONDS:
+                await _set_overloaded(sio, False, None)
+        else:
+            calm_since = None
+
+
+async def _set_overloaded(sio, overloaded, reason):
+    state['overloaded'] = overloaded
+    state['reason'] = reason
+    state['since'] = time.time()
+    state['transitions'] += 1
+    print(f'[ADMISSION] Overload mode {"ON: " + reason if overloaded else "OFF"}')
+    await sio.emit('server_load', {'overloaded': overloaded, 'reason': reason})
+
+
+def stats():
+    return dict(state, **counters, sockets=len(_buckets),
+                maxRooms=MAX_ROOMS, maxStudentsPerRoom=MAX_STUDENTS_PER_ROOM)
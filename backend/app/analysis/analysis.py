@@ -0,0 +1,150 @@
+"""
+Code Analysis Service
+
+Parses student code off the event loop and caches the result by content hash.
+Python is parsed with `ast` (plus pyflakes lint warnings if it is installed);
+other languages use parsers registered with register_parser(). JavaScript
+uses `esprima` when it is installed (optional, like pyflakes); it only knows
+ES2017, so newer syntax can show up as a false error.
+
+Results only drive the live error indicators. Runs never depend on them:
+start_interactive compiles Python itself (compile_python) and always lets
+node judge JavaScript.
+
+Results are plain dicts:
+    {'ok': bool | None, 'diagnostics': [{line, column, message, severity}]}
+where ok=None means the language has no parser (nothing is known).
+"""
+
+import os
+import ast
+import asyncio
+import hashlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Optional lint pass for Python
+try:
+    from pyflakes.api import check as _pyflakes_check
+    print("[ANALYSIS] pyflakes available, lint warnings enabled")
+except ImportError:
+    _pyflakes_check = None
+
+# Worker threads used for parsing
+ANALYSIS_WORKERS = int(os.environ.get('ANALYSIS_WORKERS', 2))
+
+# Number of analysis results kept in the content-hash cache
+ANALYSIS_CACHE_SIZE = int(os.environ.get('ANALYSIS_CACHE_SIZE', 4096))
+
+_executor = ThreadPoolExecutor(max_workers=ANALYSIS_WORKERS,
+                               thread_name_prefix='analysis')
+
+# {(language, sha256): result}, least recently used first
+_cache = OrderedDict()
+
+# {language: fn(code) -> result}
+_parsers = {}
+
+
+def register_parser(language, parser):
+    """Register a parser callable(code) -> result dict for a language."""
+    _parsers[language] = parser
+
+
+def _normalize_language(language):
+    if language in ("javascript", "js"):
+        return "javascript"
+    return language
+
+
+def _diagnostic(line, column, message, severity='error'):
+    return {'line': line or 1, 'column': column or 0,
+            'message': message, 'severity': severity}
+
+
+class _LintCollector:
+    """Minimal pyflakes reporter that collects warnings as diagnostics."""
+
+    def __init__(self):
+        self.diagnostics = []
+
+    def unexpectedError(self, filename, message):
+        pass
+
+    def syntaxError(self, filename, message, line, column, source):
+        pass  # already reported by ast.parse
+
+    def flake(self, message):
+        self.diagnostics.append(_diagnostic(
+            message.lineno, message.col,
+            message.message % message.message_args, 'warning'
+        ))
+
+
+def _parse_python(code):
+    """Syntax check with ast, then optional pyflakes warnings."""
+    try:
+        ast.parse(code, '<student>', 'exec')
+    except SyntaxError as e:
+        return {'ok': False, 'diagnostics': [_diagnostic(e.lineno, e.offset, e.msg)]}
+    except ValueError as e:
+        # e.g. source contains null bytes
+        return {'ok': False, 'diagnostics': [_diagnostic(1, 0, str(e))]}
+
+    diagnostics = []
+    if _pyflakes_check is not None:
+        collector = _LintCollector()
+        _pyflakes_check(code, '<student>', collector)
+        diagnostics = collector.diagnostics
+    return {'ok': True, 'diagnostics': diagnostics}
+
+
+register_parser('python', _parse_python)
+
+# Optional JavaScript parser
+try:
+    import esprima
+
+    def _parse_javascript(code):
+        try:
+            esprima.parseScript(code, {'tolerant': False})
+        except Exception as e:
+            return {'ok': False, 'diagnostics': [
+                _diagnostic(getattr(e, 'lineNumber', 1), getattr(e, 'column', 0),
+                            getattr(e, 'description', str(e)))
+            ]}
+        return {'ok': True, 'diagnostics': []}
+
+    register_parser('javascript', _parse_javascript)
+except ImportError:
+    pass
+
+
+def _cache_key(code, language):
+    return (language, hashlib.sha256(code.encode('utf-8')).hexdigest())
+
+
+async def analyze(code, language):
+    """Analyze code in the worker pool, reusing cached results by content hash."""
+    language = _normalize_language(language)
+    parser = _parsers.get(language)
+    if parser is None:
+        return {'ok': None, 'diagnostics': []}
+
+    key = _cache_key(code, language)
+    result = _cache.get(key)
+    if result is not None:
+        _cache.move_to_end(key)
+        return result
+
+    loop = asyncio.get_event_loop()
+    try:
+        result = await loop.run_in_executor(_executor, parser, code)
+    except Exception as e:
+        print(f"[ANALYSIS] {language} parser failed: {e}")
+        return {'ok': None, 'diagnostics': []}
+
+    _cache[key] = result
+    if len(_cache) > ANALYSIS_CACHE_SIZE:
+        _cache.popitem(last=False)
+    return result
@@ -0,0 +1,93 @@
+"""
+Execution Backends
+
+Docker, the fork server and the Node pool are optional and slow to bring
+up: the Docker client pings the daemon (which can take a full connection
+timeout when no daemon is reachable), the zygote pre-imports modules and
+the Node pool boots node plus its warm workers. None of them is touched
+at import time. init_backends() brings them up in a background thread once
+the server is accepting connections; until a backend is ready, execution
+uses plain subprocesses.
+
+state() reports each backend as pending, initializing, ready, unavailable
+or disabled, with its init time and error, for /health.
+"""
+
+import os
+import time
+import threading
+
+from app.execution import forkserver, nodepool
+
+DOCKER_ENABLED = os.environ.get('EXECUTION_DOCKER', '1') == '1'
+
+# Seconds the Docker client waits for the daemon (ping and API calls)
+DOCKER_TIMEOUT = float(os.environ.get('DOCKER_TIMEOUT', 5))
+
+_state = {
+    'docker': {'status': 'pending' if DOCKER_ENABLED else 'disabled'},
+    'forkserver': {'status': 'pending' if forkserver.FORKSERVER_ENABLED else 'disabled'},
+    'nodepool': {'status': 'pending' if nodepool.NODE_POOL_ENABLED else 'disabled'},
+}
+_docker_client = None
+_thread = None
+
+
+def get_docker():
+    """The Docker client once it is ready, else None (callers use subprocesses)."""
+    return _docker_client
+
+
+def _connect_docker():
+    import docker
+    client = docker.from_env(timeout=DOCKER_TIMEOUT)
+    client.ping()
+    return client
+
+
+def _init(name, init):
+    """Run one backend's init, recording status, time and error. Returns its result."""
+    entry = _state[name]
+    entry['status'] = 'initializing'
+    started = time.perf_counter()
+    try:
+        result = init()
+        entry['status'] = 'ready'
+    except Exception as e:
+        result = None
+        entry['status'] = 'unavailable'
+        entry['error'] = str(e)
+    entry['initMs'] = round((time.perf_counter() - started) * 1000, 1)
+    if entry['status'] == 'ready':
+        print(f"[EXECUTION] {name} ready in {entry['initMs']:.0f}ms")
+    else:
+        print(f"[EXECUTION] {name} not available, using subprocess fallback - {entry['error']}")
+    return result
+
+
+def _init_all():
+    global _docker_client
+    if forkserver.FORKSERVER_ENABLED:
+        _init('forkserver', forkserver.warm)
+    if nodepool.NODE_POOL_ENABLED:
+        _init('nodepool', nodepool.warm)
+    if DOCKER_ENABLED:
+        _docker_client = _init('docker', _connect_docker)
+
+
+def init_backends():
+    """Start initializing the enabled backends in the background (once)."""
+    global _thread
+    if _thread is not None:
+        return
+    _thread = threading.Thread(target=_init_all, name='backend-init', daemon=True)
+    _thread.start()
+
+
+def settled():
+    """Whether every enabled backend has finished initializing (either way)."""
+    return all(entry['status'] not in ('pending', 'initializing') for entry in _state.values())
+
+
+def state():
+    return {name: dict(entry) for name, entry in _state.items()}
@@ -4,45 +4,75 @@ Code Execution Engine (Interactive)
 Supports interactive code execution with stdin/stdout streaming.
 Uses thread-based readers on Windows for reliable unbuffered pipe I/O.
 Python runs via python subprocess, JavaScript runs via node subprocess.
+Optional fast paths: the fork server (Python) and the Node worker pool
+(JavaScript); either falls back to a plain subprocess when unavailable.
+Input goes through a per-run stdin channel (stdin.py), never written to the
+pipe from the event loop.
 """
 
 import uuid
+import queue
+import codecs
 import asyncio
+import signal
+import subprocess
 import sys
 import tempfile
 import os
 import threading
+import traceback
 
-# Try Docker first (sandboxed, preferred)
-try:
-    import docker
-    docker_client = docker.from_env()
-    docker_client.ping()
-    print("[EXECUTION] Docker client initialized successfully")
-except Exception as e:
-    docker_client = None
-    print(f"[EXECUTION] Docker not available, using subprocess fallback - {e}")
+from app.execution import forkserver, nodepool, stdin
+from app.execution.backends import get_docker
+from app.tracing.tracing import tracer
 
 # Store running processes: {session_id: {proc, tmp_file, language}}
 running_processes = {}
 
+# Output chunks already waiting are merged into one on_output call, up to
+# this many bytes, so a chatty program costs one event per batch, not per line
+OUTPUT_COALESCE_BYTES = 64 * 1024
+
+
+def compile_python(code: str, filename: str):
+    """
+    Compile Python code in-process without running it.
+
+    Returns (code_object, None) if it compiles, otherwise (None, error text
+    formatted exactly like the interpreter would print it). The fork server
+    runs the code object as-is instead of compiling the file again.
+    """
+    try:
+        return compile(code, filename, 'exec', dont_inherit=True), None
+    except (SyntaxError, ValueError) as e:
+        return None, ''.join(traceback.format_exception_only(type(e), e))
+
+
+def command_for_language(language: str):
+    """Return (file_suffix, command_prefix) used to run code in a language."""
+    if language in ("javascript", "js"):
+        return ".js", ["node"]
+    return ".py", [sys.executable, "-u"]
+
 
 async def start_interactive(code: str, session_id: str, timeout: int = 30,
                             language: str = "python", on_output=None, on_done=None):
     """
     Start an interactive code execution process.
     Output is streamed via on_output callback.
-    When the process ends, on_done is called with the exit code.
+    When the process ends, on_done is called with the exit code and, for runs
+    that actually spawned, a telemetry dict (see _run_telemetry).
     """
     tmp_file_path = None
+    entry = None
+    run_start = tracer.now()
+    # Opened before anything is awaited: input sent while the process is
+    # starting is buffered and delivered once it runs
+    channel = stdin.open_channel(session_id)
+    trace_tags = {'session': session_id, 'language': language}
     try:
         # Determine command based on language
-        if language in ("javascript", "js"):
-            suffix = ".js"
-            cmd_prefix = ["node"]
-        else:
-            suffix = ".py"
-            cmd_prefix = [sys.executable, "-u"]
+        suffix, cmd_prefix = command_for_language(language)
 
         # Write code to a temporary file
         tmp_file = tempfile.NamedTemporaryFile(
@@ -52,35 +82,84 @@ async def start_interactive(code: str, session_id: str, timeout: int = 30,
         tmp_file.close()
         tmp_file_path = tmp_file.name
 
-        print(f"[EXECUTION] Starting: {' '.join(cmd_prefix)} {tmp_file_path}")
+        loop = asyncio.get_event_loop()
+        proc = None
 
-        # Use subprocess.Popen directly with raw pipes for reliable Windows I/O
-        import subprocess
-        proc = subprocess.Popen(
-            [*cmd_prefix, tmp_file_path],
-            stdin=subprocess.PIPE,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            bufsize=0,  # Unbuffered
-        )
+        if suffix == ".py":
+            # Fail syntax errors without spawning a process at all
+            code_object, syntax_error = await loop.run_in_executor(
+                None, compile_python, code, tmp_file_path
+            )
+            if syntax_error:
+                print("[EXECUTION] Syntax error, not spawning")
+                _remove_file(tmp_file_path)
+                stdin.discard_channel(channel)
+                if on_output:
+                    await on_output(syntax_error, True)
+                if on_done:
+                    await on_done(1)
+                return 1
+
+            # Fork from the pre-imported base image when enabled
+            proc = await loop.run_in_executor(
+                None, forkserver.spawn, tmp_file_path, code_object
+            )
+        else:
+            # Run in a warm worker thread of the Node pool when enabled
+            proc = await loop.run_in_executor(None, nodepool.spawn, tmp_file_path)
+
+        if proc is None:
+            print(f"[EXECUTION] Starting: {' '.join(cmd_prefix)} {tmp_file_path}")
+
+            # Use subprocess.Popen directly with raw pipes for reliable Windows I/O
+            proc = subprocess.Popen(
+                [*cmd_prefix, tmp_file_path],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                bufsize=0,  # Unbuffered
+            )
+            popen_reaper = True
+        else:
+            popen_reaper = False
 
         # Store the process reference
-        running_processes[session_id] = {
+        entry = {
             'proc': proc,
             'tmp_file': tmp_file_path,
             'language': language,
+            'session_id': session_id,
         }
+        running_processes[session_id] = entry
+        channel.attach(proc.stdin)
 
         print(f"[EXECUTION] Process started pid={proc.pid}")
-
-        loop = asyncio.get_event_loop()
-
-        # Thread-based reader for a pipe — reads byte by byte to deliver
-        # prompts like input("name: ") immediately without waiting for \n
+        spawned_at = tracer.now()
+        tracer.record('exec.spawn', run_start, spawned_at, 'exec', **trace_tags)
+        first_byte = []
+        output_bytes = {False: 0, True: 0}
+        if popen_reaper and hasattr(os, 'wait4'):
+            entry['reaper'] = _Reaper(proc, entry)
+
+        # Thread-based reader for a pipe. Each read returns whatever is
+        # available, so prompts like input("name: ") arrive immediately
+        # without waiting for \n (byte by byte on Windows)
         async def read_pipe_threaded(pipe, is_error=False):
             """Read from a pipe using a thread, push chunks into async."""
             def _blocking_reader():
-                """Runs in a thread. Reads small chunks and pushes to queue."""
+                """Runs in a thread. Reads chunks and pushes them to the queue."""
+                if sys.platform != 'win32':
+                    try:
+                        # Unbuffered pipe: one read() is one read(2) call
+                        while True:
+                            data = pipe.read(OUTPUT_COALESCE_BYTES)
+                            if not data:
+                                break
+                            result_queue.put(data)
+                    except Exception:
+                        pass
+                    result_queue.put(None)  # Sentinel for EOF
+                    return
                 chunks = []
                 try:
                     while True:
@@ -107,8 +186,24 @@ async def start_interactive(code: str, session_id: str, timeout: int = 30,
                         result_queue.put(b''.join(chunks))
                     result_queue.put(None)
 
-            import queue
             result_queue = queue.Queue()
+            # Chunks may end inside a multi-byte character
+            decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+
+            def _take_waiting(data):
+                """Merge chunks already queued behind data. Returns (data, eof)."""
+                parts = [data]
+                size = len(data)
+                while size < OUTPUT_COALESCE_BYTES:
+                    try:
+                        more = result_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is None:
+                        return b''.join(parts), True
+                    parts.append(more)
+                    size += len(more)
+                return b''.join(parts), False
 
             # Start the blocking reader in a thread
             reader_thread = threading.Thread(target=_blocking_reader, daemon=True)
@@ -124,33 +219,48 @@ async def start_interactive(code: str, session_id: str, timeout: int = 30,
                     if data is None:
                         # EOF
                         break
-                    text = data.decode('utf-8', errors='replace')
+                    data, eof = _take_waiting(data)
+                    output_bytes[is_error] += len(data)
+                    text = decoder.decode(data, final=eof)
+                    if not first_byte:
+                        first_byte.append(tracer.now())
+                        tracer.record('exec.first_byte', spawned_at, first_byte[0],
+                                      'exec', **trace_tags)
                     if on_output and text:
                         await on_output(text, is_error)
+                    if eof:
+                        break
                 except (asyncio.TimeoutError, Exception):
                     # Check if process has ended
-                    if proc.poll() is not None:
+                    if _poll(entry) is not None:
                         # Drain remaining items
-                        import queue as q_module
                         while True:
                             try:
                                 data = result_queue.get_nowait()
-                                if data is None:
-                                    break
-                                text = data.decode('utf-8', errors='replace')
-                                if on_output and text:
-                                    await on_output(text, is_error)
-                            except q_module.Empty:
+                            except queue.Empty:
+                                break
+                            if data is None:
+                                break
+                            data, eof = _take_waiting(data)
+                            output_bytes[is_error] += len(data)
+                            text = decoder.decode(data)
+                            if on_output and text:
+                                await on_output(text, is_error)
+                            if eof:
                                 break
+                        text = decoder.decode(b'', final=True)
+                        if on_output and text:
+                            await on_output(text, is_error)
                         break
                     continue
 
         # Timeout killer
         async def timeout_killer():
             await asyncio.sleep(timeout)
-            if proc.poll() is None:
+            if _poll(entry) is None:
+                entry['killed_by'] = 'timeout'
                 try:
-                    proc.kill()
+                    _kill(entry)
                 except Exception:
                     pass
                 if on_output:
@@ -164,19 +274,34 @@ async def start_interactive(code: str, session_id: str, timeout: int = 30,
             read_pipe_threaded(proc.stderr, True),
         )
 
+        tracer.record('exec.eof', spawned_at, tracer.now(), 'exec', **trace_tags)
+
         # Wait for process to finish
-        proc.wait(timeout=5)
+        await loop.run_in_executor(None, _wait, entry, 5)
         timeout_task.cancel()
 
         exit_code = proc.returncode or 0
+        finished_at = tracer.now()
         print(f"[EXECUTION] Finished exit_code={exit_code}")
 
-        # Clean up
-        _cleanup(session_id)
+        telemetry = _run_telemetry(
+            entry, exit_code, getattr(proc, 'rusage', None) or entry.get('rusage'),
+            spawn_ns=spawned_at - run_start, wall_ns=finished_at - spawned_at,
+            stdout_bytes=output_bytes[False], stderr_bytes=output_bytes[True],
+        )
+        if telemetry['termination'] == 'signal' and on_output:
+            await on_output(f"\n⚠ Process was killed by {telemetry['signal']}\n", True)
+
+        # Clean up (the session id may have changed if the client reconnected)
+        _cleanup(entry['session_id'])
+        stdin.discard_channel(channel)
 
         if on_done:
-            await on_done(exit_code)
+            with tracer.span('exec.on_done', 'exec', **trace_tags):
+                await on_done(exit_code, telemetry)
 
+        tracer.record('exec.run', run_start, tracer.now(), 'exec',
+                      exit_code=exit_code, **trace_tags)
         return exit_code
 
     except FileNotFoundError:
@@ -187,7 +312,8 @@ async def start_interactive(code: str, session_id: str, timeout: int = 30,
             await on_output(msg + "\n", True)
         if on_done:
             await on_done(1)
-        _cleanup(session_id)
+        _cleanup(entry['session_id'] if entry else session_id)
+        stdin.discard_channel(channel)
         return 1
 
     except Exception as e:
@@ -198,10 +324,113 @@ async def start_interactive(code: str, session_id: str, timeout: int = 30,
             await on_output(f"Error: {str(e)}\n", True)
         if on_done:
             await on_done(1)
-        _cleanup(session_id)
+        _cleanup(entry['session_id'] if entry else session_id)
+        stdin.discard_channel(channel)
         return 1
 
 
+class _Reaper:
+    """
+    The only waiter of a Popen child: a thread reaps it with wait4() so its
+    resource usage is not lost, then stores the exit status on the Popen.
+    Nothing else may poll()/wait() that Popen; use _poll/_wait/_kill.
+    """
+
+    def __init__(self, proc, entry):
+        self.proc = proc
+        self.entry = entry
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        pid = self.proc.pid
+        try:
+            if hasattr(os, 'waitid'):
+                # Wait without reaping: the pid stays ours until the lock is
+                # held, so kill() can never signal a reused pid
+                os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+            with self.lock:
+                _, status, ru = os.wait4(pid, 0)
+                self.entry['rusage'] = {'utime': ru.ru_utime, 'stime': ru.ru_stime,
+                                        'maxrss': ru.ru_maxrss}
+                self.proc.returncode = os.waitstatus_to_exitcode(status)
+        except ChildProcessError:
+            # Reaped by someone else; the exit status is lost
+            if self.proc.returncode is None:
+                self.proc.returncode = 1
+        finally:
+            self.done.set()
+
+    def poll(self):
+        return self.proc.returncode if self.done.is_set() else None
+
+    def wait(self, timeout):
+        if not self.done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.proc.args, timeout)
+        return self.proc.returncode
+
+    def kill(self):
+        with self.lock:
+            if not self.done.is_set():
+                os.kill(self.proc.pid, signal.SIGKILL)
+
+
+def _poll(entry):
+    """Exit code of a run's process, or None while it is running."""
+    reaper = entry.get('reaper')
+    return reaper.poll() if reaper else entry['proc'].poll()
+
+
+def _wait(entry, timeout):
+    reaper = entry.get('reaper')
+    return reaper.wait(timeout) if reaper else entry['proc'].wait(timeout=timeout)
+
+
+def _kill(entry):
+    reaper = entry.get('reaper')
+    if reaper:
+        reaper.kill()
+    else:
+        entry['proc'].kill()
+
+
+def _run_telemetry(entry, exit_code, rusage, spawn_ns, wall_ns, stdout_bytes, stderr_bytes):
+    """
+    Per-run resource usage reported with code_done.
+
+    termination is 'exit', 'timeout', 'stopped' (killed by stop_code) or
+    'signal' (killed by anything else, e.g. the OOM killer).
+    CPU and peak memory are None where wait4() is not available.
+    """
+    killed_by = entry.get('killed_by')
+    signal_name = None
+    if exit_code < 0:
+        try:
+            signal_name = signal.Signals(-exit_code).name
+        except ValueError:
+            signal_name = f'signal {-exit_code}'
+    if killed_by:
+        termination = killed_by
+    elif signal_name:
+        termination = 'signal'
+    else:
+        termination = 'exit'
+    return {
+        'exitCode': exit_code,
+        'termination': termination,
+        'signal': signal_name,
+        'spawnMs': round(spawn_ns / 1e6, 2),
+        'wallMs': round(wall_ns / 1e6, 2),
+        'cpuUserMs': round(rusage['utime'] * 1000, 2) if rusage else None,
+        'cpuSysMs': round(rusage['stime'] * 1000, 2) if rusage else None,
+        'peakRssKb': rusage['maxrss'] if rusage else None,
+        'stdoutBytes': stdout_bytes,
+        'stderrBytes': stderr_bytes,
+        'language': entry.get('language'),
+    }
+
+
 def _has_pending_data(pipe):
     """Check if a pipe has data available to read (non-blocking)."""
     if sys.platform == 'win32':
@@ -224,22 +453,39 @@ def _has_pending_data(pipe):
         return bool(r)
 
 
-async def send_input(session_id: str, text: str):
-    """Send input to a running process."""
-    entry = running_processes.get(session_id)
-    if entry:
-        proc = entry['proc']
-        if proc.poll() is None and proc.stdin:
-            try:
-                proc.stdin.write((text + '\n').encode('utf-8'))
-                proc.stdin.flush()
-                print(f"[EXECUTION] Sent input to pid {proc.pid}: {repr(text)}")
-                return True
-            except Exception as e:
-                print(f"[EXECUTION] Error sending input: {e}")
-                return False
-    print(f"[EXECUTION] No running process for session {session_id}")
-    return False
+async def send_input(session_id: str, text: str, newline: bool = True):
+    """
+    Queue input for a starting or running process (text plus a newline, or
+    as-is for pieces of a paste).
+
+    Returns {'buffered': bytes not yet written to the process} or
+    {'error': ...} if nothing is running, stdin was closed or the input
+    buffer is full.
+    """
+    channel = stdin.channels.get(session_id)
+    if channel is None:
+        print(f"[EXECUTION] No running process for session {session_id}")
+        return {'error': 'No running program'}
+    data = (text + '\n' if newline else text).encode('utf-8')
+    if not channel.write(data):
+        if not channel.accepting:
+            return {'error': 'Input is closed'}
+        if len(data) > stdin.STDIN_BUFFER_BYTES:
+            # Would never fit, so don't let the client retry it
+            return {'error': 'Input too large'}
+        return {'error': 'Input buffer full', 'buffered': channel.buffered}
+    return {'buffered': channel.buffered}
+
+
+async def send_eof(session_id: str):
+    """Close the process's stdin (Ctrl-D) after the input buffered so far."""
+    channel = stdin.channels.get(session_id)
+    if channel is None:
+        return {'error': 'No running program'}
+    if not channel.close():
+        return {'error': 'Input is closed'}
+    print(f"[EXECUTION] EOF queued for session {session_id}")
+    return {'buffered': channel.buffered}
 
 
 async def stop_process(session_id: str):
@@ -247,25 +493,39 @@ async def stop_process(session_id: str):
     entry = running_processes.get(session_id)
     if entry:
         proc = entry['proc']
-        if proc.poll() is None:
+        if _poll(entry) is None:
+            entry['killed_by'] = 'stopped'
             try:
-                proc.kill()
+                _kill(entry)
                 print(f"[EXECUTION] Killed pid {proc.pid}")
             except Exception:
                 pass
     _cleanup(session_id)
 
 
+def rename_session(old_id: str, new_id: str):
+    """Move a running process to a new session id (client reconnected)."""
+    entry = running_processes.pop(old_id, None)
+    if entry:
+        entry['session_id'] = new_id
+        running_processes[new_id] = entry
+    stdin.rename_channel(old_id, new_id)
+
+
 def _cleanup(session_id: str):
     """Clean up process resources."""
     entry = running_processes.pop(session_id, None)
     if entry:
-        tmp_file = entry.get('tmp_file')
-        if tmp_file and os.path.exists(tmp_file):
-            try:
-                os.unlink(tmp_file)
-            except Exception:
-                pass
+        _remove_file(entry.get('tmp_file'))
+
+
+def _remove_file(path):
+    """Delete a temp file, ignoring errors."""
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except Exception:
+            pass
 
 
 # ──────────────────────────────────────────────────────────
@@ -277,8 +537,10 @@ async def run_code(code: str, timeout: int = 10, language: str = "python"):
     if language in ("javascript", "js"):
         return await _run_non_interactive(code, timeout, language)
 
+    # Docker (sandboxed, preferred) once it has initialized in the background
+    docker_client = get_docker()
     if docker_client is not None:
-        result = await _run_with_docker(code, timeout)
+        result = await _run_with_docker(docker_client, code, timeout)
         if result.get("error") and "No such image" in str(result.get("error", "")):
             return await _run_non_interactive(code, timeout, language)
         return result
@@ -286,7 +548,7 @@ async def run_code(code: str, timeout: int = 10, language: str = "python"):
         return await _run_non_interactive(code, timeout, language)
 
 
-async def _run_with_docker(code: str, timeout: int = 10):
+async def _run_with_docker(docker_client, code: str, timeout: int = 10):
     """Execute Python code in a Docker container (non-interactive)."""
     container = None
     container_name = f"code-exec-{uuid.uuid4().hex[:8]}"
@@ -323,12 +585,7 @@ async def _run_non_interactive(code: str, timeout: int = 10, language: str = "py
     """Non-interactive subprocess execution."""
     tmp_file = None
     try:
-        if language in ("javascript", "js"):
-            suffix = ".js"
-            cmd_prefix = ["node"]
-        else:
-            suffix = ".py"
-            cmd_prefix = [sys.executable, "-u"]
+        suffix, cmd_prefix = command_for_language(language)
 
         tmp_file = tempfile.NamedTemporaryFile(
             mode='w', suffix=suffix, delete=False, encoding='utf-8'
@@ -0,0 +1,328 @@
+"""
+Fork Server (pre-imported base image)
+
+Optional fast path for Python runs on POSIX. A long-lived parent process
+(the "zygote") imports a configurable set of modules once, then forks a
+child per run. Children start with those modules already in sys.modules,
+so common class imports (math, random, collections, ...) cost nothing.
+
+The server talks to the zygote over a private Unix socket. For every run it
+sends the path of the code file plus the child's stdin/stdout/stderr pipe
+ends (SCM_RIGHTS). The code object the server already compiled while
+checking syntax is passed along as a marshalled file, so the child execs
+that bytecode instead of compiling the source again. The zygote replies with the child pid and later with its
+exit code. ForkedProcess wraps that exchange behind the subset of the
+subprocess.Popen interface that start_interactive uses.
+
+Enable with EXECUTION_FORKSERVER=1. Modules to preload are taken from
+EXECUTION_PRELOAD (comma separated) on top of DEFAULT_PRELOAD. The zygote
+is started in the background at server startup (see backends.py); runs that
+arrive while it is still starting use a normal subprocess.
+"""
+
+import os
+import sys
+import json
+import time
+import marshal
+import signal
+import socket
+import tempfile
+import threading
+import subprocess
+
+FORKSERVER_ENABLED = (os.environ.get('EXECUTION_FORKSERVER', '0') == '1'
+                      and sys.platform != 'win32'
+                      and hasattr(socket, 'send_fds'))
+
+# Standard-library modules used in most classes
+DEFAULT_PRELOAD = ['math', 'random', 'collections', 'itertools', 'functools',
+                   'string', 're', 'json', 'datetime', 'statistics']
+
+PRELOAD_MODULES = DEFAULT_PRELOAD + [
+    m.strip() for m in os.environ.get('EXECUTION_PRELOAD', '').split(',') if m.strip()
+]
+
+# Zygote program: preload modules, then fork one child per request
+_ZYGOTE = r'''
+import os, sys, json, socket, signal, marshal, threading, importlib, traceback
+
+sock_path = sys.argv[1]
+loaded = []
+for name in sys.argv[2:]:
+    try:
+        importlib.import_module(name)
+        loaded.append(name)
+    except Exception:
+        pass
+
+listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+listener.bind(sock_path)
+os.chmod(sock_path, 0o600)
+listener.listen(64)
+sys.stdout.write(json.dumps({"ready": True, "loaded": loaded}) + "\n")
+sys.stdout.flush()
+
+
+def exit_with_server():
+    # stdin is a pipe from the server; EOF means the server is gone
+    sys.stdin.buffer.read()
+    os._exit(0)
+
+
+threading.Thread(target=exit_with_server, daemon=True).start()
+
+# Connections of runs still being waited on; a child must not keep them open
+active_conns = set()
+
+
+def load_bytecode(bytecode):
+    # Code object marshalled by the server (same interpreter), used once
+    try:
+        with open(bytecode, "rb") as f:
+            return marshal.load(f)
+    except Exception:
+        return None
+    finally:
+        try:
+            os.unlink(bytecode)
+        except OSError:
+            pass
+
+
+def run_child(conn, path, bytecode, fds):
+    # Runs in the forked child: wire up the pipes and execute the file
+    listener.close()
+    conn.close()
+    for other in list(active_conns):
+        other.close()
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    import io, runpy, types
+    sys.stdin = io.TextIOWrapper(io.BufferedReader(io.FileIO(0, "r", closefd=False)),
+                                 encoding="utf-8")
+    sys.stdout = io.TextIOWrapper(io.FileIO(1, "w", closefd=False), encoding="utf-8",
+                                  write_through=True)
+    sys.stderr = io.TextIOWrapper(io.FileIO(2, "w", closefd=False), encoding="utf-8",
+                                  write_through=True)
+    sys.argv = [path]
+    sys.path[0] = os.path.dirname(path)
+    code = 0
+    code_object = load_bytecode(bytecode) if bytecode else None
+    try:
+        if code_object is not None:
+            main = types.ModuleType("__main__")
+            main.__file__ = path
+            sys.modules["__main__"] = main
+            exec(code_object, main.__dict__)
+        else:
+            runpy.run_path(path, run_name="__main__")
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        if not isinstance(e.code, int) and e.code is not None:
+            sys.stderr.write(str(e.code) + "\n")
+    except BaseException:
+        etype, value, tb = sys.exc_info()
+        # Skip our/runpy's frames so the traceback looks like a plain `python file.py`
+        while tb is not None and tb.tb_frame.f_code.co_filename != path:
+            tb = tb.tb_next
+        traceback.print_exception(etype, value, tb)
+        code = 1
+    # What interpreter shutdown does before exiting: wait for non-daemon
+    # threads, then run atexit handlers
+    try:
+        threading._shutdown()
+    except BaseException:
+        traceback.print_exc()
+    try:
+        import atexit
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(code)
+
+
+def wait_child(conn, pid):
+    _, status, ru = os.wait4(pid, 0)
+    rusage = {"utime": ru.ru_utime, "stime": ru.ru_stime, "maxrss": ru.ru_maxrss}
+    try:
+        conn.sendall((json.dumps({"exit": os.waitstatus_to_exitcode(status),
+                                  "rusage": rusage}) + "\n").encode())
+    except OSError:
+        pass
+    active_conns.discard(conn)
+    conn.close()
+
+
+while True:
+    conn, _ = listener.accept()
+    try:
+        msg, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+        request = json.loads(msg.decode())
+    except Exception:
+        conn.close()
+        continue
+    pid = os.fork()
+    if pid == 0:
+        run_child(conn, request["path"], request.get("bytecode"), fds)
+    for fd in fds:
+        os.close(fd)
+    conn.sendall((json.dumps({"pid": pid}) + "\n").encode())
+    active_conns.add(conn)
+    threading.Thread(target=wait_child, args=(conn, pid), daemon=True).start()
+'''
+
+_zygote = None
+_zygote_lock = threading.Lock()
+
+
+def _start_zygote():
+    """Start the zygote process and wait for it to finish preloading."""
+    sock_dir = tempfile.mkdtemp(prefix='orca-forkserver-')
+    sock_path = os.path.join(sock_dir, 'zygote.sock')
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-c', _ZYGOTE, sock_path, *PRELOAD_MODULES],
+        stdin=subprocess.PIPE,  # closed when the server exits, which stops the zygote
+        stdout=subprocess.PIPE,
+        start_new_session=True,
+    )
+    line = proc.stdout.readline()
+    try:
+        info = json.loads(line.decode())
+    except ValueError:
+        proc.kill()
+        raise RuntimeError('fork server failed to start')
+    print(f"[FORKSERVER] Zygote pid={proc.pid} ready in "
+          f"{(time.perf_counter() - started) * 1000:.0f}ms, preloaded: {', '.join(info['loaded'])}")
+    return {'proc': proc, 'sock_path': sock_path, 'sock_dir': sock_dir}
+
+
+def _get_zygote():
+    """Return a live zygote, (re)starting it if needed."""
+    global _zygote
+    with _zygote_lock:
+        if _zygote is None or _zygote['proc'].poll() is not None:
+            _zygote = _start_zygote()
+        return _zygote
+
+
+def warm():
+    """Start the zygote now instead of on the first run."""
+    if FORKSERVER_ENABLED:
+        _get_zygote()
+
+
+class ForkedProcess:
+    """Popen-like handle for a child forked by the zygote."""
+
+    def __init__(self, pid, conn, stdin, stdout, stderr):
+        self.pid = pid
+        self.stdin = stdin
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        self.rusage = None
+        self._conn = conn
+        self._exited = threading.Event()
+        threading.Thread(target=self._wait_exit, daemon=True).start()
+
+    def _wait_exit(self):
+        """Read the exit code the zygote sends when the child is reaped."""
+        data = b''
+        try:
+            while not data.endswith(b'\n'):
+                chunk = self._conn.recv(4096)
+                if not chunk:
+                    break
+                data += chunk
+            reply = json.loads(data.decode())
+            self.rusage = reply.get('rusage')
+            self.returncode = reply['exit']
+        except Exception:
+            # Zygote died before reporting — treat as killed
+            self.returncode = -signal.SIGKILL
+        finally:
+            self._conn.close()
+            self._exited.set()
+
+    def poll(self):
+        return self.returncode if self._exited.is_set() else None
+
+    def wait(self, timeout=None):
+        if not self._exited.wait(timeout):
+            raise subprocess.TimeoutExpired('forked child', timeout)
+        return self.returncode
+
+    def kill(self):
+        if not self._exited.is_set():
+            try:
+                os.kill(self.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+
+
+def spawn(path, code_object=None):
+    """
+    Fork a child from the zygote that runs the Python file at `path`, or
+    `code_object` (compiled from it) when given.
+
+    Returns a ForkedProcess, or None if the fork server is unavailable
+    (callers then fall back to a normal subprocess).
+    """
+    if not FORKSERVER_ENABLED:
+        return None
+    if _zygote is None and _zygote_lock.locked():
+        # Still preloading in the background — don't make this run wait
+        return None
+
+    request = {'path': path}
+    if code_object is not None:
+        request['bytecode'] = path + 'c'
+        with open(request['bytecode'], 'wb') as f:
+            marshal.dump(code_object, f)
+
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+    child_fds = [stdin_r, stdout_w, stderr_w]
+    conn = None
+    try:
+        zygote = _get_zygote()
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.connect(zygote['sock_path'])
+        socket.send_fds(conn, [json.dumps(request).encode()], child_fds)
+
+        reply = b''
+        while not reply.endswith(b'\n'):
+            chunk = conn.recv(1)
+            if not chunk:
+                raise RuntimeError('fork server closed the connection')
+            reply += chunk
+        pid = json.loads(reply.decode())['pid']
+    except Exception as e:
+        print(f"[FORKSERVER] Unavailable, falling back to subprocess - {e}")
+        if conn:
+            conn.close()
+        for fd in (stdin_r, stdin_w, stdout_r, stdout_w, stderr_r, stderr_w):
+            os.close(fd)
+        if 'bytecode' in request:
+            try:
+                os.unlink(request['bytecode'])
+            except OSError:
+                pass
+        return None
+
+    for fd in child_fds:
+        os.close(fd)
+
+    return ForkedProcess(
+        pid, conn,
+        os.fdopen(stdin_w, 'wb', buffering=0),
+        os.fdopen(stdout_r, 'rb', buffering=0),
+        os.fdopen(stderr_r, 'rb', buffering=0),
+    )
@@ -0,0 +1,208 @@
+"""
+Batched Grading Runner
+
+Runs many students' code against the same stdin/expected-stdout test cases.
+Each (student, case) run is a separate subprocess; at most `max_workers` of
+them run at once per batch, and at most DEFAULT_MAX_WORKERS across all
+batches, so concurrent run_all requests share one pool. Per-student
+summaries are reported through an async callback as soon as all of that
+student's cases have finished. A case or student whose grading raises is
+reported as failed instead of ending the batch, and runs still going when
+the batch is cancelled are cancelled and their processes killed.
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+
+from app.execution.execution import command_for_language
+
+# Upper bound on concurrent grading subprocesses (whole server)
+DEFAULT_MAX_WORKERS = max(2, (os.cpu_count() or 2))
+
+# Shared by every batch; created on first use inside the event loop
+_workers = None
+
+# Output kept per failed case so the teacher can see what went wrong
+MAX_REPORTED_OUTPUT = 2000
+
+# Seconds to collect a timed-out case's pipes after killing it
+KILL_GRACE_SECONDS = 2
+
+
+def _normalize(text):
+    """Compare outputs ignoring trailing whitespace and a trailing newline."""
+    return '\n'.join(line.rstrip() for line in text.rstrip().splitlines())
+
+
+async def _run_case(cmd, stdin_text, timeout):
+    """Run one test case. Returns (stdout, stderr, exit_code, timed_out)."""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(
+            proc.communicate((stdin_text or '').encode('utf-8')), timeout=timeout
+        )
+    except asyncio.TimeoutError:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass  # exited just as the timeout hit
+        try:
+            # Bounded: a process it spawned may still hold the pipes open
+            await asyncio.wait_for(proc.communicate(), timeout=KILL_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        return '', '', -1, True
+    except asyncio.CancelledError:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        raise
+
+    return (stdout.decode('utf-8', errors='replace'),
+            stderr.decode('utf-8', errors='replace'),
+            proc.returncode, False)
+
+
+def _worker_slots():
+    global _workers
+    if _workers is None:
+        _workers = asyncio.Semaphore(DEFAULT_MAX_WORKERS)
+    return _workers
+
+
+def _write_source(code, suffix):
+    """Write a student's code to a temp file and return its path."""
+    with tempfile.NamedTemporaryFile(
+        mode='w', suffix=suffix, delete=False, encoding='utf-8'
+    ) as tmp_file:
+        tmp_file.write(code or '')
+    return tmp_file.name
+
+
+def _remove_source(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+async def _grade_student(student_id, code, cases, timeout, language, semaphore):
+    """Run all cases for one student and build their summary."""
+    suffix, cmd_prefix = command_for_language(language)
+    loop = asyncio.get_running_loop()
+    # File I/O goes to the default executor so a slow disk never stalls the loop
+    source = await loop.run_in_executor(None, _write_source, code, suffix)
+
+    async def run_one(index, case):
+        async with semaphore, _worker_slots():
+            try:
+                stdout, stderr, exit_code, timed_out = await _run_case(
+                    [*cmd_prefix, source], case.get('stdin', ''), timeout
+                )
+            except FileNotFoundError:
+                stdout, stderr, exit_code, timed_out = '', 'Runtime not found', 1, False
+        passed = (not timed_out and exit_code == 0
+                  and _normalize(stdout) == _normalize(case.get('expected', '')))
+        result = {'case': index, 'passed': passed, 'exitCode': exit_code}
+        if timed_out:
+            result['error'] = 'Execution timed out'
+        elif not passed:
+            result['output'] = stdout[:MAX_REPORTED_OUTPUT]
+            if stderr:
+                result['error'] = stderr[:MAX_REPORTED_OUTPUT]
+        return result
+
+    start = time.perf_counter()
+    try:
+        # Every case finishes (or fails) before the file is removed
+        results = await asyncio.gather(
+            *(run_one(i, case) for i, case in enumerate(cases)),
+            return_exceptions=True,
+        )
+    finally:
+        await loop.run_in_executor(None, _remove_source, source)
+
+    for index, result in enumerate(results):
+        if isinstance(result, BaseException):
+            print(f'[GRADING] Case {index} for {student_id} failed: {result!r}')
+            results[index] = {'case': index, 'passed': False, 'exitCode': -1,
+                              'error': f'Grading failed: {result}'}
+
+    passed = sum(1 for r in results if r['passed'])
+    return {
+        'studentId': student_id,
+        'passed': passed,
+        'total': len(results),
+        'allPassed': passed == len(results),
+        'cases': results,
+        'elapsed': round(time.perf_counter() - start, 4),
+    }
+
+
+async def run_batch(submissions, cases, timeout=10, language="python",
+                    max_workers=DEFAULT_MAX_WORKERS, on_result=None):
+    """
+    Grade every submission against every case.
+
+    Args:
+        submissions: {studentId: code}
+        cases: list of {stdin, expected}
+        timeout: per-run timeout in seconds
+        language: "python" or "javascript"
+        max_workers: maximum concurrent subprocesses for this batch (the
+            server-wide DEFAULT_MAX_WORKERS limit applies on top)
+        on_result: async callback(summary) called as each student finishes
+
+    Returns:
+        Batch stats: {students, runs, failed, wallTime, runsPerSecond};
+        failed counts students whose grading raised (reported through
+        on_result with an error and no cases)
+    """
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    start = time.perf_counter()
+
+    pending = {
+        asyncio.create_task(
+            _grade_student(student_id, code, cases, timeout, language, semaphore)
+        ): student_id
+        for student_id, code in submissions.items()
+    }
+    failed = 0
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                student_id = pending.pop(task)
+                try:
+                    summary = task.result()
+                except Exception as e:
+                    failed += 1
+                    print(f'[GRADING] Grading {student_id} failed: {e!r}')
+                    summary = {'studentId': student_id, 'passed': 0, 'total': len(cases),
+                               'allPassed': False, 'cases': [], 'error': f'Grading failed: {e}'}
+                if on_result:
+                    await on_result(summary)
+    finally:
+        # on_result raised or the batch was cancelled: stop the rest and
+        # wait for them so no run outlives the batch
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    wall_time = time.perf_counter() - start
+    runs = len(submissions) * len(cases)
+    return {
+        'students': len(submissions),
+        'runs': runs,
+        'failed': failed,
+        'wallTime': round(wall_time, 4),
+        'runsPerSecond': round(runs / wall_time, 2) if wall_time > 0 else 0.0,
+    }
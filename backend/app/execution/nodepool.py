@@ -0,0 +1,419 @@
+"""
+Node Worker Pool
+
+Optional fast path for JavaScript runs. Instead of spawning `node` for every
+run, NODE_POOL_SIZE long-lived node processes run each submission in a fresh
+worker thread (its own V8 isolate, globals and module cache) with
+process.stdin/stdout/stderr wired to the run. Each process keeps
+NODE_POOL_WARM workers booted ahead of time, so a run starts without paying
+for node or isolate startup.
+
+A run's V8 heap is capped at NODE_RUN_MEMORY_MB (worker resourceLimits);
+going over ends it like an OOM kill. Timeouts and stop_code use the same
+kill() path as subprocesses. A process is retired after
+NODE_POOL_RECYCLE_AFTER runs (it exits once its last run finishes) and
+replaced; one that dies takes its active runs with it, reported as killed.
+
+The server talks to each node process in JSON lines over two dedicated
+pipes (not stdin/stdout, which student code writes to freely). Worker
+threads share the process's fds, so frames from node also start with a
+random per-process key that only the main thread knows (it is the first
+line on the command pipe, read before any worker boots): lines without it,
+or that don't parse, are dropped. If the frame reader stops, the process's
+runs fail as killed and the process is replaced. PooledRun turns one run's frames back into pipes behind the subset of the
+subprocess.Popen interface that start_interactive uses, like ForkedProcess
+does for the fork server.
+
+Enable with EXECUTION_NODE_POOL=1. CPU time and peak RSS are process-wide
+in a shared node process, so pooled runs report them as None.
+"""
+
+import os
+import json
+import time
+import queue
+import base64
+import signal
+import secrets
+import itertools
+import threading
+import subprocess
+
+NODE_POOL_ENABLED = os.environ.get('EXECUTION_NODE_POOL', '0') == '1'
+NODE_POOL_SIZE = int(os.environ.get('NODE_POOL_SIZE', 1))
+NODE_POOL_WARM = int(os.environ.get('NODE_POOL_WARM', 2))
+NODE_POOL_RECYCLE_AFTER = int(os.environ.get('NODE_POOL_RECYCLE_AFTER', 200))
+NODE_RUN_MEMORY_MB = int(os.environ.get('NODE_RUN_MEMORY_MB', 256))
+
+# Pool process: keep warm workers, run one submission per worker thread
+_WORKER = r'''
+const fs = require('fs');
+const { Worker } = require('worker_threads');
+const readline = require('readline');
+
+// Control pipes: frames to the server, commands from it
+const ctl = fs.createWriteStream(null, { fd: Number(process.argv[1]) });
+const commandInput = fs.createReadStream(null, { fd: Number(process.argv[2]) });
+let key = null;
+
+const WARM = Number(process.env.NODE_POOL_WARM) || 0;
+const MEMORY_MB = Number(process.env.NODE_RUN_MEMORY_MB) || 256;
+
+// Runs inside the worker: wait for the file, then run it as the main module.
+// A worker that has read stdin stays alive until stdin ends, unlike a
+// process whose paused stdin pipe does not; unref the port on pause() so
+// programs that close their readline interface still exit.
+const BOOT = `
+const { parentPort } = require('worker_threads');
+parentPort.once('message', (path) => {
+  parentPort.unref();
+  const stdin = process.stdin;
+  const kPort = Object.getOwnPropertySymbols(stdin).find((s) => s.description === 'kPort');
+  if (kPort) {
+    const pause = stdin.pause, resume = stdin.resume;
+    stdin.pause = function () { const r = pause.call(this); this[kPort].unref(); return r; };
+    stdin.resume = function () { this[kPort].ref(); return resume.call(this); };
+  }
+  process.argv[1] = path;
+  require('module').runMain();
+});
+`;
+
+const spare = [];
+const runs = new Map();
+let closing = false;
+
+function send(msg) {
+  ctl.write(key + JSON.stringify(msg) + '\n');
+}
+
+function boot() {
+  const worker = new Worker(BOOT, {
+    eval: true, stdin: true, stdout: true, stderr: true,
+    resourceLimits: { maxOldGenerationSizeMb: MEMORY_MB },
+  });
+  worker.on('error', () => {});
+  return worker;
+}
+
+function refill() {
+  while (!closing && spare.length < WARM) spare.push(boot());
+}
+
+function maybeExit() {
+  if (closing && runs.size === 0) process.exit(0);
+}
+
+function start(id, path) {
+  const worker = spare.shift() || boot();
+  const run = { worker, code: 0, oom: false, pending: 3 };
+  runs.set(id, run);
+  const text = (s) => send({ id, t: 'err', d: Buffer.from(s).toString('base64') });
+  const finish = () => {
+    if (--run.pending > 0) return;
+    runs.delete(id);
+    send({ id, t: 'exit', code: run.code, oom: run.oom });
+    maybeExit();
+  };
+  worker.stdout.on('data', (d) => send({ id, t: 'out', d: d.toString('base64') }));
+  worker.stderr.on('data', (d) => send({ id, t: 'err', d: d.toString('base64') }));
+  worker.stdout.on('end', finish);
+  worker.stderr.on('end', finish);
+  worker.on('error', (e) => {
+    if (e && e.code === 'ERR_WORKER_OUT_OF_MEMORY') {
+      run.oom = true;
+      text(`Memory limit exceeded (${MEMORY_MB} MB)\n`);
+    } else {
+      text(((e && e.stack) || String(e)) + '\n');
+    }
+  });
+  // Report exit only after both streams ended, so no output is lost
+  worker.on('exit', (code) => {
+    run.code = code;
+    finish();
+  });
+  worker.postMessage(path);
+  setImmediate(refill);
+}
+
+const commands = readline.createInterface({ input: commandInput });
+commands.on('line', (line) => {
+  if (key === null) {
+    // First line: the frame key; only now may workers boot
+    key = line;
+    refill();
+    send({ t: 'ready' });
+    return;
+  }
+  const msg = JSON.parse(line);
+  const run = runs.get(msg.id);
+  if (msg.t === 'run') start(msg.id, msg.path);
+  else if (!run) return;
+  else if (msg.t === 'in') run.worker.stdin.write(Buffer.from(msg.d, 'base64'));
+  else if (msg.t === 'eof') run.worker.stdin.end();
+  else if (msg.t === 'kill') run.worker.terminate();
+});
+commands.on('close', () => {
+  closing = true;
+  spare.splice(0).forEach((w) => w.terminate());
+  maybeExit();
+});
+'''
+
+_run_ids = itertools.count(1)
+_processes = []
+_pool_lock = threading.Lock()
+_stats = {'runs': 0, 'processesStarted': 0, 'recycled': 0, 'crashed': 0, 'badFrames': 0}
+
+
+class _NodeProcess:
+    """One pool process and the runs it is hosting."""
+
+    def __init__(self):
+        started = time.perf_counter()
+        self.key = secrets.token_hex(16).encode()
+        frames_r, frames_w = os.pipe()
+        commands_r, commands_w = os.pipe()
+        try:
+            self.proc = subprocess.Popen(
+                ['node', '-e', _WORKER, str(frames_w), str(commands_r)],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                pass_fds=(frames_w, commands_r),
+                env=dict(os.environ, NODE_POOL_WARM=str(NODE_POOL_WARM),
+                         NODE_RUN_MEMORY_MB=str(NODE_RUN_MEMORY_MB)),
+                start_new_session=True,
+            )
+        except BaseException:
+            for fd in (frames_r, frames_w, commands_r, commands_w):
+                os.close(fd)
+            raise
+        os.close(frames_w)
+        os.close(commands_r)
+        self.frames = os.fdopen(frames_r, 'rb')
+        self.commands = os.fdopen(commands_w, 'wb')
+        self.commands.write(self.key + b'\n')
+        self.commands.flush()
+        if self._parse(self.frames.readline()) is None:
+            self.proc.kill()
+            self.frames.close()
+            self.commands.close()
+            raise RuntimeError('node pool process failed to start')
+        self.runs = {}
+        self.started_runs = 0
+        self.retiring = False
+        self._write_lock = threading.Lock()
+        threading.Thread(target=self._read_frames, daemon=True).start()
+        _stats['processesStarted'] += 1
+        print(f"[NODEPOOL] Process pid={self.proc.pid} ready in "
+              f"{(time.perf_counter() - started) * 1000:.0f}ms "
+              f"({NODE_POOL_WARM} warm workers, {NODE_RUN_MEMORY_MB} MB per run)")
+
+    def alive(self):
+        return self.proc.poll() is None
+
+    def send(self, msg):
+        with self._write_lock:
+            self.commands.write((json.dumps(msg) + '\n').encode())
+            self.commands.flush()
+
+    def start_run(self, path):
+        run = PooledRun(self, next(_run_ids))
+        self.runs[run.run_id] = run
+        self.started_runs += 1
+        if self.started_runs >= NODE_POOL_RECYCLE_AFTER:
+            self.retiring = True
+        self.send({'t': 'run', 'id': run.run_id, 'path': path})
+        return run
+
+    def _parse(self, line):
+        """A frame from the node main thread, or None for anything else
+        (e.g. bytes a student's worker wrote to the control fd)."""
+        start = line.rfind(self.key)
+        if start == -1:
+            return None
+        try:
+            msg = json.loads(line[start + len(self.key):])
+        except ValueError:
+            return None
+        return msg if isinstance(msg, dict) else None
+
+    def _read_frames(self):
+        try:
+            for line in self.frames:
+                msg = self._parse(line)
+                if msg is None:
+                    _stats['badFrames'] += 1
+                    continue
+                try:
+                    self._handle_frame(msg)
+                except Exception as e:
+                    _stats['badFrames'] += 1
+                    print(f"[NODEPOOL] Dropped bad frame from pid={self.proc.pid}: {e}")
+        except Exception as e:
+            print(f"[NODEPOOL] Frame reader for pid={self.proc.pid} failed: {e}")
+        # Reader stopped (process exited or the pipe broke): the process is
+        # unusable, so fail whatever it was still running and replace it
+        crashed = not (self.retiring and not self.runs)
+        if crashed:
+            _stats['crashed'] += 1
+            print(f"[NODEPOOL] Process pid={self.proc.pid} lost with {len(self.runs)} active runs")
+        self.retiring = True
+        for run in list(self.runs.values()):
+            run._finish(-signal.SIGKILL)
+        self.runs.clear()
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.frames.close()
+        with self._write_lock:
+            try:
+                self.commands.close()
+            except OSError:
+                pass
+        if crashed and NODE_POOL_ENABLED:
+            try:
+                with _pool_lock:
+                    _get_process()
+            except Exception as e:
+                print(f"[NODEPOOL] Could not replace process: {e}")
+
+    def _handle_frame(self, msg):
+        run = self.runs.get(msg.get('id'))
+        if run is None:
+            return
+        if msg['t'] == 'out':
+            run._feed(run._out_w, base64.b64decode(msg['d']))
+        elif msg['t'] == 'err':
+            run._feed(run._err_w, base64.b64decode(msg['d']))
+        elif msg['t'] == 'exit':
+            del self.runs[run.run_id]
+            run._finish(-signal.SIGKILL if msg.get('oom') else msg['code'])
+            if self.retiring and not self.runs:
+                self._close()
+
+    def _close(self):
+        """Let the process exit once idle (command pipe EOF)."""
+        _stats['recycled'] += 1
+        with self._write_lock:
+            try:
+                self.commands.close()
+            except OSError:
+                pass
+
+
+class _RunStdin:
+    """Write end of a pooled run's stdin."""
+
+    def __init__(self, node, run_id):
+        self._node = node
+        self._run_id = run_id
+
+    def write(self, data):
+        self._node.send({'t': 'in', 'id': self._run_id,
+                         'd': base64.b64encode(data).decode()})
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self._node.send({'t': 'eof', 'id': self._run_id})
+
+
+class PooledRun:
+    """Popen-like handle for a run in a pool worker thread."""
+
+    def __init__(self, node, run_id):
+        self.run_id = run_id
+        self.pid = node.proc.pid
+        self.returncode = None
+        self.rusage = None
+        self._node = node
+        out_r, self._out_w = os.pipe()
+        err_r, self._err_w = os.pipe()
+        self.stdout = os.fdopen(out_r, 'rb', buffering=0)
+        self.stderr = os.fdopen(err_r, 'rb', buffering=0)
+        self.stdin = _RunStdin(node, run_id)
+        self._pending = queue.Queue()
+        self._exited = threading.Event()
+        threading.Thread(target=self._write_pipes, daemon=True).start()
+
+    def _feed(self, fd, data):
+        self._pending.put((fd, data))
+
+    def _finish(self, code):
+        self._pending.put((None, code))
+
+    def _write_pipes(self):
+        """Copy frames into the run's pipes (own thread, so a slow reader
+        never stalls the other runs of the process)."""
+        while True:
+            fd, data = self._pending.get()
+            if fd is None:
+                break
+            try:
+                while data:
+                    data = data[os.write(fd, data):]
+            except OSError:
+                pass
+        os.close(self._out_w)
+        os.close(self._err_w)
+        self.returncode = data
+        self._exited.set()
+
+    def poll(self):
+        return self.returncode if self._exited.is_set() else None
+
+    def wait(self, timeout=None):
+        if not self._exited.wait(timeout):
+            raise subprocess.TimeoutExpired('pooled node run', timeout)
+        return self.returncode
+
+    def kill(self):
+        if not self._exited.is_set():
+            try:
+                self._node.send({'t': 'kill', 'id': self.run_id})
+            except (OSError, ValueError):
+                pass
+
+
+def _get_process():
+    """Least busy live process, starting or replacing processes as needed.
+    Call with _pool_lock held."""
+    _processes[:] = [p for p in _processes if p.alive() and not p.retiring]
+    while len(_processes) < NODE_POOL_SIZE:
+        _processes.append(_NodeProcess())
+    return min(_processes, key=lambda p: len(p.runs))
+
+
+def warm():
+    """Start the pool processes now instead of on the first run."""
+    if NODE_POOL_ENABLED:
+        with _pool_lock:
+            _get_process()
+
+
+def spawn(path):
+    """
+    Run the JavaScript file at `path` in a pool worker.
+
+    Returns a PooledRun, or None if the pool is disabled or unavailable
+    (callers then fall back to a normal `node` subprocess).
+    """
+    if not NODE_POOL_ENABLED:
+        return None
+    try:
+        with _pool_lock:
+            run = _get_process().start_run(path)
+    except Exception as e:
+        print(f"[NODEPOOL] Unavailable, falling back to subprocess - {e}")
+        return None
+    _stats['runs'] += 1
+    return run
+
+
+def stats():
+    with _pool_lock:
+        active = sum(len(p.runs) for p in _processes)
+    return dict(_stats, processes=len(_processes), activeRuns=active)
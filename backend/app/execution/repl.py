@@ -0,0 +1,428 @@
+"""
+Persistent REPL Sessions
+
+Optional execution mode where each user keeps one long-lived Python
+interpreter. Snippets are executed incrementally in the same namespace, so
+imports and setup survive between runs. Output is streamed through the same
+on_output(text, is_error) / on_done(exit_code) callbacks as start_interactive.
+
+The interpreter runs a small driver (_DRIVER below) that reads one framed
+snippet per line from stdin and answers with a DONE marker on both stdout and
+stderr. Anything else on stdin is left for the user's input() calls. The
+marker carries a random per-session nonce, sent as the first stdin line (not
+on the command line) and kept only in a local of the driver loop, so it is
+in no module or namespace a program can import: printing a DONE-looking
+line can't end a snippet early. It is not a security boundary (a program
+walking interpreter frames can still find it). SIGINT is ignored while the
+driver is idle.
+
+Sessions are evicted after REPL_IDLE_TIMEOUT seconds without use, and when
+their peak memory exceeds REPL_MEMORY_LIMIT_MB.
+"""
+
+import os
+import sys
+import json
+import time
+import codecs
+import secrets
+import signal
+import asyncio
+
+# Idle sessions are killed after this many seconds
+REPL_IDLE_TIMEOUT = int(os.environ.get('REPL_IDLE_TIMEOUT', 600))
+
+# Address-space cap applied inside the interpreter, and peak RSS that evicts it
+REPL_MEMORY_LIMIT_MB = int(os.environ.get('REPL_MEMORY_LIMIT_MB', 512))
+
+# Seconds to wait for a freshly spawned interpreter to become ready
+REPL_START_TIMEOUT = 10
+
+_MARK = '\x00'
+_EXEC_PREFIX = _MARK + 'EXEC '
+_DONE_PREFIX = _MARK + 'DONE '
+_READY_PREFIX = _MARK + 'READY'
+
+# Driver program run inside each REPL interpreter
+_DRIVER = r'''
+import sys, time, json, ast, signal, builtins, traceback
+
+_limit_mb = int(sys.argv[1])
+if _limit_mb > 0:
+    try:
+        import resource
+        _limit = _limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (_limit, _limit))
+    except Exception:
+        pass
+
+_ns = {"__name__": "__main__", "__builtins__": builtins}
+_costs = {}
+_state = {"depth": 0, "saved": 0.0}
+_orig_import = builtins.__import__
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Remember what each first-time import cost, and credit that cost as
+    # "saved" whenever a later snippet imports an already-loaded module.
+    if level or _state["depth"]:
+        return _orig_import(name, globals, locals, fromlist, level)
+    if name in sys.modules:
+        _state["saved"] += _costs.get(name, 0.0)
+        return _orig_import(name, globals, locals, fromlist, level)
+    _state["depth"] += 1
+    start = time.perf_counter()
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        _state["depth"] -= 1
+        _costs[name] = time.perf_counter() - start
+
+builtins.__import__ = _timed_import
+
+def _peak_rss_kb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss // 1024 if sys.platform == "darwin" else rss
+    except Exception:
+        return 0
+
+def _run(code):
+    tree = ast.parse(code, "<repl>", "exec")
+    last = None
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+    exec(compile(tree, "<repl>", "exec"), _ns)
+    if last is not None:
+        value = eval(compile(last, "<repl>", "eval"), _ns)
+        if value is not None:
+            print(repr(value))
+
+def _done(ok, done_prefix):
+    marker = done_prefix + json.dumps({
+        "ok": ok,
+        "importSaved": _state["saved"],
+        "peakRssKb": _peak_rss_kb(),
+    }) + "\n"
+    _state["saved"] = 0.0
+    sys.stdout.flush(); sys.stderr.flush()
+    sys.__stdout__.write(marker); sys.__stdout__.flush()
+    sys.__stderr__.write(marker); sys.__stderr__.flush()
+
+def _serve():
+    # The nonce stays a local here, out of every importable namespace
+    done_prefix = "\x00DONE " + sys.stdin.readline().strip() + " "
+    sys.__stdout__.write("\x00READY\n"); sys.__stdout__.flush()
+    while True:
+        # A stop that arrives after the snippet finished must not kill the REPL
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        line = sys.stdin.readline()
+        if not line:
+            break
+        if not line.startswith("\x00EXEC "):
+            continue  # stray input typed after a snippet finished
+        ok = True
+        error = None
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        try:
+            _run(json.loads(line[6:]))
+        except SystemExit:
+            pass
+        except BaseException:
+            ok = False
+            error = sys.exc_info()
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        if error:
+            etype, value, tb = error
+            # Hide the driver's own frames from the student's traceback
+            while tb is not None and tb.tb_frame.f_code.co_filename != "<repl>":
+                tb = tb.tb_next
+            traceback.print_exception(etype, value, tb)
+            error = tb = None
+        _done(ok, done_prefix)
+
+_serve()
+'''
+
+# Active sessions: {session_id: {id, proc, readers, on_output, done, started_at,
+#                                last_used, runs, startup_time, saved}}
+repl_sessions = {}
+
+_reaper_task = None
+
+
+def _preexec():
+    """Put the interpreter in its own process group so SIGINT only hits it."""
+    os.setpgrp()
+
+
+async def _spawn(session_id):
+    """Start a REPL interpreter and wait until the driver reports ready."""
+    started = time.perf_counter()
+    kwargs = {}
+    if sys.platform != 'win32':
+        kwargs['preexec_fn'] = _preexec
+
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, '-u', '-c', _DRIVER, str(REPL_MEMORY_LIMIT_MB),
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        **kwargs
+    )
+
+    nonce = secrets.token_hex(16)
+    proc.stdin.write((nonce + '\n').encode('ascii'))
+    await proc.stdin.drain()
+
+    ready = await asyncio.wait_for(proc.stdout.readline(), timeout=REPL_START_TIMEOUT)
+    if not ready.decode('utf-8', errors='replace').startswith(_READY_PREFIX):
+        proc.kill()
+        raise RuntimeError('REPL interpreter failed to start')
+
+    session = {
+        'id': session_id,
+        'proc': proc,
+        'done_prefix': _DONE_PREFIX + nonce + ' ',
+        'on_output': None,
+        'done': None,
+        'pending_markers': 0,
+        'last_marker': None,
+        'started_at': time.time(),
+        'last_used': time.time(),
+        'runs': 0,
+        'startup_time': time.perf_counter() - started,
+        'saved': 0.0,
+    }
+    session['readers'] = [
+        asyncio.create_task(_read_stream(session, proc.stdout, False)),
+        asyncio.create_task(_read_stream(session, proc.stderr, True)),
+    ]
+    repl_sessions[session_id] = session
+    _ensure_reaper()
+    print(f"[REPL] Started interpreter pid={proc.pid} for {session_id} "
+          f"in {session['startup_time'] * 1000:.0f}ms")
+    return session
+
+
+async def _read_stream(session, stream, is_error):
+    """Forward a pipe to the session's current on_output, watching for DONE markers."""
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    pending = ''
+    while True:
+        data = await stream.read(4096)
+        if not data:
+            break
+        pending += decoder.decode(data)
+        while pending:
+            idx = pending.find(_MARK)
+            if idx == -1:
+                text, pending = pending, ''
+            elif idx > 0:
+                text, pending = pending[:idx], pending[idx:]
+            else:
+                end = pending.find('\n')
+                if end == -1:
+                    break  # wait for the rest of the marker line
+                line, pending = pending[:end], pending[end + 1:]
+                if line.startswith(session['done_prefix']):
+                    _marker_seen(session, line[len(session['done_prefix']):])
+                    continue
+                text = line + '\n'
+            if text and session['on_output']:
+                await session['on_output'](text, is_error)
+
+    # Interpreter exited (crash, kill or memory limit) — release any waiter
+    done = session.get('done')
+    if done and not done.done():
+        done.set_result(None)
+
+
+def _marker_seen(session, payload):
+    """Count DONE markers; the snippet is finished once both streams have one."""
+    try:
+        session['last_marker'] = json.loads(payload)
+    except ValueError:
+        pass
+    session['pending_markers'] -= 1
+    done = session.get('done')
+    if session['pending_markers'] <= 0 and done and not done.done():
+        done.set_result(session['last_marker'])
+
+
+async def execute_repl(code: str, session_id: str, timeout: int = 30,
+                       on_output=None, on_done=None):
+    """
+    Run a snippet in the user's persistent interpreter, starting one if needed.
+    Output is streamed via on_output; on_done is called with the exit code
+    (0 on success, 1 on an exception, -1 if the interpreter had to be killed).
+    """
+    session = repl_sessions.get(session_id)
+    if session and session['done'] is not None:
+        if on_output:
+            await on_output("A snippet is already running in this REPL.\n", True)
+        if on_done:
+            await on_done(1)
+        return 1
+
+    try:
+        if session is None or session['proc'].returncode is not None:
+            session = await _spawn(session_id)
+        else:
+            # Every reuse skips one interpreter startup
+            session['saved'] += session['startup_time']
+    except Exception as e:
+        print(f"[REPL] Failed to start interpreter for {session_id}: {e}")
+        if on_output:
+            await on_output(f"Error: {str(e)}\n", True)
+        if on_done:
+            await on_done(1)
+        return 1
+
+    loop = asyncio.get_event_loop()
+    session['on_output'] = on_output
+    session['done'] = loop.create_future()
+    session['pending_markers'] = 2
+    session['last_used'] = time.time()
+    session['runs'] += 1
+
+    proc = session['proc']
+    try:
+        proc.stdin.write((_EXEC_PREFIX + json.dumps(code) + '\n').encode('utf-8'))
+        await proc.stdin.drain()
+    except (BrokenPipeError, ConnectionResetError) as e:
+        # Interpreter died since its last snippet — drop it, the next run respawns
+        print(f"[REPL] Interpreter for {session_id} is gone: {e}")
+        session['on_output'] = None
+        session['done'] = None
+        await close_repl(session['id'])
+        if on_output:
+            await on_output("REPL interpreter stopped — state was reset, run again\n", True)
+        if on_done:
+            await on_done(-1)
+        return -1
+
+    try:
+        marker = await asyncio.wait_for(asyncio.shield(session['done']), timeout=timeout)
+    except asyncio.TimeoutError:
+        marker = None
+        if on_output:
+            await on_output("\n⏱ Execution timed out — REPL state was reset\n", True)
+
+    session['on_output'] = None
+    session['done'] = None
+    session['last_used'] = time.time()
+
+    if marker is None:
+        # Timed out, crashed or was stopped — the interpreter can't be trusted
+        exit_code = -1
+        await close_repl(session['id'])
+    else:
+        exit_code = 0 if marker.get('ok') else 1
+        session['saved'] += marker.get('importSaved', 0.0)
+        if REPL_MEMORY_LIMIT_MB and marker.get('peakRssKb', 0) > REPL_MEMORY_LIMIT_MB * 1024:
+            if on_output:
+                await on_output("\nREPL exceeded its memory limit — state was reset\n", True)
+            await close_repl(session['id'])
+
+    if on_done:
+        await on_done(exit_code)
+    return exit_code
+
+
+def rename_repl(old_id: str, new_id: str):
+    """Move a REPL to a new session id (client reconnected)."""
+    session = repl_sessions.pop(old_id, None)
+    if session:
+        session['id'] = new_id
+        repl_sessions[new_id] = session
+
+
+def is_repl_busy(session_id: str):
+    """True if a snippet is currently running in this user's REPL."""
+    session = repl_sessions.get(session_id)
+    return bool(session and session['done'] is not None)
+
+
+async def send_repl_input(session_id: str, text: str, newline: bool = True):
+    """Send a line of input (or a piece of a paste) to the snippet running in a REPL."""
+    session = repl_sessions.get(session_id)
+    if not session or session['proc'].returncode is not None:
+        return False
+    try:
+        session['proc'].stdin.write((text + '\n' if newline else text).encode('utf-8'))
+        await session['proc'].stdin.drain()
+        return True
+    except Exception as e:
+        print(f"[REPL] Error sending input: {e}")
+        return False
+
+
+async def interrupt_repl(session_id: str):
+    """Interrupt the running snippet, keeping the session state when possible."""
+    session = repl_sessions.get(session_id)
+    if not session or session['done'] is None:
+        return
+    if sys.platform != 'win32' and session['proc'].returncode is None:
+        # KeyboardInterrupt inside the snippet; the driver reports it and stays alive
+        session['proc'].send_signal(signal.SIGINT)
+    else:
+        await close_repl(session_id)
+
+
+async def reset_repl(session_id: str):
+    """Drop the user's interpreter; the next snippet starts from a clean state."""
+    await close_repl(session_id)
+    print(f"[REPL] Reset session {session_id}")
+
+
+async def close_repl(session_id: str):
+    """Kill a REPL interpreter and forget the session."""
+    session = repl_sessions.pop(session_id, None)
+    if not session:
+        return
+    proc = session['proc']
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except Exception:
+            pass
+        await proc.wait()
+    for reader in session['readers']:
+        reader.cancel()
+    done = session.get('done')
+    if done and not done.done():
+        done.set_result(None)
+    print(f"[REPL] Closed session {session_id} after {session['runs']} runs, "
+          f"saved {session['saved']:.2f}s of startup/import time")
+
+
+def repl_stats(session_id: str):
+    """Startup/import time saved so far by a user's persistent interpreter."""
+    session = repl_sessions.get(session_id)
+    if not session:
+        return None
+    return {
+        'runs': session['runs'],
+        'startupTime': round(session['startup_time'], 4),
+        'savedTime': round(session['saved'], 4),
+        'idleFor': round(time.time() - session['last_used'], 1),
+    }
+
+
+def _ensure_reaper():
+    """Start the idle-eviction loop the first time a session is created."""
+    global _reaper_task
+    if _reaper_task is None or _reaper_task.done():
+        _reaper_task = asyncio.create_task(_reap_idle())
+
+
+async def _reap_idle():
+    """Periodically close sessions idle for longer than REPL_IDLE_TIMEOUT."""
+    while repl_sessions:
+        await asyncio.sleep(min(60, max(1, REPL_IDLE_TIMEOUT // 4)))
+        now = time.time()
+        for session_id, session in list(repl_sessions.items()):
+            if session['done'] is None and now - session['last_used'] > REPL_IDLE_TIMEOUT:
+                print(f"[REPL] Evicting idle session {session_id}")
+                await close_repl(session_id)
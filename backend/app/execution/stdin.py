@@ -0,0 +1,153 @@
+"""
+Stdin Channels
+
+Buffered, non-blocking stdin for interactive runs. Each run gets a
+StdinChannel as soon as it is requested, before its process exists, so
+input typed while the process is still starting is kept rather than lost.
+
+code_input appends to the channel's in-memory buffer and returns at once; a
+writer thread per channel copies the buffer to the process's stdin in order,
+STDIN_WRITE_CHUNK bytes at a time. A program that is not reading fills the
+pipe and blocks that thread, never the event loop. The buffer is bounded by
+STDIN_BUFFER_BYTES: writes that don't fit are refused, and every write
+reports how much is still buffered so clients can pace large pastes.
+
+close() ends stdin (EOF, what Ctrl-D does in a terminal) once everything
+buffered has been written. A channel is discarded with its run; whatever
+the program never read is dropped.
+
+Works with any stdin that has write/flush/close: Popen pipes, the fork
+server's pipes and pooled Node runs (_RunStdin).
+"""
+
+import os
+import threading
+from collections import deque
+
+STDIN_BUFFER_BYTES = int(os.environ.get('STDIN_BUFFER_BYTES', 1024 * 1024))
+STDIN_WRITE_CHUNK = 64 * 1024
+
+# {session_id: StdinChannel} for runs that are starting or running
+channels = {}
+
+_stats = {'channels': 0, 'bytesWritten': 0, 'writesRefused': 0, 'eofs': 0}
+
+
+class StdinChannel:
+    """Ordered, bounded stdin buffer for one run."""
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.buffered = 0
+        self.written = 0
+        self._chunks = deque()
+        self._cond = threading.Condition()
+        self._pipe = None
+        self._eof = False
+        self._discarded = False
+
+    @property
+    def accepting(self):
+        return not (self._eof or self._discarded)
+
+    def attach(self, pipe):
+        """Start feeding the process's stdin, buffered input first."""
+        with self._cond:
+            if self._discarded or self._pipe is not None:
+                return
+            self._pipe = pipe
+        threading.Thread(target=self._write_pipe, daemon=True).start()
+
+    def write(self, data):
+        """Queue bytes for the process. Returns False if they don't fit or stdin is closed."""
+        with self._cond:
+            if not self.accepting:
+                return False
+            if self.buffered + len(data) > STDIN_BUFFER_BYTES:
+                _stats['writesRefused'] += 1
+                return False
+            for start in range(0, len(data), STDIN_WRITE_CHUNK):
+                self._chunks.append(data[start:start + STDIN_WRITE_CHUNK])
+            self.buffered += len(data)
+            self._cond.notify()
+        return True
+
+    def close(self):
+        """Send EOF once the buffered input has been written."""
+        with self._cond:
+            if not self.accepting:
+                return False
+            self._eof = True
+            self._cond.notify()
+        _stats['eofs'] += 1
+        return True
+
+    def discard(self):
+        """Drop unwritten input and stop the writer (the run is over)."""
+        with self._cond:
+            self._discarded = True
+            self._chunks.clear()
+            self.buffered = 0
+            self._cond.notify()
+
+    def _write_pipe(self):
+        """Writer thread: copy chunks to the pipe in order, then EOF if asked."""
+        pipe = self._pipe
+        while True:
+            with self._cond:
+                while not (self._chunks or self._eof or self._discarded):
+                    self._cond.wait()
+                if self._discarded:
+                    return
+                if not self._chunks:
+                    break
+                data = self._chunks[0]
+            try:
+                view = memoryview(data)
+                while view:
+                    view = view[pipe.write(view):]
+                pipe.flush()
+            except (OSError, ValueError):
+                # The process exited or closed its stdin
+                self.discard()
+                return
+            with self._cond:
+                if self._chunks and self._chunks[0] is data:
+                    self._chunks.popleft()
+                    self.buffered -= len(data)
+                self.written += len(data)
+            _stats['bytesWritten'] += len(data)
+        try:
+            pipe.close()
+        except (OSError, ValueError):
+            pass
+
+
+def open_channel(session_id):
+    """New channel for a run that is about to start, replacing any earlier one."""
+    old = channels.pop(session_id, None)
+    if old:
+        old.discard()
+    channel = channels[session_id] = StdinChannel(session_id)
+    _stats['channels'] += 1
+    return channel
+
+
+def discard_channel(channel):
+    """Discard a run's channel and forget it (if it is still registered)."""
+    channel.discard()
+    if channels.get(channel.session_id) is channel:
+        del channels[channel.session_id]
+
+
+def rename_channel(old_id, new_id):
+    """Move a channel to a new session id (client reconnected)."""
+    channel = channels.pop(old_id, None)
+    if channel:
+        channel.session_id = new_id
+        channels[new_id] = channel
+
+
+def stats():
+    return dict(_stats, open=len(channels),
+                buffered=sum(c.buffered for c in channels.values()))
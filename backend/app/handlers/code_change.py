@@ -3,8 +3,25 @@ Code Change Event Handler
 
 Handles the code_change event for the classroom coding platform.
 Receives code updates from students and syncs them to the teacher.
+Each update is also queued for syntax analysis; diagnostics are pushed to
+the student and a per-student error summary to the teacher.
+In overload mode (see admission.py) teacher updates are batched and the
+background analysis/similarity work is skipped. The teacher only gets the
+full code for students they have on screen, a summary for the others
+(see subscriptions.py).
 """
 
+import time
+import asyncio
+
+from app.analysis.analysis import analyze
+from app.session.session import emit_to
+from app.history.history import record_code
+from app.outbound.outbound import send
+from app.similarity.similarity import schedule_update
+from app.admission.admission import forward_code_update, is_overloaded
+from app.subscriptions.subscriptions import publish_code
+
 
 async def handle_code_change(sid, sio, rooms, data):
     """
@@ -37,15 +54,56 @@ async def handle_code_change(sid, sio, rooms, data):
         print(f'[CODE_CHANGE] Ignored: Socket {sid} is not a student in room {room_id}')
         return
     
-    # Update student's code in room state
+    # Update student's code in room state and history timeline
     room['students'][sid]['code'] = code
+    room['students'][sid]['lastEdit'] = time.time()
+    record_code(room_id, sid, code)
+    overloaded = is_overloaded()
+    if not overloaded:
+        schedule_update(room_id, sid, code)
     
     # Get teacher socket ID
     teacher_socket_id = room['teacher']
     
-    # Emit code_update event to teacher socket only with studentId and code
-    await sio.emit('code_update', 
-                  {'studentId': sid, 'code': code}, 
-                  to=teacher_socket_id)
+    # Queue code_update (or a summary) for the teacher only; a newer one
+    # supersedes it, and full updates are batched while overloaded
+    publish_code(sio, teacher_socket_id, sid, room['students'][sid], forward_code_update)
     
     print(f'[CODE_CHANGE] Student {sid} updated code in room {room_id}')
+    
+    # Analyze in the background so the keystroke path is not delayed
+    language = data.get('language')
+    if language and not overloaded:
+        asyncio.create_task(_analyze_and_push(sid, sio, room, code, language))
+
+
+async def _analyze_and_push(sid, sio, room, code, language):
+    """Analyze code and push diagnostics if it is still the student's latest code."""
+    result = await analyze(code, language)
+    student = room['students'].get(sid)
+    if student is None or student.get('code') != code or result['ok'] is None:
+        return
+    
+    diagnostics = result['diagnostics']
+    error_count = sum(1 for d in diagnostics if d['severity'] == 'error')
+    warning_count = len(diagnostics) - error_count
+    
+    if diagnostics != student.get('diagnostics'):
+        await emit_to(sio, sid, 'code_diagnostics',
+                      {'ok': result['ok'], 'diagnostics': diagnostics})
+    
+    # Only tell the teacher when this student's error state changes
+    summary = (error_count, warning_count)
+    previous = (student.get('errorCount', 0), student.get('warningCount', 0))
+    student['diagnostics'] = diagnostics
+    student['errorCount'] = error_count
+    student['warningCount'] = warning_count
+    if summary != previous:
+        send(sio, room['teacher'], 'student_diagnostics', {
+            'studentId': sid,
+            'errorCount': error_count,
+            'warningCount': warning_count,
+            'studentsWithErrors': sum(
+                1 for s in room['students'].values() if s.get('errorCount')
+            )
+        })
@@ -0,0 +1,86 @@
+"""
+Code History Event Handlers
+
+Handles the get_history and get_revision events for the classroom coding
+platform. Lets teachers list and scrub through a student's code revisions.
+"""
+
+from app.history.history import get_history, get_revision
+
+
+def _teacher_student(sid, rooms, data, tag):
+    """Validate a teacher request for one student. Returns (room_id, room, error)."""
+    room_id = data.get('roomId')
+    student_id = data.get('studentId')
+
+    if not room_id or not student_id:
+        print(f'[{tag}] Error: Missing roomId or studentId from socket {sid}')
+        return None, None, {'error': 'Missing roomId or studentId'}
+
+    if room_id not in rooms:
+        print(f'[{tag}] Error: Room {room_id} does not exist')
+        return None, None, {'error': 'Room not found'}
+
+    room = rooms[room_id]
+    if sid != room['teacher']:
+        print(f'[{tag}] Ignored: Socket {sid} is not the teacher in room {room_id}')
+        return None, None, {'error': 'Not allowed'}
+
+    return room_id, room, None
+
+
+async def handle_get_history(sid, sio, rooms, data):
+    """
+    Handle get_history event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing roomId and studentId
+
+    Returns:
+        {'revisions': [{rev, timestamp}]} or error dict (for callback support)
+    """
+    room_id, room, error = _teacher_student(sid, rooms, data, 'GET_HISTORY')
+    if error:
+        return error
+
+    student_id = data['studentId']
+    student = room['students'].get(student_id)
+    current_code = student.get('code', '') if student else None
+    revisions = get_history(room_id, student_id, current_code)
+
+    print(f'[GET_HISTORY] Teacher {sid} listed {len(revisions)} revisions of student {student_id}')
+    return {'revisions': revisions}
+
+
+async def handle_get_revision(sid, sio, rooms, data):
+    """
+    Handle get_revision event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing roomId, studentId and either rev or timestamp
+
+    Returns:
+        {rev, timestamp, code} or error dict (for callback support)
+    """
+    room_id, room, error = _teacher_student(sid, rooms, data, 'GET_REVISION')
+    if error:
+        return error
+
+    rev, timestamp = data.get('rev'), data.get('timestamp')
+    try:
+        rev = int(rev) if rev is not None else None
+        timestamp = float(timestamp) if timestamp is not None else None
+    except (TypeError, ValueError):
+        print(f'[GET_REVISION] Error: Invalid rev or timestamp from socket {sid}')
+        return {'error': 'Invalid rev or timestamp'}
+
+    revision = get_revision(room_id, data['studentId'], rev=rev, timestamp=timestamp)
+    if revision is None:
+        return {'error': 'Revision not found'}
+    return revision
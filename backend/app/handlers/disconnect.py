@@ -5,6 +5,14 @@ Handles the disconnect event for the classroom coding platform.
 Manages cleanup when students or teachers disconnect from rooms.
 """
 
+from app.handlers.timer import cancel_room_timer
+from app.session.session import emit_room
+from app.history.history import close_room_history
+from app.outbound.outbound import send
+from app.similarity.similarity import remove_student, drop_room
+from app.telemetry import telemetry
+from app.subscriptions import subscriptions
+
 
 async def handle_disconnect(sid, sio, rooms):
     """
@@ -52,7 +60,12 @@ async def handle_disconnect(sid, sio, rooms):
             await sio.disconnect(student_id)
         
         # Delete room from rooms dict
+        close_room_history(room_id, room)
+        drop_room(room_id)
+        telemetry.drop_room(room_id)
+        subscriptions.drop_teacher(sid)
         del rooms[room_id]
+        cancel_room_timer(room_id)
         
         print(f'[DISCONNECT] Room {room_id} deleted')
     
@@ -73,15 +86,15 @@ async def handle_disconnect(sid, sio, rooms):
         
         # Remove student from students dict
         del room['students'][sid]
+        remove_student(room_id, sid)
+        subscriptions.remove_student(room['teacher'], sid)
         
         # Emit student_list_update to teacher
         teacher_socket_id = room['teacher']
-        await sio.emit('student_list_update', 
-                      {'students': room['students']}, 
-                      to=teacher_socket_id)
+        send(sio, teacher_socket_id, 'student_list_update',
+             subscriptions.roster(teacher_socket_id, room['students']))
         
         # Broadcast main_view_update if mainView was reset
         if main_view_reset:
-            await sio.emit('main_view_update', 
-                          {'type': 'teacher', 'studentId': None}, 
-                          room=room_id)
+            await emit_room(sio, room, room_id, 'main_view_update',
+                            {'type': 'teacher', 'studentId': None})
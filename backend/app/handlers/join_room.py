@@ -3,8 +3,27 @@ Join Room Event Handler
 
 Handles the join_room event for the classroom coding platform.
 Creates rooms, assigns roles (teacher/student), and manages room state.
+Students that rejoin with a valid session token resume their previous
+session instead of joining from scratch. New rooms and new students are
+subject to the node's room and per-room student caps (admission.py).
+In sharding mode a join for a room this shard does not own is rejected,
+so one class is never split across two workers.
 """
 
+from app.session.session import (
+    create_session, resume, missed_events, drop_session, emit_to, is_connected
+)
+from app.execution.execution import rename_session
+from app.execution.repl import rename_repl
+from app.history.history import rename_student
+from app.similarity import similarity
+from app.telemetry import telemetry
+from app.output import output
+from app.subscriptions import subscriptions
+from app.outbound.outbound import send
+from app.admission.admission import check_join
+from app.sharding import sharding
+
 
 async def handle_join_room(sid, sio, rooms, data):
     """
@@ -26,6 +45,31 @@ async def handle_join_room(sid, sio, rooms, data):
         print(f'[JOIN_ROOM] Error: No roomId provided by socket {sid}')
         return
     
+    # Wrong shard (client connected without ?roomId=) — never host the room here
+    if sharding.is_sharded() and not sharding.owns(room_id):
+        owner = sharding.shard_for(room_id)
+        print(f'[JOIN_ROOM] Rejected socket {sid}: room {room_id} belongs to shard {owner}, '
+              f'not {sharding.SHARD_INDEX}')
+        await sio.emit('join_rejected', {
+            'reason': 'Connected to the wrong server for this session. Please rejoin.',
+            'shard': owner
+        }, to=sid)
+        return
+    
+    # Reconnecting student with a session token — resume instead of rejoining
+    session_token = data.get('sessionToken')
+    if session_token and room_id in rooms:
+        if await _resume_student(sid, sio, rooms, room_id, session_token,
+                                 data.get('lastSeq', 0)):
+            return
+    
+    # Room/student caps (resumed sessions above are already counted)
+    reason = check_join(rooms, room_id)
+    if reason:
+        print(f'[JOIN_ROOM] Rejected socket {sid} for room {room_id}: {reason}')
+        await sio.emit('join_rejected', {'reason': reason}, to=sid)
+        return
+    
     # Check if room exists in rooms dictionary
     if room_id not in rooms:
         # Room doesn't exist - create new room with teacher role
@@ -59,8 +103,19 @@ async def handle_join_room(sid, sio, rooms, data):
         # Join socket to Socket.io room
         await sio.enter_room(sid, room_id)
         
-        # Emit role_assigned event to socket with student role
-        await sio.emit('role_assigned', {'role': 'student'}, to=sid)
+        # Emit role_assigned event to socket with student role and a
+        # session token the client uses to resume after a reconnect
+        token = create_session(room_id, sid)
+        await sio.emit('role_assigned', {'role': 'student', 'sessionToken': token}, to=sid)
+        
+        # Late joiner: show the teacher's latest run output (live chunks follow)
+        teacher_output = rooms[room_id].get('teacherOutput')
+        if teacher_output:
+            await emit_to(sio, sid, 'teacher_output', {
+                'output': teacher_output['output'].text(),
+                'error': teacher_output['error'],
+                'outputInfo': teacher_output['output'].info()
+            })
         
         # Note: Teacher's current code will be sent by the teacher's frontend
         # when it detects a new student joined (via student count change).
@@ -68,12 +123,78 @@ async def handle_join_room(sid, sio, rooms, data):
         
         # Emit student_list_update to teacher socket with all students
         teacher_socket_id = rooms[room_id]['teacher']
-        student_list_data = {'students': rooms[room_id]['students']}
+        student_list_data = subscriptions.roster(teacher_socket_id, rooms[room_id]['students'])
         
         print(f'[JOIN_ROOM] Emitting student_list_update to teacher {teacher_socket_id}')
         print(f'[JOIN_ROOM] Student list data: {student_list_data}')
         
-        await sio.emit('student_list_update', student_list_data, to=teacher_socket_id)
+        send(sio, teacher_socket_id, 'student_list_update', student_list_data)
         
         print(f'[JOIN_ROOM] Student {sid} (name: "{student_name}") joined room {room_id}. Total students: {len(rooms[room_id]["students"])}')
         print(f'[JOIN_ROOM] Current students in room: {rooms[room_id]["students"]}')
+
+
+async def _resume_student(sid, sio, rooms, room_id, token, last_seq):
+    """
+    Move a student's session, room entry and running execution onto a new sid
+    and replay the events they missed.
+
+    Returns False if the token can't be resumed (caller does a normal join).
+    """
+    # lastSeq comes from the client; replay everything if it is unusable
+    try:
+        last_seq = max(0, int(last_seq or 0))
+    except (TypeError, ValueError, OverflowError):
+        print(f'[JOIN_ROOM] Invalid lastSeq from socket {sid}, replaying all buffered events')
+        last_seq = 0
+    
+    room = rooms[room_id]
+    # Same student opened a second connection: the old socket is retired below
+    was_connected = is_connected(token)
+    old_sid = resume(token, room_id, sid)
+    if old_sid is None:
+        return False
+    if old_sid not in room['students']:
+        # Session outlived its room entry — start over
+        drop_session(token)
+        return False
+    
+    if old_sid != sid:
+        student = room['students'].pop(old_sid)
+        room['students'][sid] = student
+        if room['mainView'].get('studentId') == old_sid:
+            room['mainView']['studentId'] = sid
+        rename_session(old_sid, sid)
+        rename_repl(old_sid, sid)
+        rename_student(room_id, old_sid, sid)
+        similarity.rename_student(room_id, old_sid, sid)
+        telemetry.rename_student(room_id, old_sid, sid)
+        output.rename_owner(old_sid, sid)
+        subscriptions.rename_student(room['teacher'], old_sid, sid)
+    room['students'][sid]['connected'] = True
+    
+    if was_connected and old_sid != sid:
+        # Don't leave the old socket in the room, receiving this student's events
+        print(f'[JOIN_ROOM] Disconnecting superseded socket {old_sid}')
+        try:
+            await sio.disconnect(old_sid)
+        except Exception:
+            pass
+    
+    await sio.enter_room(sid, room_id)
+    
+    missed = missed_events(token, last_seq)
+    await sio.emit('session_resumed', {
+        'role': 'student',
+        'sessionToken': token,
+        'missed': len(missed)
+    }, to=sid)
+    for event, payload in missed:
+        await sio.emit(event, payload, to=sid)
+    
+    # One small event instead of a full student_list_update
+    send(sio, room['teacher'], 'student_reconnected',
+         {'oldId': old_sid, 'newId': sid})
+    
+    print(f'[JOIN_ROOM] Student {old_sid} resumed as {sid} in room {room_id}, replayed {len(missed)} events')
+    return True
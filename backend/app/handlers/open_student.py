@@ -53,5 +53,6 @@ async def handle_open_student(sid, sio, rooms, data):
     return {
         'name': student_data['name'],
         'code': student_data['code'],
-        'output': student_data['output']
+        'output': student_data['output'],
+        'outputInfo': student_data.get('outputInfo')
     }
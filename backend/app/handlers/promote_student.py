@@ -5,6 +5,8 @@ Handles the promote_student event for the classroom coding platform.
 Allows teachers to promote a student's code to the main view.
 """
 
+from app.session.session import emit_room
+
 
 async def handle_promote_student(sid, sio, rooms, data):
     """
@@ -44,8 +46,7 @@ async def handle_promote_student(sid, sio, rooms, data):
     }
     
     # Broadcast main_view_update to all sockets in room
-    await sio.emit('main_view_update', 
-                  {'type': 'student', 'studentId': student_id}, 
-                  room=room_id)
+    await emit_room(sio, room, room_id, 'main_view_update',
+                    {'type': 'student', 'studentId': student_id})
     
     print(f'[PROMOTE_STUDENT] Teacher {sid} promoted student {student_id} in room {room_id}')
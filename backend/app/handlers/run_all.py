@@ -0,0 +1,112 @@
+"""
+Run All Event Handler
+
+Handles the run_all event for the classroom coding platform.
+Lets the teacher grade every student's current code against the same
+stdin/expected-stdout test cases and streams results back as they finish.
+"""
+
+import asyncio
+
+from app.execution.grading import run_batch, DEFAULT_MAX_WORKERS
+
+# Limits on what a teacher can ask for in one batch
+MAX_CASES = 100
+MAX_TIMEOUT = 30
+LANGUAGES = ('python', 'javascript', 'js')
+
+
+def _validate(data):
+    """
+    Check run_all options.
+
+    Returns (cases, timeout, language, max_workers), or an error string.
+    """
+    cases = data.get('cases')
+    if not isinstance(cases, list) or not cases:
+        return 'cases must be a non-empty list'
+    if len(cases) > MAX_CASES:
+        return f'At most {MAX_CASES} cases per run'
+    for case in cases:
+        if not isinstance(case, dict):
+            return 'Each case must be an object with stdin and expected'
+        for key in ('stdin', 'expected'):
+            if not isinstance(case.get(key, ''), str):
+                return f'Case {key} must be a string'
+    try:
+        timeout = float(data.get('timeout', 10))
+        max_workers = int(data.get('maxWorkers', DEFAULT_MAX_WORKERS))
+    except (TypeError, ValueError):
+        return 'timeout and maxWorkers must be numbers'
+    if not 0 < timeout <= MAX_TIMEOUT:
+        return f'timeout must be between 0 and {MAX_TIMEOUT} seconds'
+    language = data.get('language', 'python')
+    if language not in LANGUAGES:
+        return f'Unsupported language: {language}'
+    return cases, timeout, language, min(max(1, max_workers), DEFAULT_MAX_WORKERS)
+
+
+async def handle_run_all(sid, sio, rooms, data):
+    """
+    Handle run_all event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing roomId, cases [{stdin, expected}],
+              and optional timeout, language and maxWorkers
+
+    Returns:
+        {'students', 'cases'} once grading has started (results follow as
+        run_all_result / run_all_done events), or {'error': ...}
+    """
+    if not isinstance(data, dict):
+        return {'error': 'Invalid request'}
+    room_id = data.get('roomId')
+
+    # Validate room exists
+    if room_id not in rooms:
+        print(f'[RUN_ALL] Error: Room {room_id} does not exist')
+        return {'error': 'Room not found'}
+
+    room = rooms[room_id]
+
+    # Validate socket is the teacher
+    if sid != room['teacher']:
+        print(f'[RUN_ALL] Ignored: Socket {sid} is not the teacher in room {room_id}')
+        return {'error': 'Only the teacher can run all'}
+
+    options = _validate(data)
+    if isinstance(options, str):
+        print(f'[RUN_ALL] Error: {options} from socket {sid}')
+        return {'error': options}
+    cases, timeout, language, max_workers = options
+
+    # Snapshot codes now so edits during the run don't change what is graded
+    submissions = {
+        student_id: student.get('code', '')
+        for student_id, student in room['students'].items()
+    }
+
+    async def on_result(summary):
+        summary['name'] = room['students'].get(summary['studentId'], {}).get('name', '')
+        await sio.emit('run_all_result', summary, to=sid)
+
+    async def grade():
+        try:
+            stats = await run_batch(
+                submissions, cases, timeout=timeout, language=language,
+                max_workers=max_workers, on_result=on_result,
+            )
+        except Exception as e:
+            print(f'[RUN_ALL] Error grading room {room_id}: {e}')
+            await sio.emit('run_all_done', {'error': str(e)}, to=sid)
+            return
+        await sio.emit('run_all_done', stats, to=sid)
+        print(f'[RUN_ALL] Finished {stats["runs"]} runs in {stats["wallTime"]}s ({stats["runsPerSecond"]} runs/s)')
+
+    print(f'[RUN_ALL] Teacher {sid} grading {len(submissions)} students x {len(cases)} cases in room {room_id}')
+    # Grade in the background so the teacher's socket stays responsive
+    asyncio.create_task(grade())
+    return {'students': len(submissions), 'cases': len(cases)}
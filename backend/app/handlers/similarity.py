@@ -0,0 +1,98 @@
+"""
+Similarity Event Handlers
+
+Handles the similar_to and get_clusters events for the classroom coding
+platform. Lets teachers find students with identical or near-identical code.
+"""
+
+import math
+
+from app.similarity.similarity import get_index, SIMILARITY_THRESHOLD
+
+
+def _teacher_room(sid, rooms, data, tag):
+    """Validate a teacher request. Returns (room_id, room, error)."""
+    room_id = data.get('roomId')
+
+    if not room_id or room_id not in rooms:
+        print(f'[{tag}] Error: Room {room_id} does not exist')
+        return None, None, {'error': 'Room not found'}
+
+    room = rooms[room_id]
+    if sid != room['teacher']:
+        print(f'[{tag}] Ignored: Socket {sid} is not the teacher in room {room_id}')
+        return None, None, {'error': 'Not allowed'}
+
+    return room_id, room, None
+
+
+def _threshold(data):
+    """Requested threshold clamped to [0, 1] (default for invalid values)."""
+    try:
+        threshold = float(data.get('threshold', SIMILARITY_THRESHOLD))
+    except (TypeError, ValueError):
+        return SIMILARITY_THRESHOLD
+    if math.isnan(threshold):
+        return SIMILARITY_THRESHOLD
+    return min(max(threshold, 0.0), 1.0)
+
+
+async def handle_similar_to(sid, sio, rooms, data):
+    """
+    Handle similar_to event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing roomId, studentId and optional threshold
+
+    Returns:
+        {'matches': [{studentId, name, similarity}]} or error dict (for callback support)
+    """
+    room_id, room, error = _teacher_room(sid, rooms, data, 'SIMILAR_TO')
+    if error:
+        return error
+
+    students = room['students']
+    matches = get_index(room_id).similar_to(data.get('studentId'), _threshold(data))
+    return {'matches': [
+        {
+            'studentId': other,
+            'name': students.get(other, {}).get('name', ''),
+            'similarity': round(similarity, 3),
+        }
+        for other, similarity in matches if other in students
+    ]}
+
+
+async def handle_get_clusters(sid, sio, rooms, data):
+    """
+    Handle get_clusters event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing roomId and optional threshold
+
+    Returns:
+        {'clusters': [{students: [{studentId, name}], similarity}]} or error dict
+    """
+    room_id, room, error = _teacher_room(sid, rooms, data, 'GET_CLUSTERS')
+    if error:
+        return error
+
+    students = room['students']
+    clusters = get_index(room_id).clusters(_threshold(data))
+    print(f'[GET_CLUSTERS] Room {room_id}: {len(clusters)} clusters of similar code')
+    return {'clusters': [
+        {
+            'students': [
+                {'studentId': s, 'name': students.get(s, {}).get('name', '')}
+                for s in cluster['students']
+            ],
+            'similarity': cluster['similarity'],
+        }
+        for cluster in clusters
+    ]}
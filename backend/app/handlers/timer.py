@@ -0,0 +1,179 @@
+"""
+Session Timer Event Handlers
+
+Handles start_timer, pause_timer and resume_timer events for the classroom
+coding platform. The server owns the timer: a running timer is stored as an
+absolute deadline, clients count down locally, and the room is only notified
+when the timer state changes (start, pause, resume, expiry).
+"""
+
+import math
+import time
+import asyncio
+
+from app.session.session import emit_room
+
+
+# Longest timer a teacher can start, in seconds
+MAX_TIMER_SECONDS = 12 * 60 * 60
+
+# Pending expiry tasks: {roomId: asyncio.Task}
+_expiry_tasks = {}
+
+
+def _find_teacher_room(sid, rooms):
+    """Return (room_id, room) for the room this socket teaches, or (None, None)."""
+    for room_id, room in rooms.items():
+        if room.get('teacher') == sid:
+            return room_id, room
+    return None, None
+
+
+def timer_state(room):
+    """
+    Build the timer_sync payload for a room from its stored timer.
+
+    Returns None if the room has no timer yet.
+    """
+    timer = room.get('timer')
+    if timer is None:
+        return None
+
+    now = time.time()
+    if timer['running']:
+        remaining = max(0, timer['deadline'] - now)
+    else:
+        remaining = timer['remaining']
+
+    return {
+        'running': timer['running'],
+        'deadline': timer['deadline'] if timer['running'] else None,
+        'timeRemaining': int(math.ceil(remaining)),
+        'serverTime': now
+    }
+
+
+def cancel_room_timer(room_id):
+    """Cancel the pending expiry task for a room (called when a room is deleted)."""
+    task = _expiry_tasks.pop(room_id, None)
+    if task:
+        task.cancel()
+
+
+def _schedule_expiry(room_id, sio, rooms):
+    """(Re)schedule the single expiry broadcast for a running timer."""
+    cancel_room_timer(room_id)
+    timer = rooms[room_id]['timer']
+
+    async def _expire():
+        await asyncio.sleep(max(0, timer['deadline'] - time.time()))
+        room = rooms.get(room_id)
+        # Room deleted or timer replaced/paused while we slept
+        if room is None or room.get('timer') is not timer or not timer['running']:
+            return
+        timer['running'] = False
+        timer['remaining'] = 0
+        timer['deadline'] = None
+        _expiry_tasks.pop(room_id, None)
+        await emit_room(sio, room, room_id, 'timer_sync', timer_state(room))
+        print(f'[TIMER] Timer expired in room {room_id}')
+
+    _expiry_tasks[room_id] = asyncio.create_task(_expire())
+
+
+async def _broadcast(sio, room_id, room):
+    """Send the current timer state to everyone in the room in one emit."""
+    await emit_room(sio, room, room_id, 'timer_sync', timer_state(room))
+
+
+async def handle_start_timer(sid, sio, rooms, data):
+    """
+    Handle start_timer event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing duration (seconds)
+
+    Returns:
+        error dict if the duration is invalid (for callback support)
+    """
+    room_id, room = _find_teacher_room(sid, rooms)
+    if room is None:
+        print(f'[TIMER] Ignored start_timer: Socket {sid} is not a teacher')
+        return
+
+    try:
+        duration = float(data.get('duration', 0))
+    except (TypeError, ValueError):
+        duration = math.nan
+    if not math.isfinite(duration):
+        print(f'[TIMER] Error: Invalid duration from socket {sid}')
+        return {'error': 'duration must be a number of seconds'}
+    duration = int(min(max(0, duration), MAX_TIMER_SECONDS))
+    room['timer'] = {
+        'running': duration > 0,
+        'deadline': time.time() + duration if duration > 0 else None,
+        'remaining': duration
+    }
+    if duration > 0:
+        _schedule_expiry(room_id, sio, rooms)
+    else:
+        cancel_room_timer(room_id)
+
+    await _broadcast(sio, room_id, room)
+    print(f'[TIMER] Teacher {sid} started {duration}s timer in room {room_id}')
+
+
+async def handle_pause_timer(sid, sio, rooms, data):
+    """
+    Handle pause_timer event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data (unused)
+    """
+    room_id, room = _find_teacher_room(sid, rooms)
+    if room is None or room.get('timer') is None:
+        return
+
+    timer = room['timer']
+    if not timer['running']:
+        return
+
+    timer['remaining'] = max(0, timer['deadline'] - time.time())
+    timer['deadline'] = None
+    timer['running'] = False
+    cancel_room_timer(room_id)
+
+    await _broadcast(sio, room_id, room)
+    print(f'[TIMER] Teacher {sid} paused timer in room {room_id} ({int(timer["remaining"])}s left)')
+
+
+async def handle_resume_timer(sid, sio, rooms, data):
+    """
+    Handle resume_timer event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data (unused)
+    """
+    room_id, room = _find_teacher_room(sid, rooms)
+    if room is None or room.get('timer') is None:
+        return
+
+    timer = room['timer']
+    if timer['running'] or timer['remaining'] <= 0:
+        return
+
+    timer['deadline'] = time.time() + timer['remaining']
+    timer['running'] = True
+    _schedule_expiry(room_id, sio, rooms)
+
+    await _broadcast(sio, room_id, room)
+    print(f'[TIMER] Teacher {sid} resumed timer in room {room_id}')
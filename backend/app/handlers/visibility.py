@@ -0,0 +1,52 @@
+"""
+Visibility Event Handler
+
+Handles the set_visibility event for the classroom coding platform.
+The teacher declares which students are on screen in full, which only need
+a summary and which are hidden; code_change then sends each student's code
+at that level (see subscriptions.py).
+"""
+
+from app.subscriptions.subscriptions import set_visibility, publish_summary, FULL, SUMMARY
+from app.admission.admission import forward_code_update
+
+
+async def handle_set_visibility(sid, sio, rooms, data):
+    """
+    Handle set_visibility event from teacher
+
+    Args:
+        sid: The teacher socket's ID
+        sio: SocketIO server instance for emitting events
+        rooms: Reference to in-memory rooms state dictionary
+        data: Event data containing roomId and full/summary/hidden student
+              id lists plus an optional default level
+
+    Returns:
+        {'full': [studentIds]} or error dict (for callback support)
+    """
+    room_id = data.get('roomId')
+
+    if not room_id or room_id not in rooms:
+        print(f'[SET_VISIBILITY] Error: Room {room_id} does not exist')
+        return {'error': 'Room not found'}
+
+    room = rooms[room_id]
+    if sid != room['teacher']:
+        print(f'[SET_VISIBILITY] Ignored: Socket {sid} is not the teacher in room {room_id}')
+        return {'error': 'Not allowed'}
+
+    # Students that just came on screen get their current code right away,
+    # students that just left it a fresh summary
+    changed = set_visibility(sid, room, data)
+    for student_sid, level in changed.items():
+        student = room['students'][student_sid]
+        if level == FULL:
+            forward_code_update(sio, sid, student_sid, student.get('code') or '')
+        elif level == SUMMARY:
+            publish_summary(sio, sid, student_sid, student, force=True)
+
+    full = [s for s in data.get('full') or [] if s in room['students']]
+    print(f'[SET_VISIBILITY] Teacher {sid} in room {room_id}: {len(full)} full, '
+          f'{len(changed)} changed')
+    return {'full': full}
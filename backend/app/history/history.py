@@ -0,0 +1,263 @@
+"""
+Code History Timeline
+
+Keeps a compact revision history of every student's code so the teacher can
+scrub back through how it evolved.
+
+A revision is recorded when at least HISTORY_MIN_INTERVAL seconds have passed
+since the previous one, or when the edit since then touches at least
+HISTORY_MIN_CHANGE characters. Each revision is stored as a delta against the
+previous one: the length of the unchanged prefix and suffix plus the replaced
+middle, zlib-compressed when that helps. Every HISTORY_KEYFRAME_EVERY
+revisions a full snapshot is stored, so rebuilding any revision replays a
+bounded number of deltas. Revision timestamps are kept in a sorted list, so
+seeking by time is a binary search.
+
+Each room has a memory budget (HISTORY_ROOM_BUDGET_KB). When it is exceeded
+the oldest keyframe segment of the largest history is dropped.
+"""
+
+import os
+import json
+import gzip
+import time
+import zlib
+import bisect
+
+HISTORY_MIN_INTERVAL = float(os.environ.get('HISTORY_MIN_INTERVAL', 5))
+HISTORY_MIN_CHANGE = int(os.environ.get('HISTORY_MIN_CHANGE', 200))
+HISTORY_KEYFRAME_EVERY = int(os.environ.get('HISTORY_KEYFRAME_EVERY', 50))
+HISTORY_ROOM_BUDGET_KB = int(os.environ.get('HISTORY_ROOM_BUDGET_KB', 4096))
+
+# Directory that receives a gzipped JSON export when a room closes (optional)
+HISTORY_EXPORT_DIR = os.environ.get('HISTORY_EXPORT_DIR')
+
+# Approximate fixed cost of one stored revision (list slots, tuple, ints)
+_ENTRY_OVERHEAD = 64
+
+# {room_id: {sid: StudentHistory}}
+histories = {}
+
+
+def _pack(text):
+    """Encode text, compressing it only when that makes it smaller."""
+    raw = text.encode('utf-8')
+    if len(raw) > 64:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return True, packed
+    return False, raw
+
+
+def _unpack(compressed, blob):
+    return (zlib.decompress(blob) if compressed else blob).decode('utf-8')
+
+
+def _diff(old, new):
+    """
+    Return (prefix_len, suffix_len, middle) turning old into new.
+
+    The common prefix and suffix are found by bisecting with slice
+    comparisons, so the characters are compared in C, not one by one here.
+    """
+    limit = min(len(old), len(new))
+    lo, hi = 0, limit
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[lo:mid] == new[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    prefix = lo
+    lo, hi = 0, limit - prefix
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:len(old) - lo] == new[len(new) - mid:len(new) - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    suffix = lo
+    return prefix, suffix, new[prefix:len(new) - suffix]
+
+
+class StudentHistory:
+    """Revision list for one student's code."""
+
+    def __init__(self):
+        self.times = []      # revision timestamps, ascending
+        self.entries = []    # ('full', compressed, blob) or ('delta', prefix, suffix, compressed, blob)
+        self.base_rev = 0    # revision number of entries[0] (older ones were trimmed)
+        self.last_code = ''
+        self.last_time = 0.0
+        self.bytes = 0
+
+    def record(self, code, now, force=False):
+        """Record code as a new revision if the cadence allows it. Returns True if stored."""
+        if code == self.last_code and self.entries:
+            return False
+        keyframe = not self.entries or len(self.entries) % HISTORY_KEYFRAME_EVERY == 0
+        diff = None
+
+        if not force and self.entries and now - self.last_time < HISTORY_MIN_INTERVAL:
+            # Too soon: only a large edit is recorded. An edit can't touch
+            # more characters than the longer text has, so short code never
+            # needs the diff.
+            if max(len(code), len(self.last_code)) < HISTORY_MIN_CHANGE:
+                return False
+            diff = prefix, suffix, middle = _diff(self.last_code, code)
+            if max(len(middle), len(self.last_code) - prefix - suffix) < HISTORY_MIN_CHANGE:
+                return False
+
+        if keyframe:
+            compressed, blob = _pack(code)
+            entry = ('full', compressed, blob)
+        else:
+            prefix, suffix, middle = diff or _diff(self.last_code, code)
+            compressed, blob = _pack(middle)
+            entry = ('delta', prefix, suffix, compressed, blob)
+
+        self.entries.append(entry)
+        self.times.append(now)
+        self.bytes += len(entry[-1]) + _ENTRY_OVERHEAD
+        self.last_code = code
+        self.last_time = now
+        return True
+
+    def seek(self, timestamp):
+        """Index of the last revision at or before timestamp (O(log n)), or None."""
+        index = bisect.bisect_right(self.times, timestamp) - 1
+        return index if index >= 0 else None
+
+    def code_at(self, index):
+        """Rebuild the code of revision entries[index]."""
+        start = index
+        while self.entries[start][0] != 'full':
+            start -= 1
+        code = _unpack(self.entries[start][1], self.entries[start][2])
+        for entry in self.entries[start + 1:index + 1]:
+            _, prefix, suffix, compressed, blob = entry
+            code = code[:prefix] + _unpack(compressed, blob) + code[len(code) - suffix:]
+        return code
+
+    def trim_oldest(self):
+        """Drop the oldest keyframe segment. Returns bytes freed."""
+        end = 1
+        while end < len(self.entries) and self.entries[end][0] != 'full':
+            end += 1
+        if end >= len(self.entries):
+            return 0  # never drop the segment holding the latest revision
+        freed = sum(len(e[-1]) + _ENTRY_OVERHEAD for e in self.entries[:end])
+        del self.entries[:end]
+        del self.times[:end]
+        self.base_rev += end
+        self.bytes -= freed
+        return freed
+
+
+def record_code(room_id, sid, code, force=False):
+    """Feed a student's latest code into their history."""
+    room_history = histories.setdefault(room_id, {})
+    history = room_history.get(sid)
+    if history is None:
+        history = room_history[sid] = StudentHistory()
+    if history.record(code, time.time(), force):
+        _enforce_budget(room_history)
+
+
+def _enforce_budget(room_history):
+    """Trim the largest histories until the room fits its budget."""
+    budget = HISTORY_ROOM_BUDGET_KB * 1024
+    total = sum(h.bytes for h in room_history.values())
+    while total > budget:
+        largest = max(room_history.values(), key=lambda h: h.bytes)
+        freed = largest.trim_oldest()
+        if not freed:
+            break
+        total -= freed
+
+
+def get_history(room_id, sid, current_code=None):
+    """
+    Revision list (metadata only) for a student.
+    The student's current code is recorded first so the timeline ends at "now".
+    """
+    if current_code is not None:
+        record_code(room_id, sid, current_code, force=True)
+    history = histories.get(room_id, {}).get(sid)
+    if history is None:
+        return []
+    return [
+        {'rev': history.base_rev + i, 'timestamp': t}
+        for i, t in enumerate(history.times)
+    ]
+
+
+def get_revision(room_id, sid, rev=None, timestamp=None):
+    """Return {rev, timestamp, code} by revision number or by time, or None."""
+    history = histories.get(room_id, {}).get(sid)
+    if history is None or not history.entries:
+        return None
+    if timestamp is not None:
+        index = history.seek(timestamp)
+    elif rev is not None:
+        index = rev - history.base_rev
+    else:
+        index = len(history.entries) - 1
+    if index is None or not 0 <= index < len(history.entries):
+        return None
+    return {
+        'rev': history.base_rev + index,
+        'timestamp': history.times[index],
+        'code': history.code_at(index),
+    }
+
+
+def rename_student(room_id, old_sid, new_sid):
+    """Keep a student's history when they resume under a new sid."""
+    room_history = histories.get(room_id)
+    if room_history and old_sid in room_history:
+        room_history[new_sid] = room_history.pop(old_sid)
+
+
+def history_stats(room_id):
+    """Memory used by a room's histories."""
+    room_history = histories.get(room_id, {})
+    return {
+        'students': len(room_history),
+        'revisions': sum(len(h.entries) for h in room_history.values()),
+        'bytes': sum(h.bytes for h in room_history.values()),
+        'budgetBytes': HISTORY_ROOM_BUDGET_KB * 1024,
+    }
+
+
+def export_room(room_id, room):
+    """Full history of every student in a room as a JSON-serializable dict."""
+    students = room.get('students', {}) if room else {}
+    for sid, student in students.items():
+        record_code(room_id, sid, student.get('code', ''), force=True)
+    exported = {}
+    for sid, history in histories.get(room_id, {}).items():
+        exported[sid] = {
+            'name': students.get(sid, {}).get('name', ''),
+            'revisions': [
+                {'rev': history.base_rev + i, 'timestamp': t, 'code': history.code_at(i)}
+                for i, t in enumerate(history.times)
+            ],
+        }
+    return {'roomId': room_id, 'exportedAt': time.time(), 'students': exported}
+
+
+def close_room_history(room_id, room):
+    """Export a closing room's history (if HISTORY_EXPORT_DIR is set) and free it."""
+    if room_id not in histories:
+        return
+    if HISTORY_EXPORT_DIR:
+        try:
+            os.makedirs(HISTORY_EXPORT_DIR, exist_ok=True)
+            path = os.path.join(HISTORY_EXPORT_DIR, f'{room_id}-{int(time.time())}.json.gz')
+            with gzip.open(path, 'wt', encoding='utf-8') as f:
+                json.dump(export_room(room_id, room), f)
+            print(f'[HISTORY] Exported room {room_id} history to {path}')
+        except Exception as e:
+            print(f'[HISTORY] Export failed for room {room_id}: {e}')
+    histories.pop(room_id, None)
@@ -11,9 +11,29 @@ import asyncio
 import socketio
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.execution.execution import run_code as execute_code
-from app.execution.execution import start_interactive, send_input, stop_process
+from app.execution.execution import start_interactive, send_input, send_eof, stop_process
+from app.session.session import (
+    emit_to, emit_room, resolve_sid, mark_disconnected, drop_sid, drop_room_sessions
+)
+from app.tracing.tracing import tracer, instrument_socketio
+from app.recording.recording import recorder, install_recorder
+from app.history.history import record_code, close_room_history
+from app.outbound.outbound import send, close_client, set_resync, stats as outbound_stats
+from app.similarity.similarity import schedule_update, remove_student, drop_room
+from app.telemetry import telemetry
+from app.sharding import sharding
+from app.admission import admission
+from app.execution import backends, nodepool, stdin
+from app.subscriptions import subscriptions
+from app.output import output
+from app.output.output import OutputBuffer, SPILL_NOTICE
+from app.execution.repl import (
+    execute_repl, send_repl_input, interrupt_repl, reset_repl as reset_repl_session,
+    close_repl, is_repl_busy, repl_stats
+)
 
 # Initialize FastAPI application
 app = FastAPI(title="Classroom Coding Platform")
@@ -42,6 +62,17 @@ socket_app = socketio.ASGIApp(sio, app)
 # Structure: {roomId: {teacher: socketId, students: {...}, mainView: {...}, start_time: float}}
 rooms = {}
 
+
+def _teacher_resync(sid):
+    """Fresh roster for a teacher whose outbound queue fell too far behind."""
+    for room_data in rooms.values():
+        if room_data.get('teacher') == sid:
+            return 'student_list_update', subscriptions.roster(sid, room_data['students'])
+    return None
+
+
+set_resync(_teacher_resync)
+
 # Store disconnected student data by (roomId, userName) for rejoin support
 # Structure: {(roomId, userName): {code, output, error}}
 disconnected_students = {}
@@ -53,10 +84,21 @@ try:
     from app.handlers.open_student import handle_open_student
     from app.handlers.promote_student import handle_promote_student
     from app.handlers.disconnect import handle_disconnect
+    from app.handlers.run_all import handle_run_all
+    from app.handlers.code_history import handle_get_history, handle_get_revision
+    from app.handlers.similarity import handle_similar_to, handle_get_clusters
+    from app.handlers.visibility import handle_set_visibility
+    from app.handlers.timer import (
+        handle_start_timer, handle_pause_timer, handle_resume_timer,
+        timer_state, cancel_room_timer
+    )
     handlers_available = True
+    handler_import_error = None
     print('[SERVER] All handler modules loaded successfully')
 except ImportError as e:
+    # The server still starts (so /health can say why) but is never ready
     handlers_available = False
+    handler_import_error = str(e)
     print(f'[SERVER] Warning: Handler import failed: {e}')
     import traceback
     traceback.print_exc()
@@ -72,10 +114,14 @@ async def connect(sid, environ):
 @sio.event
 async def disconnect(sid):
     """Handle disconnect event - save student data, end room if teacher leaves"""
+    close_client(sid)
+    admission.forget(sid)
     # Check if this sid is a teacher — if so, end the entire room
     for room_id, room_data in list(rooms.items()):
         if room_data.get('teacher') == sid:
             print(f'[DISCONNECT] Teacher {sid} disconnected — ending room {room_id}')
+            # Students are leaving for good — no resume grace period
+            drop_room_sessions(room_id)
             # Notify all students that the session has ended
             await sio.emit('room_closed', {
                 'message': 'The host has ended the session.'
@@ -87,10 +133,34 @@ async def disconnect(sid):
                 except Exception:
                     pass
             # Clean up room
+            close_room_history(room_id, room_data)
+            drop_room(room_id)
+            telemetry.drop_room(room_id)
+            subscriptions.drop_teacher(sid)
             del rooms[room_id]
+            if handlers_available:
+                cancel_room_timer(room_id)
             print(f'[DISCONNECT] Room {room_id} deleted')
             return
 
+    # Student with a resumable session — keep everything for the grace period
+    for room_id, room_data in rooms.items():
+        if sid in room_data.get('students', {}):
+            if mark_disconnected(sid, lambda: _remove_student(sid)):
+                room_data['students'][sid]['connected'] = False
+                send(sio, room_data.get('teacher'), 'student_status', {
+                    'studentId': sid,
+                    'connected': False
+                })
+                print(f'[DISCONNECT] Student {sid} disconnected, holding session for resume')
+                return
+            break
+
+    await _remove_student(sid)
+
+
+async def _remove_student(sid):
+    """Remove a student for good — save data for name-based rejoin, stop their runs"""
     # Save student data for potential rejoin
     for room_id, room_data in rooms.items():
         if sid in room_data.get('students', {}):
@@ -103,6 +173,12 @@ async def disconnect(sid):
             }
             print(f'[DISCONNECT] Saved data for student "{student.get("name", "")}" in room {room_id}')
             break
+    drop_sid(sid)
+    if resolve_sid(sid) == sid:
+        # A resumed sid's spill files now belong to the student's new sid
+        output.release(sid)
+    await stop_process(sid)
+    await close_repl(sid)
     if handlers_available:
         await handle_disconnect(sid, sio, rooms)
 
@@ -112,47 +188,110 @@ async def run_code(sid, data):
     timeout = data.get("timeout", 30)
     language = data.get("language", "python")
 
-    # Collect all output and error for the final result
-    collected_output = []
-    collected_error = []
+    # Collect all output and error for the final result (spilled to disk
+    # past OUTPUT_SPILL_BYTES; earlier runs' spill files are released)
+    output.release(sid)
+    collected_output = OutputBuffer(sid)
+    collected_error = OutputBuffer(sid)
+
+    # A teacher's run is relayed live to the students in their room
+    teacher_room_id = next(
+        (room_id for room_id, room_data in rooms.items() if room_data.get('teacher') == sid),
+        None
+    )
+    if teacher_room_id:
+        teacher_room = rooms[teacher_room_id]
+        teacher_room['teacherOutput'] = {'output': OutputBuffer(sid), 'error': None}
+        await emit_room(sio, teacher_room, teacher_room_id, 'teacher_output',
+                        {'output': '', 'error': None}, skip_sid=sid)
 
     async def on_output(text, is_error):
         """Stream each line of output to the client in real-time."""
-        if is_error:
-            collected_error.append(text)
-        else:
-            collected_output.append(text)
-        # Send incremental output to the user
-        await sio.emit('code_output', {
+        collected = collected_error if is_error else collected_output
+        was_spilled = collected.spilled
+        if collected.append(text):
+            text = SPILL_NOTICE
+        elif was_spilled:
+            # Past the spill threshold output is only saved; code_done
+            # carries head + tail and get_output_range serves the rest
+            return
+        # Send incremental output to the user (follows them across reconnects)
+        await emit_to(sio, sid, 'code_output', {
             'text': text,
             'isError': is_error
-        }, to=sid)
+        })
+        if teacher_room_id and teacher_room_id in rooms:
+            # One broadcast per chunk; not buffered for replay, the final
+            # teacher_output snapshot in on_done is
+            relayed = rooms[teacher_room_id]['teacherOutput']['output']
+            if relayed.spilled:
+                return
+            relayed.append(text)
+            await sio.emit('teacher_output_chunk', {
+                'text': text,
+                'isError': is_error
+            }, room=teacher_room_id, skip_sid=sid)
 
-    async def on_done(exit_code):
+    async def on_done(exit_code, run_telemetry=None):
         """Called when the process finishes."""
-        full_output = ''.join(collected_output)
-        full_error = ''.join(collected_error)
+        full_output = collected_output.text()
+        full_error = collected_error.text()
+        output_info = collected_output.info()
+        error_info = collected_error.info() if exit_code != 0 else None
         result = {
             'exit_code': exit_code,
             'output': full_output,
-            'error': full_error if exit_code != 0 else None
+            'error': full_error if exit_code != 0 else None,
+            'telemetry': run_telemetry
         }
-        await sio.emit('code_done', result, to=sid)
+        if output_info or error_info:
+            result.update(outputInfo=output_info, errorInfo=error_info)
+        await emit_to(sio, sid, 'code_done', result)
+
+        # Aggregate resource usage per room
+        current_sid = resolve_sid(sid)
+        if run_telemetry:
+            room_id = _room_of(current_sid, None)
+            room_data = rooms.get(room_id, {})
+            student = room_data.get('students', {}).get(current_sid)
+            name = student.get('name', '') if student else 'Teacher'
+            telemetry.record_run(room_id, current_sid, name, run_telemetry)
+
+        if teacher_room_id and teacher_room_id in rooms:
+            teacher_room = rooms[teacher_room_id]
+            teacher_output = teacher_room['teacherOutput']
+            teacher_output['error'] = result['error']
+            await emit_room(sio, teacher_room, teacher_room_id, 'teacher_output', {
+                'output': teacher_output['output'].text(),
+                'error': teacher_output['error'],
+                'outputInfo': teacher_output['output'].info()
+            }, skip_sid=sid)
+            return
 
         # Forward to teacher if this is a student
         for room_id, room_data in rooms.items():
-            if sid in room_data.get('students', {}):
-                room_data['students'][sid]['output'] = full_output
-                room_data['students'][sid]['error'] = full_error if exit_code != 0 else None
+            if current_sid in room_data.get('students', {}):
+                room_data['students'][current_sid]['output'] = full_output
+                room_data['students'][current_sid]['outputInfo'] = output_info
+                room_data['students'][current_sid]['error'] = full_error if exit_code != 0 else None
                 teacher_sid = room_data.get('teacher')
                 if teacher_sid:
-                    await sio.emit('student_output', {
-                        'studentId': sid,
+                    send(sio, teacher_sid, 'student_output', {
+                        'studentId': current_sid,
                         'output': full_output,
-                        'error': full_error if exit_code != 0 else None
-                    }, to=teacher_sid)
+                        'outputInfo': output_info,
+                        'error': full_error if exit_code != 0 else None,
+                        'telemetry': run_telemetry
+                    })
                 break
 
+    # Persistent REPL mode keeps one interpreter per user (Python only)
+    if data.get("repl") and language not in ("javascript", "js"):
+        asyncio.create_task(
+            execute_repl(code, sid, timeout, on_output, on_done)
+        )
+        return
+
     # Start interactive execution (streams output)
     asyncio.create_task(
         start_interactive(code, sid, timeout, language, on_output, on_done)
@@ -161,27 +300,88 @@ async def run_code(sid, data):
 
 @sio.event
 async def code_input(sid, data):
-    """Handle user input for interactive programs (e.g. input() in Python)."""
+    """
+    Handle user input for interactive programs (e.g. input() in Python).
+
+    text is sent followed by a newline, or as-is with raw: true (pieces of a
+    pasted blob). Input sent while the program is still starting is kept.
+    Returns {'buffered': bytes the program has not read yet} or {'error'};
+    'Input buffer full' means retry once the program has caught up.
+    """
     text = data.get('text', '')
-    success = await send_input(sid, text)
-    if success:
-        print(f'[CODE_INPUT] Sent input to process for {sid}: {repr(text)}')
+    newline = not data.get('raw')
+    if is_repl_busy(sid):
+        result = ({'buffered': 0} if await send_repl_input(sid, text, newline)
+                  else {'error': 'No running program'})
     else:
-        print(f'[CODE_INPUT] No running process for {sid}')
+        result = await send_input(sid, text, newline)
+    if 'error' in result:
+        print(f'[CODE_INPUT] {result["error"]} for {sid}')
+        return result
+    echoed = text + '\n' if newline else text
+    print(f'[CODE_INPUT] Queued {len(echoed)} chars of input for {sid}')
+    # Students watching a teacher's run see the input echoed like the teacher does
+    for room_id, room_data in rooms.items():
+        if room_data.get('teacher') == sid and room_data.get('teacherOutput'):
+            relayed = room_data['teacherOutput']['output']
+            if not relayed.spilled:
+                relayed.append(echoed)
+                await sio.emit('teacher_output_chunk', {'text': echoed, 'isError': False},
+                               room=room_id, skip_sid=sid)
+            break
+    return result
+
+
+@sio.event
+async def code_eof(sid, data=None):
+    """Close the running program's stdin (Ctrl-D) once buffered input is written."""
+    if is_repl_busy(sid):
+        return {'error': 'EOF is not supported in REPL mode'}
+    return await send_eof(sid)
 
 
 @sio.event
 async def stop_code(sid, data=None):
     """Stop a running code execution."""
+    if is_repl_busy(sid):
+        # The REPL reports its own code_done once the snippet is interrupted
+        await interrupt_repl(sid)
+        print(f'[STOP_CODE] Interrupted REPL snippet for {sid}')
+        return
     await stop_process(sid)
-    await sio.emit('code_done', {
+    await emit_to(sio, sid, 'code_done', {
         'exit_code': -1,
         'output': '',
         'error': '\n🛑 Execution stopped by user'
-    }, to=sid)
+    })
     print(f'[STOP_CODE] Stopped execution for {sid}')
 
 
+@sio.event
+async def reset_repl(sid, data=None):
+    """Discard the user's persistent REPL so the next run starts clean."""
+    await reset_repl_session(sid)
+    await sio.emit('repl_reset', {}, to=sid)
+
+
+@sio.event
+async def get_output_range(sid, data):
+    """Return a byte range of a spilled run output (callback-based)."""
+    data = data or {}
+    try:
+        offset = int(data.get('offset', 0))
+        length = int(data.get('length', output.OUTPUT_RANGE_MAX))
+    except (TypeError, ValueError):
+        return {'error': 'Invalid range'}
+    return await output.get_range(data.get('id'), offset, length)
+
+
+@sio.event
+async def get_repl_stats(sid, data=None):
+    """Return startup/import time saved by the user's REPL (callback-based)."""
+    return repl_stats(sid) or {'runs': 0, 'startupTime': 0, 'savedTime': 0}
+
+
 if handlers_available:
     @sio.event
     async def join_room(sid, data):
@@ -205,16 +405,12 @@ if handlers_available:
             }, to=sid)
             print(f'[REJOIN] Restored data for student "{user_name}" in room {room_id}')
 
-        # Send timer sync to the newly joined student
+        # Send timer state (computed from the deadline) to the newly joined socket
         room = rooms.get(room_id)
-        if room and room.get('timer_remaining') is not None:
-            elapsed_since_update = time.time() - room.get('timer_updated_at', time.time())
-            adjusted_time = max(0, int(room['timer_remaining'] - elapsed_since_update))
-            await sio.emit('timer_sync', {
-                'timeRemaining': adjusted_time,
-                'serverTime': time.time()
-            }, to=sid)
-            print(f'[TIMER] Sent timer sync to new student {sid}: {adjusted_time}s remaining')
+        state = timer_state(room) if room else None
+        if state is not None:
+            await sio.emit('timer_sync', state, to=sid)
+            print(f'[TIMER] Sent timer sync to {sid}: {state["timeRemaining"]}s remaining')
     
     @sio.event
     async def code_change(sid, data):
@@ -238,10 +434,9 @@ if handlers_available:
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
                 # Broadcast to all students in the room
-                for student_sid in room_data.get('students', {}).keys():
-                    await sio.emit('teacher_code_change', {
-                        'code': data.get('code', '')
-                    }, to=student_sid)
+                await emit_room(sio, room_data, room_id, 'teacher_code_change', {
+                    'code': data.get('code', '')
+                }, skip_sid=sid)
                 print(f'[TEACHER_CODE_CHANGE] Broadcasted code to {len(room_data.get("students", {}))} students in room {room_id}')
                 break
     
@@ -251,12 +446,17 @@ if handlers_available:
         # Find which room the teacher is in
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
+                # Legacy path (older teacher clients re-send the whole output)
+                room_data['teacherOutput'] = {
+                    'output': OutputBuffer(sid),
+                    'error': data.get('error', None)
+                }
+                room_data['teacherOutput']['output'].append(data.get('output', ''))
                 # Broadcast to all students in the room
-                for student_sid in room_data.get('students', {}).keys():
-                    await sio.emit('teacher_output', {
-                        'output': data.get('output', ''),
-                        'error': data.get('error', None)
-                    }, to=student_sid)
+                await emit_room(sio, room_data, room_id, 'teacher_output', {
+                    'output': data.get('output', ''),
+                    'error': data.get('error', None)
+                }, skip_sid=sid)
                 print(f'[TEACHER_OUTPUT] Broadcasted output to {len(room_data.get("students", {}))} students in room {room_id}')
                 break
     
@@ -271,8 +471,10 @@ if handlers_available:
                 if student_id in room_data.get('students', {}):
                     # Update code in server state
                     room_data['students'][student_id]['code'] = code
+                    record_code(room_id, student_id, code)
+                    schedule_update(room_id, student_id, code)
                     # Forward the edit to the student
-                    await sio.emit('teacher_edit_code', {'code': code}, to=student_id)
+                    await emit_to(sio, student_id, 'teacher_edit_code', {'code': code})
                     print(f'[TEACHER_EDIT] Teacher {sid} edited student {student_id} code in room {room_id}')
                 break
     
@@ -283,7 +485,7 @@ if handlers_available:
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
                 if student_id in room_data.get('students', {}):
-                    await sio.emit('teacher_take_control', {}, to=student_id)
+                    await emit_to(sio, student_id, 'teacher_take_control', {})
                     print(f'[CONTROL] Teacher took control of student {student_id}')
                 break
     
@@ -294,14 +496,55 @@ if handlers_available:
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
                 if student_id in room_data.get('students', {}):
-                    await sio.emit('teacher_release_control', {}, to=student_id)
+                    await emit_to(sio, student_id, 'teacher_release_control', {})
                     print(f'[CONTROL] Teacher released control of student {student_id}')
                 break
     
+    @sio.event
+    async def run_all(sid, data):
+        """Teacher grades every student's code against shared test cases (callback-based)"""
+        return await handle_run_all(sid, sio, rooms, data)
+    
+    @sio.event
+    async def get_history(sid, data):
+        """Teacher lists a student's code revisions (callback-based)"""
+        return await handle_get_history(sid, sio, rooms, data)
+    
+    @sio.event
+    async def get_revision(sid, data):
+        """Teacher fetches one revision by number or timestamp (callback-based)"""
+        return await handle_get_revision(sid, sio, rooms, data)
+    
+    @sio.event
+    async def similar_to(sid, data):
+        """Teacher lists students whose code resembles one student's (callback-based)"""
+        return await handle_similar_to(sid, sio, rooms, data)
+    
+    @sio.event
+    async def get_clusters(sid, data):
+        """Teacher lists groups of students with near-identical code (callback-based)"""
+        return await handle_get_clusters(sid, sio, rooms, data)
+    
+    @sio.event
+    async def set_visibility(sid, data):
+        """Teacher declares which students are on screen (full/summary/hidden, callback-based)"""
+        return await handle_set_visibility(sid, sio, rooms, data)
+    
+    @sio.event
+    async def get_run_stats(sid, data):
+        """Teacher fetches the room's run totals and heaviest students (callback-based)"""
+        room_id = (data or {}).get('roomId')
+        if room_id not in rooms or rooms[room_id].get('teacher') != sid:
+            return {'error': 'Not allowed'}
+        return telemetry.room_stats(room_id)
+    
     @sio.event
     async def validate_room(sid, data):
         """Check if a room exists (teacher has created it)"""
         room_id = data.get('roomId', '')
+        if sharding.is_sharded() and not sharding.owns(room_id):
+            # Client is not connected to the room's shard yet — ask the owner
+            return {'valid': await sharding.ask_owner(room_id), 'roomId': room_id}
         exists = room_id in rooms and rooms[room_id].get('teacher') is not None
         return {'valid': exists, 'roomId': room_id}
 
@@ -311,6 +554,7 @@ if handlers_available:
         for room_id, room_data in list(rooms.items()):
             if room_data.get('teacher') == sid:
                 print(f'[LEAVE_ROOM] Teacher {sid} explicitly ending room {room_id}')
+                drop_room_sessions(room_id)
                 await sio.emit('room_closed', {
                     'message': 'The host has ended the session.'
                 }, room=room_id)
@@ -319,35 +563,53 @@ if handlers_available:
                         await sio.disconnect(student_sid)
                     except Exception:
                         pass
+                close_room_history(room_id, room_data)
+                drop_room(room_id)
+                telemetry.drop_room(room_id)
+                subscriptions.drop_teacher(sid)
                 del rooms[room_id]
+                cancel_room_timer(room_id)
                 print(f'[LEAVE_ROOM] Room {room_id} deleted')
                 return
             elif sid in room_data.get('students', {}):
                 # Student leaving — just remove them
                 student = room_data['students'].pop(sid, {})
+                drop_sid(sid)
+                remove_student(room_id, sid)
+                subscriptions.remove_student(room_data.get('teacher'), sid)
+                await stop_process(sid)
+                await close_repl(sid)
                 teacher_sid = room_data.get('teacher')
                 if teacher_sid:
-                    await sio.emit('student_list_update', {
-                        'students': room_data['students']
-                    }, to=teacher_sid)
+                    send(sio, teacher_sid, 'student_list_update',
+                         subscriptions.roster(teacher_sid, room_data['students']))
                 print(f'[LEAVE_ROOM] Student {sid} ({student.get("name", "")}) left room {room_id}')
                 return
 
+    @sio.event
+    async def start_timer(sid, data):
+        """Teacher starts (or restarts) the room timer with a duration in seconds."""
+        return await handle_start_timer(sid, sio, rooms, data or {})
+
+    @sio.event
+    async def pause_timer(sid, data=None):
+        """Teacher pauses the room timer."""
+        await handle_pause_timer(sid, sio, rooms, data or {})
+
+    @sio.event
+    async def resume_timer(sid, data=None):
+        """Teacher resumes a paused room timer."""
+        await handle_resume_timer(sid, sio, rooms, data or {})
+
     @sio.event
     async def sync_timer(sid, data):
-        """Teacher broadcasts timer state to all students in the room."""
+        """Legacy client push — only used to start the timer if none exists yet."""
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
-                time_remaining = data.get('timeRemaining', 0)
-                # Store in room data for new joiners
-                room_data['timer_remaining'] = time_remaining
-                room_data['timer_updated_at'] = time.time()
-                # Broadcast to all students
-                for student_sid in room_data.get('students', {}).keys():
-                    await sio.emit('timer_sync', {
-                        'timeRemaining': time_remaining,
-                        'serverTime': time.time()
-                    }, to=student_sid)
+                if room_data.get('timer') is None:
+                    await handle_start_timer(sid, sio, rooms, {
+                        'duration': data.get('timeRemaining', 0)
+                    })
                 break
 
     @sio.event
@@ -355,11 +617,13 @@ if handlers_available:
         """Teacher shares a student's code with all students in the room."""
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
-                for student_sid in room_data.get('students', {}).keys():
-                    await sio.emit('shared_code', {
-                        'code': data.get('code', ''),
-                        'label': data.get('label', 'Shared Code')
-                    }, to=student_sid)
+                # Prefer the server's copy: the teacher may only have a summary
+                student = room_data['students'].get(data.get('studentId'))
+                code = student.get('code', '') if student else data.get('code', '')
+                await emit_room(sio, room_data, room_id, 'shared_code', {
+                    'code': code,
+                    'label': data.get('label', 'Shared Code')
+                }, skip_sid=sid)
                 print(f'[SHARE] Teacher shared student code to {len(room_data.get("students", {}))} students in room {room_id}')
                 break
 
@@ -368,12 +632,49 @@ if handlers_available:
         """Teacher stops sharing — tell students to revert to teacher's code."""
         for room_id, room_data in rooms.items():
             if room_data.get('teacher') == sid:
-                for student_sid in room_data.get('students', {}).keys():
-                    await sio.emit('unshare_code', {}, to=student_sid)
+                await emit_room(sio, room_data, room_id, 'unshare_code', {}, skip_sid=sid)
                 print(f'[UNSHARE] Teacher unshared code in room {room_id}')
                 break
 
 
+def _room_of(sid, data):
+    """Room tag for traced events: explicit roomId, else the room this sid is in."""
+    if isinstance(data, dict) and data.get('roomId'):
+        return data['roomId']
+    for room_id, room_data in rooms.items():
+        if room_data.get('teacher') == sid or sid in room_data.get('students', {}):
+            return room_id
+    return None
+
+
+# Per-socket rate limits (wrapped first so tracing also times rejections)
+admission.install_rate_limits(sio)
+
+# Opt-in latency tracing (TRACE_FILE); no-op when disabled
+instrument_socketio(sio, _room_of)
+
+# Opt-in event recording for replay (RECORD_DIR); outermost, so every
+# inbound event is logged, rate-limited ones included
+install_recorder(sio, rooms)
+
+
+# Set once the ASGI startup has run (the server is accepting connections)
+started = {'at': None}
+
+
+@app.on_event("startup")
+async def start_load_monitor():
+    """Watch event-loop lag and CPU to switch overload mode on and off"""
+    asyncio.create_task(admission.monitor_load(sio))
+
+
+@app.on_event("startup")
+async def start_execution_backends():
+    """Bring up Docker / the fork server in the background; subprocesses work meanwhile"""
+    backends.init_backends()
+    started['at'] = time.time()
+
+
 # FastAPI routes (optional - for health checks, etc.)
 @app.get("/")
 async def root():
@@ -381,10 +682,59 @@ async def root():
     return {"status": "ok", "message": "Classroom Coding Platform API"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Execution telemetry histograms in the Prometheus text format"""
+    return telemetry.metrics_text()
+
+
+@app.get("/rooms/{room_id}")
+async def room_exists(room_id: str):
+    """Whether a room with a teacher exists on this server (used across shards)"""
+    exists = room_id in rooms and rooms[room_id].get('teacher') is not None
+    return {"exists": exists}
+
+
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process is up and its event loop is answering"""
+    return {"status": "alive", "lagMs": admission.state['lagMs']}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: accept traffic once startup has run and the handlers
+    loaded. Optional backends don't gate it (runs fall back to subprocesses);
+    their state is reported so a deploy can also wait for them.
+    """
+    ready = started['at'] is not None and handlers_available
+    body = {"ready": ready, "backendsSettled": backends.settled(),
+            "backends": backends.state()}
+    if handler_import_error:
+        body["error"] = f"handler import failed: {handler_import_error}"
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
 @app.get("/health")
 async def health():
     """Health check endpoint"""
-    return {"status": "healthy", "rooms": len(rooms)}
+    result = {"status": "healthy" if handlers_available else "degraded",
+              "rooms": len(rooms), "outbound": outbound_stats(),
+              "admission": admission.stats(), "backends": backends.state(),
+              "output": output.stats(), "stdin": stdin.stats(),
+              "subscriptions": subscriptions.stats()}
+    if sharding.is_sharded():
+        result["shard"] = {"index": sharding.SHARD_INDEX, "count": sharding.SHARD_COUNT,
+                           "pid": os.getpid(),
+                           "students": sum(len(r.get('students', {})) for r in rooms.values())}
+    if nodepool.NODE_POOL_ENABLED:
+        result["nodePool"] = nodepool.stats()
+    if tracer.enabled:
+        result["tracing"] = tracer.stats()
+    if recorder.enabled:
+        result["recording"] = recorder.stats()
+    return result
 
 
 # Get port from environment variable or default to 3000
@@ -0,0 +1,213 @@
+"""
+Backpressure-aware Outbound Queues
+
+High-volume events for the teacher (code_update, student_output,
+student_list_update, student_diagnostics) go through a bounded per-client
+queue instead of being emitted inline, so a slow teacher connection never
+slows down the student handler that produced the event.
+
+Each client has one sender task that drains its queue in order. Before each
+emit it waits while the client's Engine.IO transport queue holds more than
+OUTBOUND_TRANSPORT_HIGH_WATER packets, i.e. while the client is not keeping
+up. Messages pile up in our queue meanwhile, where:
+
+- a message with a supersede key (the latest code of one student, the
+  roster, ...) replaces the pending message with the same key in place.
+  Keyed slots are never dropped: there is at most one per student and event,
+  and each carries the latest state;
+- one-off messages without a key (student_status, student_reconnected) are
+  limited to OUTBOUND_QUEUE_LIMIT. A client that falls that far behind is
+  resynced rather than left with gaps: its pending one-off messages are
+  dropped and replaced by one fresh state message built by the handler
+  registered with set_resync() (the teacher's full roster).
+
+Messages for a client that is no longer connected are not queued, so a send
+racing a disconnect does not leave a queue and sender behind.
+
+Counters for sent, superseded, dropped and resynced are reported by stats().
+"""
+
+import os
+import asyncio
+from collections import OrderedDict
+
+# Pending one-off (unkeyed) messages per client before it is resynced
+OUTBOUND_QUEUE_LIMIT = int(os.environ.get('OUTBOUND_QUEUE_LIMIT', 256))
+
+# Engine.IO packets allowed in flight to a client before we hold back
+OUTBOUND_TRANSPORT_HIGH_WATER = int(os.environ.get('OUTBOUND_TRANSPORT_HIGH_WATER', 32))
+
+# How often a held-back sender re-checks the transport queue (seconds)
+OUTBOUND_POLL_INTERVAL = 0.02
+
+
+def _student_key(event):
+    return lambda data: (event, data.get('studentId'))
+
+
+# Events where only the newest pending message matters: event -> key(data)
+SUPERSEDE_KEYS = {
+    'code_update': _student_key('code_update'),
+    'student_output': _student_key('student_output'),
+    'student_diagnostics': _student_key('student_diagnostics'),
+    'student_summary': _student_key('student_summary'),
+    'student_list_update': lambda data: ('student_list_update',),
+}
+
+# Pending slot that stands for "send this client a fresh state snapshot"
+_RESYNC_KEY = ('resync',)
+
+# {sid: _ClientQueue}
+_clients = {}
+
+# resync(sid) -> (event, data) or None, set by the app via set_resync()
+_resync = None
+
+_totals = {'sent': 0, 'superseded': 0, 'dropped': 0, 'resynced': 0}
+
+
+class _ClientQueue:
+    """Pending messages for one client plus its sender task."""
+
+    def __init__(self, sid):
+        self.sid = sid
+        # {key: (event, data)}; unkeyed messages get a unique key
+        self.pending = OrderedDict()
+        self.task = None
+        self.sent = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.resynced = 0
+        self.max_depth = 0
+        self.unkeyed = 0
+        self._next_id = 0
+
+    def put(self, event, data):
+        key_fn = SUPERSEDE_KEYS.get(event)
+        if key_fn is not None:
+            key = key_fn(data)
+            if key in self.pending:
+                # Same slot, newer payload: position in the queue is kept
+                self.pending[key] = (event, data)
+                self.superseded += 1
+                _totals['superseded'] += 1
+                return
+        else:
+            if _RESYNC_KEY in self.pending:
+                # The snapshot the client is waiting for already covers this
+                return
+            self._next_id += 1
+            key = self._next_id
+            self.unkeyed += 1
+        self.pending[key] = (event, data)
+        if self.unkeyed > OUTBOUND_QUEUE_LIMIT:
+            self._start_resync()
+        self.max_depth = max(self.max_depth, len(self.pending))
+
+    def _start_resync(self):
+        """Replace the pending one-off messages with a single state snapshot."""
+        for key in [k for k in self.pending if isinstance(k, int)]:
+            del self.pending[key]
+        self.dropped += self.unkeyed
+        _totals['dropped'] += self.unkeyed
+        self.unkeyed = 0
+        self.pending[_RESYNC_KEY] = (None, None)
+        self.resynced += 1
+        _totals['resynced'] += 1
+
+    def pop(self):
+        """Next (event, data) to send, or None if the resync found nothing to send."""
+        key, (event, data) = self.pending.popitem(last=False)
+        if isinstance(key, int):
+            self.unkeyed -= 1
+        elif key == _RESYNC_KEY:
+            return _resync(self.sid) if _resync else None
+        return event, data
+
+
+def set_resync(handler):
+    """
+    Register the snapshot used when a client falls too far behind.
+
+    Args:
+        handler: Callable taking a socket ID and returning (event, data)
+                 with that client's current state, or None
+    """
+    global _resync
+    _resync = handler
+
+
+def send(sio, sid, event, data):
+    """
+    Queue an event for one client without waiting for it to be sent.
+
+    Args:
+        sio: SocketIO server instance
+        sid: Target socket ID (ignored if None)
+        event: Event name
+        data: Event payload
+    """
+    if sid is None:
+        return
+    client = _clients.get(sid)
+    if client is None:
+        if not sio.manager.is_connected(sid, '/'):
+            return
+        client = _clients[sid] = _ClientQueue(sid)
+    client.put(event, data)
+    if client.task is None or client.task.done():
+        client.task = asyncio.create_task(_drain(sio, sid, client))
+
+
+async def _drain(sio, sid, client):
+    """Emit a client's pending messages in order, pacing to its transport."""
+    try:
+        while client.pending:
+            while _transport_backlog(sio, sid) > OUTBOUND_TRANSPORT_HIGH_WATER:
+                await asyncio.sleep(OUTBOUND_POLL_INTERVAL)
+                if _clients.get(sid) is not client:
+                    return
+            if not client.pending:
+                break
+            message = client.pop()
+            if message is None:
+                continue
+            event, data = message
+            await sio.emit(event, data, to=sid)
+            client.sent += 1
+            _totals['sent'] += 1
+    except Exception as e:
+        print(f'[OUTBOUND] Sender for {sid} stopped: {e}')
+
+
+def _transport_backlog(sio, sid):
+    """Packets waiting in the client's Engine.IO queue (0 if unknown)."""
+    try:
+        eio_sid = sio.manager.eio_sid_from_sid(sid, '/')
+        socket = sio.eio.sockets.get(eio_sid)
+        return socket.queue.qsize() if socket else 0
+    except Exception:
+        return 0
+
+
+def close_client(sid):
+    """Discard a disconnected client's queue and stop its sender."""
+    client = _clients.pop(sid, None)
+    if client and client.task and not client.task.done():
+        client.task.cancel()
+
+
+def stats():
+    """Global counters plus the clients that currently have a backlog."""
+    backlogged = {
+        sid: {
+            'depth': len(c.pending),
+            'maxDepth': c.max_depth,
+            'superseded': c.superseded,
+            'dropped': c.dropped,
+            'resynced': c.resynced,
+        }
+        for sid, c in _clients.items() if c.pending
+    }
+    return dict(_totals, clients=len(_clients), backlogged=backlogged,
+                queueLimit=OUTBOUND_QUEUE_LIMIT)
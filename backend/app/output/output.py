@@ -0,0 +1,251 @@
+"""
+Run Output Spill
+
+Collects a run's output stream (stdout, stderr, or the teacher's relayed
+console) without holding all of it in memory. Up to OUTPUT_SPILL_BYTES the
+text is kept as-is. Past that, everything is written to a per-run file in a
+spill directory and only the first OUTPUT_HEAD_BYTES and the last
+OUTPUT_TAIL_BYTES stay in memory. The windowed text (head, an "omitted"
+marker, tail) is what code_done, student_output, teacher_output and room
+state carry; info() describes the file so clients can page through the rest.
+
+get_output_range reads byte ranges of a spilled stream from a memory-mapped
+view of its file, aligned to UTF-8 character boundaries and capped at
+OUTPUT_RANGE_MAX bytes per request. Spilled streams are addressed by a
+random id that is only sent to whoever could already see that output.
+
+A user's previous spills are released when they start a new run or leave;
+at most OUTPUT_MAX_SPILLED files are kept, the oldest going first.
+
+All spill-file I/O (writes, range reads, deletes) runs in order on one
+background thread, never on the event loop; _lock only guards the index of
+spilled streams. Appends after a spill are batched in memory and handed to
+that thread OUTPUT_WRITE_BATCH bytes at a time (and before a range read).
+"""
+
+import os
+import mmap
+import atexit
+import shutil
+import secrets
+import tempfile
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+OUTPUT_SPILL_BYTES = int(os.environ.get('OUTPUT_SPILL_BYTES', 1024 * 1024))
+OUTPUT_HEAD_BYTES = int(os.environ.get('OUTPUT_HEAD_BYTES', 32 * 1024))
+OUTPUT_TAIL_BYTES = int(os.environ.get('OUTPUT_TAIL_BYTES', 64 * 1024))
+OUTPUT_RANGE_MAX = int(os.environ.get('OUTPUT_RANGE_MAX', 256 * 1024))
+OUTPUT_MAX_SPILLED = int(os.environ.get('OUTPUT_MAX_SPILLED', 64))
+OUTPUT_WRITE_BATCH = int(os.environ.get('OUTPUT_WRITE_BATCH', 256 * 1024))
+
+# Parent of this process's spill directory (default: system temp dir)
+OUTPUT_SPILL_DIR = os.environ.get('OUTPUT_SPILL_DIR')
+
+# Streamed in place of the chunk that made a stream spill; later chunks are
+# only saved
+SPILL_NOTICE = '\n… output too large to stream, the rest is shown when the run ends …\n'
+
+_lock = threading.Lock()
+_spill_dir = None
+
+# One thread, so a range read always sees every write queued before it and a
+# file is never deleted under a read
+_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='output-spill')
+
+# {buffer_id: OutputBuffer}, oldest spill first
+_spilled = OrderedDict()
+
+_stats = {'spilled': 0, 'evicted': 0, 'rangesServed': 0, 'rangeBytes': 0}
+
+
+def _directory():
+    """This process's spill directory, created on first use and removed at exit."""
+    global _spill_dir
+    if _spill_dir is None:
+        parent = OUTPUT_SPILL_DIR or tempfile.gettempdir()
+        os.makedirs(parent, exist_ok=True)
+        _spill_dir = tempfile.mkdtemp(prefix='run-output-', dir=parent)
+        atexit.register(shutil.rmtree, _spill_dir, True)
+    return _spill_dir
+
+
+class OutputBuffer:
+    """One output stream of a run, spilled to disk once it gets large."""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.id = None
+        self.size = 0
+        self._chunks = []
+        self._head = b''
+        self._tail = deque()
+        self._tail_size = 0
+        self._unwritten = []
+        self._unwritten_size = 0
+        self._file = None
+        self._map = None
+
+    @property
+    def spilled(self):
+        return self.id is not None
+
+    def append(self, text):
+        """Add text to the stream. Returns True if this call made it spill."""
+        data = text.encode('utf-8')
+        self.size += len(data)
+        if self.id is None:
+            self._chunks.append(data)
+            if self.size <= OUTPUT_SPILL_BYTES:
+                return False
+            self._spill()
+            return True
+        self._unwritten.append(data)
+        self._unwritten_size += len(data)
+        if self._unwritten_size >= OUTPUT_WRITE_BATCH:
+            self.flush()
+        self._push_tail(data)
+        return False
+
+    def flush(self):
+        """Hand batched appends to the I/O thread."""
+        if self._unwritten:
+            _io.submit(self._write, b''.join(self._unwritten))
+            self._unwritten = []
+            self._unwritten_size = 0
+
+    def _spill(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self._head = data[:OUTPUT_HEAD_BYTES]
+        self._push_tail(data[-OUTPUT_TAIL_BYTES:])
+        self.id = secrets.token_urlsafe(12)
+        _io.submit(self._open, data)
+        with _lock:
+            _spilled[self.id] = self
+            _stats['spilled'] += 1
+            while len(_spilled) > OUTPUT_MAX_SPILLED:
+                _, oldest = _spilled.popitem(last=False)
+                _stats['evicted'] += 1
+                _io.submit(oldest._discard)
+        print(f'[OUTPUT] Output of {self.owner} passed {OUTPUT_SPILL_BYTES} bytes, '
+              f'spilling to disk ({self.id})')
+
+    def _open(self, data):
+        """Create the spill file with the data so far (I/O thread)."""
+        self._file = open(os.path.join(_directory(), self.id), 'w+b')
+        self._file.write(data)
+
+    def _write(self, data):
+        if self._file is not None and not self._file.closed:
+            self._file.write(data)
+
+    def _push_tail(self, data):
+        self._tail.append(data)
+        self._tail_size += len(data)
+        while self._tail_size - len(self._tail[0]) >= OUTPUT_TAIL_BYTES:
+            self._tail_size -= len(self._tail.popleft())
+
+    def text(self):
+        """The whole stream, or head + marker + tail once spilled."""
+        if self.id is None:
+            return b''.join(self._chunks).decode('utf-8', errors='replace')
+        tail = b''.join(self._tail)[-OUTPUT_TAIL_BYTES:]
+        omitted = self.size - len(self._head) - len(tail)
+        return (self._head.decode('utf-8', errors='ignore')
+                + f'\n\n… {omitted:,} bytes omitted …\n\n'
+                + tail.decode('utf-8', errors='ignore'))
+
+    def info(self):
+        """
+        Paging info for a spilled stream (None while it is in memory):
+        id, total size in bytes, and the byte ranges the text() window covers.
+        """
+        if self.id is None:
+            return None
+        # Clients may page through the file right after seeing this
+        self.flush()
+        tail = min(self._tail_size, OUTPUT_TAIL_BYTES)
+        return {'id': self.id, 'size': self.size,
+                'head': len(self._head), 'tailStart': self.size - tail}
+
+    def read(self, offset, length):
+        """
+        Read up to length bytes at offset, widened/narrowed to whole
+        characters (I/O thread).
+        """
+        if self._file is None or self._file.closed:
+            return None
+        self._file.flush()
+        if self._map is None or len(self._map) < self.size:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = self._map
+        size = len(view)
+        start = max(0, min(offset, size))
+        end = min(size, start + max(0, min(length, OUTPUT_RANGE_MAX)))
+        # Don't start or stop in the middle of a UTF-8 sequence
+        while start < size and view[start] & 0xC0 == 0x80:
+            start += 1
+        while start < end < size and view[end] & 0xC0 == 0x80:
+            end -= 1
+        return start, end, view[start:end].decode('utf-8', errors='replace')
+
+    def _discard(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            path = self._file.name
+            self._file.close()
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+async def get_range(buffer_id, offset, length):
+    """
+    Serve a byte range of a spilled stream.
+
+    Returns {'id', 'offset', 'end', 'size', 'text'} or an error dict.
+    """
+    with _lock:
+        buffer = _spilled.get(buffer_id)
+    if buffer is None:
+        return {'error': 'Output no longer available'}
+    buffer.flush()
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(_io, buffer.read, offset, length)
+    if result is None:
+        # Released or evicted while the read was queued
+        return {'error': 'Output no longer available'}
+    start, end, text = result
+    with _lock:
+        _stats['rangesServed'] += 1
+        _stats['rangeBytes'] += end - start
+    return {'id': buffer_id, 'offset': start, 'end': end, 'size': buffer.size, 'text': text}
+
+
+def release(owner):
+    """Delete the spill files of a user's earlier runs."""
+    with _lock:
+        for buffer_id in [i for i, b in _spilled.items() if b.owner == owner]:
+            _io.submit(_spilled.pop(buffer_id)._discard)
+
+
+def rename_owner(old_owner, new_owner):
+    """Move a user's spill files to their new sid (session resumed)."""
+    with _lock:
+        for buffer in _spilled.values():
+            if buffer.owner == old_owner:
+                buffer.owner = new_owner
+
+
+def stats():
+    with _lock:
+        on_disk = sum(b.size for b in _spilled.values())
+        return dict(_stats, files=len(_spilled), bytesOnDisk=on_disk)
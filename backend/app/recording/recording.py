@@ -0,0 +1,314 @@
+"""
+Event Recording (opt-in)
+
+Records every inbound Socket.IO event with its timing to a compact binary
+log, so real classroom traffic can be replayed against a local server
+(benchmarks/replay.py) to check capacity changes.
+
+Enable by setting RECORD_DIR; each server process writes
+events-<start time>-<pid>.rec there. RECORD_PAYLOADS picks what is kept:
+
+- size (default): event, time, socket, room, role and payload size only;
+- redacted: also the payload, with code, program input/output and names
+  redacted (see redact()).
+
+Log format (little-endian). Header: MAGIC, start time (double, epoch
+seconds), payload mode (byte). Then records, each starting with a type byte:
+
+- b'S': a string (socket id, room id or event name) — u16 length + UTF-8.
+  Strings are numbered in order of appearance from 0 and defined before
+  first use, so each one is written once.
+- b'E': an event — _EVENT fields (microseconds since start, socket,
+  room or NO_ROOM, event name, role, payload size in bytes); in redacted
+  mode followed by u32 length + zlib-compressed JSON payload.
+
+String indexes are u32 (MAGIC ORCAREC2); ORCAREC1 logs, with a u16 event
+name index, can still be read. Buffered records are written to disk by a
+background thread, and a failure to record an event is logged and the
+event dropped from the log, never raised into its handler.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import zlib
+import queue
+import atexit
+import struct
+import hashlib
+import keyword
+import builtins
+import threading
+
+RECORD_DIR = os.environ.get('RECORD_DIR')
+RECORD_PAYLOADS = os.environ.get('RECORD_PAYLOADS', 'size')
+
+# Bytes buffered in memory before being appended to the log
+RECORD_FLUSH_BYTES = 64 * 1024
+# ...or seconds since the last write, whichever comes first
+RECORD_FLUSH_SECONDS = 1.0
+
+MAGIC = b'ORCAREC2'
+_MAGIC_V1 = b'ORCAREC1'
+NO_ROOM = 0xFFFFFFFF
+ROLE_NAMES = ('unknown', 'teacher', 'student')
+_HEADER = struct.Struct('<dB')
+_STRING = struct.Struct('<H')
+_EVENT = struct.Struct('<QIIIBI')
+_EVENT_V1 = struct.Struct('<QIIHBI')
+_PAYLOAD = struct.Struct('<I')
+
+# Payload fields holding code or program text, redacted with redact_code()
+_CODE_FIELDS = {'code', 'text', 'output', 'error'}
+# Payload fields holding names, replaced by a stable pseudonym
+_NAME_FIELDS = {'userName', 'name'}
+# Payload fields that are meaningless outside the recorded session
+_DROP_FIELDS = {'sessionToken', 'lastSeq'}
+
+# Identifiers redact_code() leaves alone, so redacted programs still run
+_KEEP_NAMES = (set(keyword.kwlist) | set(dir(builtins)) | set(sys.stdlib_module_names) | {
+    'self', 'cls', 'console', 'log', 'require', 'module', 'exports', 'process',
+    'const', 'let', 'var', 'function', 'return', 'new', 'this', 'typeof',
+    'undefined', 'null', 'true', 'false', 'Math', 'JSON', 'Array', 'Object',
+    'String', 'Number', 'Promise', 'async', 'await', 'readline',
+    # String prefixes (f"...", rb'...')
+    'f', 'r', 'b', 'u', 'fr', 'rf', 'br', 'rb', 'F', 'R', 'B', 'U',
+})
+# An identifier, with the dot before it if it is an attribute; not the
+# letters of an escape sequence
+_IDENTIFIER = re.compile(r'(?<!\\)(\.?)\b([A-Za-z_]\w*)\b')
+
+
+def _pseudonym(value, prefix):
+    return prefix + hashlib.blake2s(value.encode(), digest_size=3).hexdigest()
+
+
+def redact_code(code):
+    """
+    Rename every identifier that is not a keyword, builtin, standard module
+    or attribute to a stable pseudonym (words in strings and comments
+    included), keeping layout, numbers and punctuation. The result still
+    parses and mostly still runs, with the same shape and size.
+    """
+    def rename(match):
+        dot, name = match.groups()
+        if dot or name in _KEEP_NAMES or name.startswith('__'):
+            return match.group(0)
+        return _pseudonym(name, 'v')
+
+    return _IDENTIFIER.sub(rename, code)
+
+
+def redact(data):
+    """Copy of an event payload with code, program text and names redacted."""
+    if isinstance(data, dict):
+        result = {}
+        for key, value in data.items():
+            if key in _DROP_FIELDS:
+                continue
+            if key in _CODE_FIELDS and isinstance(value, str):
+                result[key] = redact_code(value)
+            elif key in _NAME_FIELDS and isinstance(value, str):
+                result[key] = _pseudonym(value, 'user-')
+            else:
+                result[key] = redact(value)
+        return result
+    if isinstance(data, list):
+        return [redact(item) for item in data]
+    return data
+
+
+class Recorder:
+    """Appends inbound events to a binary log."""
+
+    def __init__(self, directory, mode):
+        self.path = None
+        self.mode = mode
+        self.events = 0
+        self.dropped = 0
+        self.bytes = 0
+        self._strings = {}
+        self._buffer = bytearray()
+        self._origin = time.perf_counter()
+        self._last_flush = self._origin
+        self._pending = queue.Queue()
+        self._writer = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(
+                directory, f'events-{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}.rec')
+            self._buffer += MAGIC + _HEADER.pack(time.time(), 1 if mode == 'redacted' else 0)
+            atexit.register(self.close)
+            print(f'[RECORD] Recording events to {self.path} (payloads: {mode})')
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def _string(self, value):
+        index = self._strings.get(value)
+        if index is None:
+            index = self._strings[value] = len(self._strings)
+            raw = value.encode('utf-8')[:0xFFFF]
+            self._buffer += b'S' + _STRING.pack(len(raw)) + raw
+        return index
+
+    def record(self, sid, room_id, role, event, data):
+        """Append one inbound event."""
+        now = time.perf_counter()
+        payload = b''
+        if data is None or isinstance(data, (dict, list, str, int, float, bool)):
+            size = len(json.dumps(data, separators=(',', ':'))) if data is not None else 0
+            if self.mode == 'redacted' and data is not None:
+                payload = zlib.compress(
+                    json.dumps(redact(data), separators=(',', ':')).encode('utf-8'))
+        else:
+            size = 0
+        socket_index = self._string(sid or '')
+        room_index = self._string(room_id) if room_id else NO_ROOM
+        event_index = self._string(event)
+        self._buffer += b'E' + _EVENT.pack(
+            int((now - self._origin) * 1_000_000), socket_index, room_index,
+            event_index, role, size)
+        if self.mode == 'redacted':
+            self._buffer += _PAYLOAD.pack(len(payload)) + payload
+        self.events += 1
+        if len(self._buffer) >= RECORD_FLUSH_BYTES or now - self._last_flush >= RECORD_FLUSH_SECONDS:
+            self.flush()
+
+    def record_safely(self, sid, room_id, role, event, data):
+        """record(), but a failure only drops the event from the log."""
+        try:
+            self.record(sid, room_id, role, event, data)
+        except Exception as e:
+            self.dropped += 1
+            print(f'[RECORD] Could not record {event} from {sid}: {e}')
+
+    def flush(self):
+        """Hand buffered records to the writer thread."""
+        if not self._buffer:
+            return
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='record-writer',
+                                            daemon=True)
+            self._writer.start()
+        self._pending.put(bytes(self._buffer))
+        self.bytes += len(self._buffer)
+        self._buffer = bytearray()
+        self._last_flush = time.perf_counter()
+
+    def close(self):
+        """Flush and wait until everything is on disk (at exit)."""
+        self.flush()
+        if self._writer is not None:
+            self._pending.join()
+
+    def _write_loop(self):
+        while True:
+            chunk = self._pending.get()
+            try:
+                with open(self.path, 'ab') as f:
+                    f.write(chunk)
+            except OSError as e:
+                print(f'[RECORD] Could not write {self.path}: {e}')
+            finally:
+                self._pending.task_done()
+
+    def stats(self):
+        return {'path': self.path, 'mode': self.mode, 'events': self.events,
+                'dropped': self.dropped, 'bytesWritten': self.bytes + len(self._buffer)}
+
+
+recorder = Recorder(RECORD_DIR, RECORD_PAYLOADS)
+
+
+def install_recorder(sio, rooms):
+    """Wrap every registered Socket.IO handler so its events are recorded."""
+    if not recorder.enabled:
+        return
+    handlers = sio.handlers.get('/', {})
+    for event, handler in list(handlers.items()):
+        handlers[event] = _recorded(event, handler, rooms)
+    print(f'[RECORD] Recording {len(handlers)} Socket.IO events')
+
+
+def _room_and_role(rooms, sid, data):
+    """(room id, role index) of the socket an event came from."""
+    for room_id, room_data in rooms.items():
+        if room_data.get('teacher') == sid:
+            return room_id, 1
+        if sid in room_data.get('students', {}):
+            return room_id, 2
+    if isinstance(data, dict) and isinstance(data.get('roomId'), str):
+        return data['roomId'], 0
+    return None, 0
+
+
+def _recorded(event, handler, rooms):
+    async def recorded_handler(sid, *args):
+        if event in ('connect', 'disconnect'):
+            # Recorded once the handler accepted its arguments: python-socketio
+            # retries these without auth / reason after a TypeError. Their
+            # environ and reason are not event payloads.
+            room_id, role = _room_and_role(rooms, sid, None)
+            result = await handler(sid, *args)
+            recorder.record_safely(sid, room_id, role, event, None)
+            return result
+        data = args[0] if args else None
+        room_id, role = _room_and_role(rooms, sid, data)
+        recorder.record_safely(sid, room_id, role, event, data)
+        return await handler(sid, *args)
+
+    recorded_handler.__name__ = getattr(handler, '__name__', event)
+    return recorded_handler
+
+
+def read_log(path):
+    """
+    Parse a log written by Recorder.
+
+    Returns (header, events): header is {'startedAt', 'mode'}; each event is
+    {'t' (seconds since start), 'sid', 'room', 'role', 'event', 'size', 'data'}
+    with data None unless the log has redacted payloads.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    if raw[:len(MAGIC)] == MAGIC:
+        event_struct = _EVENT
+    elif raw[:len(_MAGIC_V1)] == _MAGIC_V1:
+        event_struct = _EVENT_V1
+    else:
+        raise ValueError(f'{path} is not an event log')
+    started_at, mode = _HEADER.unpack_from(raw, len(MAGIC))
+    offset = len(MAGIC) + _HEADER.size
+    strings, events = [], []
+    while offset < len(raw):
+        kind = raw[offset:offset + 1]
+        offset += 1
+        if kind == b'S':
+            (length,) = _STRING.unpack_from(raw, offset)
+            offset += _STRING.size
+            strings.append(raw[offset:offset + length].decode('utf-8'))
+            offset += length
+        elif kind == b'E':
+            t_us, socket_index, room_index, event_index, role, size = event_struct.unpack_from(
+                raw, offset)
+            offset += event_struct.size
+            data = None
+            if mode == 1:
+                (length,) = _PAYLOAD.unpack_from(raw, offset)
+                offset += _PAYLOAD.size
+                if length:
+                    data = json.loads(zlib.decompress(raw[offset:offset + length]))
+                offset += length
+            events.append({
+                't': t_us / 1_000_000, 'sid': strings[socket_index],
+                'room': strings[room_index] if room_index != NO_ROOM else None,
+                'role': ROLE_NAMES[role], 'event': strings[event_index],
+                'size': size, 'data': data,
+            })
+        else:
+            raise ValueError(f'corrupt event log at byte {offset - 1}')
+    return {'startedAt': started_at, 'mode': 'redacted' if mode == 1 else 'size'}, events
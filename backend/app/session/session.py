@@ -0,0 +1,193 @@
+"""
+Resumable Student Sessions
+
+Gives each student a session token that survives reconnects. A Socket.IO sid
+changes every time the connection drops; the token does not. While a student
+is disconnected their room entry, running process and output stream are kept
+for RESUME_GRACE_SECONDS, and every event meant for them is recorded in a
+bounded per-session buffer. A client that rejoins with its token and the last
+sequence number it saw is moved onto its new sid and replayed what it missed.
+
+Events sent through emit_to()/emit_room() carry a per-room `_seq` number.
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from collections import deque
+
+# How long a disconnected student's state is kept for a resume
+RESUME_GRACE_SECONDS = int(os.environ.get('RESUME_GRACE_SECONDS', 30))
+
+# Events kept per session for replay
+EVENT_BUFFER_SIZE = int(os.environ.get('EVENT_BUFFER_SIZE', 200))
+
+# {token: {room_id, sid, connected, disconnected_at, buffer: deque[(seq, event, data)],
+#          expiry_task}}
+sessions = {}
+
+# {sid: token} for the sid each session is currently using
+_sid_tokens = {}
+
+# {old_sid: new_sid} so work started on an old sid (e.g. a running process)
+# keeps reaching the student after a resume
+_aliases = {}
+
+# {room_id: last sequence number issued}
+_room_seq = {}
+
+
+def create_session(room_id, sid):
+    """Issue a new session token for a student joining a room."""
+    token = uuid.uuid4().hex
+    sessions[token] = {
+        'room_id': room_id,
+        'sid': sid,
+        'connected': True,
+        'disconnected_at': None,
+        'buffer': deque(maxlen=EVENT_BUFFER_SIZE),
+        'expiry_task': None,
+    }
+    _sid_tokens[sid] = token
+    return token
+
+
+def token_for(sid):
+    """Return the session token a sid is using, or None."""
+    return _sid_tokens.get(resolve_sid(sid))
+
+
+def resolve_sid(sid):
+    """Follow resume aliases to the sid the student is using now."""
+    seen = 0
+    while sid in _aliases and seen < 16:
+        sid = _aliases[sid]
+        seen += 1
+    return sid
+
+
+def _next_seq(room_id):
+    seq = _room_seq.get(room_id, 0) + 1
+    _room_seq[room_id] = seq
+    return seq
+
+
+async def emit_to(sio, sid, event, data):
+    """
+    Emit to one socket. If it belongs to a student session the event is
+    sequenced and buffered, so it can be replayed after a reconnect.
+    """
+    sid = resolve_sid(sid)
+    token = _sid_tokens.get(sid)
+    if token is not None:
+        session = sessions[token]
+        data = dict(data, _seq=_next_seq(session['room_id']))
+        session['buffer'].append((data['_seq'], event, data))
+        if not session['connected']:
+            return
+    await sio.emit(event, data, to=sid)
+
+
+async def emit_room(sio, room, room_id, event, data, skip_sid=None):
+    """
+    Broadcast to a Socket.IO room with one emit, buffering the event for
+    every student session in the room.
+    """
+    data = dict(data, _seq=_next_seq(room_id))
+    for student_sid in room.get('students', {}):
+        token = _sid_tokens.get(student_sid)
+        if token is not None:
+            sessions[token]['buffer'].append((data['_seq'], event, data))
+    await sio.emit(event, data, room=room_id, skip_sid=skip_sid)
+
+
+def mark_disconnected(sid, on_expire):
+    """
+    Keep a disconnected student's session for RESUME_GRACE_SECONDS.
+    on_expire() is awaited if they don't come back in time.
+
+    Returns False if the sid has no session (caller cleans up immediately).
+    """
+    token = _sid_tokens.get(sid)
+    if token is None:
+        return False
+    session = sessions[token]
+    session['connected'] = False
+    session['disconnected_at'] = time.time()
+
+    async def _expire():
+        await asyncio.sleep(RESUME_GRACE_SECONDS)
+        if sessions.get(token) is session and not session['connected']:
+            session['expiry_task'] = None  # don't cancel ourselves
+            drop_session(token)
+            await on_expire()
+
+    session['expiry_task'] = asyncio.create_task(_expire())
+    return True
+
+
+def is_connected(token):
+    """True if the session's current sid is still connected."""
+    session = sessions.get(token)
+    return bool(session and session['connected'])
+
+
+def resume(token, room_id, new_sid):
+    """
+    Move a session onto a new sid.
+
+    Returns the previous sid, or None if the token is unknown or belongs to
+    another room.
+    """
+    session = sessions.get(token)
+    if session is None or session['room_id'] != room_id:
+        return None
+    old_sid = session['sid']
+    if session['expiry_task']:
+        session['expiry_task'].cancel()
+        session['expiry_task'] = None
+    _sid_tokens.pop(old_sid, None)
+    _sid_tokens[new_sid] = token
+    if old_sid != new_sid:
+        _aliases[old_sid] = new_sid
+    session['sid'] = new_sid
+    session['connected'] = True
+    session['disconnected_at'] = None
+    return old_sid
+
+
+def missed_events(token, last_seq):
+    """Buffered (event, data) pairs with a sequence number above last_seq."""
+    session = sessions.get(token)
+    if session is None:
+        return []
+    return [(event, data) for seq, event, data in session['buffer'] if seq > last_seq]
+
+
+def drop_session(token):
+    """Forget a session (student left for good)."""
+    session = sessions.pop(token, None)
+    if session is None:
+        return
+    if session['expiry_task']:
+        session['expiry_task'].cancel()
+    _sid_tokens.pop(session['sid'], None)
+    stale = [old for old in _aliases if resolve_sid(old) == session['sid']]
+    for old in stale:
+        del _aliases[old]
+
+
+def drop_sid(sid):
+    """Forget the session attached to a sid, if any."""
+    token = _sid_tokens.get(sid)
+    if token is not None:
+        drop_session(token)
+
+
+def drop_room_sessions(room_id):
+    """Forget every session in a room (room closed)."""
+    for token, session in list(sessions.items()):
+        if session['room_id'] == room_id:
+            drop_session(token)
+    _room_seq.pop(room_id, None)
@@ -0,0 +1,316 @@
+"""
+Shard Router
+
+Runs the server in sharding mode: starts SHARDS worker processes (each a
+normal uvicorn server with its own event loop, on SHARD_BASE_PORT + index)
+and listens on PORT as a thin TCP router in front of them.
+
+Clients connect with the room in the query string (socket.io-client
+`query: { roomId }`). The router reads only the first request head of each
+connection, picks shard_for(roomId) and then just pipes bytes both ways, so
+WebSocket traffic is not parsed or re-framed. Long-polling requests are
+forwarded with `Connection: close` so every poll is routed on its own.
+Connections without a roomId go to shard 0.
+
+GET /health and GET /metrics are answered by the router itself, aggregating
+every shard's /health and /metrics. /health/live answers for the router;
+/health/ready is 200 only when every shard is ready. Workers that exit are restarted (the
+rooms they held are lost, as with a single-process restart).
+
+Usage (from backend/):
+    SHARDS=4 PORT=3000 python -m app.sharding.router
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import asyncio
+import subprocess
+from urllib.parse import parse_qs
+
+from app.sharding.sharding import shard_for
+
+PORT = int(os.environ.get('PORT', 3000))
+SHARDS = int(os.environ.get('SHARDS', os.cpu_count() or 2))
+SHARD_BASE_PORT = int(os.environ.get('SHARD_BASE_PORT', PORT + 1))
+
+# Seconds a client may take to send its first request head
+ROUTER_HEADER_TIMEOUT = 10
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Shard:
+    """One worker process and its routing counters."""
+
+    def __init__(self, index):
+        self.index = index
+        self.port = SHARD_BASE_PORT + index
+        self.proc = None
+        self.restarts = 0
+        self.active = 0
+        self.routed = 0
+
+    def start(self):
+        env = dict(os.environ,
+                   SHARD_INDEX=str(self.index), SHARD_COUNT=str(SHARDS),
+                   SHARD_BASE_PORT=str(SHARD_BASE_PORT), PORT=str(self.port))
+        self.proc = subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'app.main:socket_app',
+             '--host', '127.0.0.1', '--port', str(self.port), '--log-level', 'warning'],
+            cwd=_BACKEND_DIR, env=env,
+        )
+        print(f'[ROUTER] Shard {self.index} started pid={self.proc.pid} port={self.port}')
+
+    def alive(self):
+        return self.proc is not None and self.proc.poll() is None
+
+
+shards = [Shard(i) for i in range(SHARDS)]
+
+
+async def _http_get(port, path, timeout=2.0):
+    """Minimal GET against a shard. Returns (status, body bytes)."""
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    head, _, body = raw.partition(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    if b'transfer-encoding: chunked' in head.lower():
+        body = _dechunk(body)
+    return status, body
+
+
+def _dechunk(body):
+    out = b''
+    while body:
+        size_line, _, rest = body.partition(b'\r\n')
+        size = int(size_line.split(b';')[0], 16)
+        if size == 0:
+            break
+        out += rest[:size]
+        body = rest[size + 2:]
+    return out
+
+
+async def _health():
+    shard_reports = []
+    for shard in shards:
+        report = {'index': shard.index, 'port': shard.port, 'alive': shard.alive(),
+                  'pid': shard.proc.pid if shard.proc else None,
+                  'restarts': shard.restarts, 'activeConnections': shard.active,
+                  'routedConnections': shard.routed}
+        if report['alive']:
+            try:
+                started = time.perf_counter()
+                _, body = await _http_get(shard.port, '/health')
+                report['latencyMs'] = round((time.perf_counter() - started) * 1000, 2)
+                report['health'] = json.loads(body)
+            except Exception as e:
+                report['alive'] = False
+                report['error'] = str(e)
+        shard_reports.append(report)
+    healthy = all(r['alive'] for r in shard_reports)
+    return {
+        'status': 'healthy' if healthy else 'degraded',
+        'shards': shard_reports,
+        'rooms': sum(r.get('health', {}).get('rooms', 0) for r in shard_reports),
+        'students': sum(r.get('health', {}).get('shard', {}).get('students', 0)
+                        for r in shard_reports),
+    }
+
+
+def _label_shard(line, index):
+    """Add shard="index" to one Prometheus sample line."""
+    name, _, rest = line.partition(' ')
+    if '{' in name:
+        return name.replace('{', f'{{shard="{index}",', 1) + ' ' + rest
+    return f'{name}{{shard="{index}"}} {rest}'
+
+
+async def _ready():
+    reports = []
+    for shard in shards:
+        try:
+            status, body = await _http_get(shard.port, '/health/ready', timeout=1)
+            reports.append({'index': shard.index, 'ready': status == 200,
+                            **json.loads(body)})
+        except Exception as e:
+            reports.append({'index': shard.index, 'ready': False, 'error': str(e)})
+    return all(r['ready'] for r in reports), {'shards': reports}
+
+
+async def _metrics():
+    lines, seen_types = [], set()
+    for shard in shards:
+        if not shard.alive():
+            continue
+        try:
+            _, body = await _http_get(shard.port, '/metrics')
+        except Exception:
+            continue
+        for line in body.decode('utf-8').splitlines():
+            if not line:
+                continue
+            if line.startswith('#'):
+                if line not in seen_types:
+                    seen_types.add(line)
+                    lines.append(line)
+            else:
+                lines.append(_label_shard(line, shard.index))
+    return '\n'.join(lines) + '\n'
+
+
+async def _respond(writer, status, content_type, body):
+    writer.write(
+        f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+        f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    writer.close()
+
+
+def _force_close(head):
+    """Rewrite a plain HTTP request head so the upstream closes after replying."""
+    lines = head[:-4].split(b'\r\n')
+    kept = [lines[0]] + [l for l in lines[1:] if not l.lower().startswith(b'connection:')]
+    return b'\r\n'.join(kept + [b'Connection: close']) + b'\r\n\r\n'
+
+
+async def _pipe(reader, writer):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+
+
+async def handle_connection(reader, writer):
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), ROUTER_HEADER_TIMEOUT)
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+            ConnectionError):
+        writer.close()
+        return
+
+    try:
+        _, target, _ = head.split(b'\r\n', 1)[0].decode('latin-1').split(' ', 2)
+    except ValueError:
+        writer.close()
+        return
+    path, _, query = target.partition('?')
+
+    if path == '/health':
+        await _respond(writer, '200 OK', 'application/json', json.dumps(await _health()).encode())
+        return
+    if path == '/health/live':
+        await _respond(writer, '200 OK', 'application/json', b'{"status": "alive"}')
+        return
+    if path == '/health/ready':
+        ready, body = await _ready()
+        await _respond(writer, '200 OK' if ready else '503 Service Unavailable',
+                       'application/json', json.dumps(dict(body, ready=ready)).encode())
+        return
+    if path == '/metrics':
+        await _respond(writer, '200 OK', 'text/plain; version=0.0.4', (await _metrics()).encode())
+        return
+
+    room_id = parse_qs(query).get('roomId', [None])[0]
+    shard = shards[shard_for(room_id, SHARDS)]
+    if b'\r\nupgrade: websocket' not in head.lower():
+        head = _force_close(head)
+
+    try:
+        up_reader, up_writer = await asyncio.open_connection('127.0.0.1', shard.port)
+    except OSError:
+        await _respond(writer, '503 Service Unavailable', 'text/plain',
+                       f'shard {shard.index} unavailable'.encode())
+        return
+
+    shard.active += 1
+    shard.routed += 1
+    try:
+        up_writer.write(head)
+        tasks = [asyncio.create_task(_pipe(reader, up_writer)),
+                 asyncio.create_task(_pipe(up_reader, writer))]
+        _, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+    finally:
+        shard.active -= 1
+        up_writer.close()
+        writer.close()
+
+
+async def _wait_ready(shard, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not shard.alive():
+            raise RuntimeError(f'shard {shard.index} exited during startup')
+        try:
+            status, _ = await _http_get(shard.port, '/health', timeout=1)
+            if status == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f'shard {shard.index} not ready after {timeout}s')
+
+
+async def _supervise():
+    """Restart workers that exit."""
+    while True:
+        await asyncio.sleep(1)
+        for shard in shards:
+            if not shard.alive():
+                print(f'[ROUTER] Shard {shard.index} exited '
+                      f'(code {shard.proc.returncode}), restarting')
+                shard.restarts += 1
+                shard.start()
+
+
+def _stop_shards(*_):
+    for shard in shards:
+        if shard.alive():
+            shard.proc.terminate()
+    for shard in shards:
+        if shard.proc:
+            try:
+                shard.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                shard.proc.kill()
+
+
+async def main():
+    for shard in shards:
+        shard.start()
+    await asyncio.gather(*(_wait_ready(shard) for shard in shards))
+    server = await asyncio.start_server(handle_connection, '0.0.0.0', PORT)
+    print(f'[ROUTER] Routing port {PORT} to {SHARDS} shards on ports '
+          f'{SHARD_BASE_PORT}-{SHARD_BASE_PORT + SHARDS - 1}')
+    supervisor = asyncio.create_task(_supervise())
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        supervisor.cancel()
+
+
+if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        _stop_shards()
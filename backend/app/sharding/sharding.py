@@ -0,0 +1,64 @@
+"""
+Room Sharding
+
+In sharding mode (see router.py) rooms are spread over SHARD_COUNT worker
+processes on one host, each running its own copy of the server with its own
+event loop. A room always lives on shard crc32(roomId) % SHARD_COUNT, so a
+noisy classroom only slows down the rooms that hash to the same worker.
+
+Workers listen on SHARD_BASE_PORT + index. The router passes SHARD_INDEX,
+SHARD_COUNT and SHARD_BASE_PORT to each worker; without them the server runs
+unsharded (index 0 of 1) and everything here is a no-op.
+"""
+
+import os
+import json
+import zlib
+import asyncio
+import urllib.parse
+import urllib.request
+
+SHARD_INDEX = int(os.environ.get('SHARD_INDEX', 0))
+SHARD_COUNT = int(os.environ.get('SHARD_COUNT', 1))
+SHARD_BASE_PORT = int(os.environ.get('SHARD_BASE_PORT', 3001))
+
+
+def is_sharded():
+    return SHARD_COUNT > 1
+
+
+def shard_for(room_id, count=None):
+    """Index of the shard that owns a room (0 for connections without one)."""
+    count = count or SHARD_COUNT
+    if not room_id:
+        return 0
+    return zlib.crc32(str(room_id).lower().encode('utf-8')) % count
+
+
+def shard_port(index):
+    return SHARD_BASE_PORT + index
+
+
+def owns(room_id):
+    """Whether this worker is the room's shard."""
+    return shard_for(room_id) == SHARD_INDEX
+
+
+def _get_json(url, timeout):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+async def ask_owner(room_id, timeout=2.0):
+    """
+    Ask the shard that owns a room whether it exists (used by validate_room
+    when the client is still connected to another shard).
+    """
+    url = f'http://127.0.0.1:{shard_port(shard_for(room_id))}/rooms/{urllib.parse.quote(str(room_id))}'
+    loop = asyncio.get_event_loop()
+    try:
+        result = await loop.run_in_executor(None, _get_json, url, timeout)
+        return bool(result.get('exists'))
+    except Exception as e:
+        print(f'[SHARD] Could not reach owner of room {room_id}: {e}')
+        return False
@@ -0,0 +1,257 @@
+"""
+Cross-student Similarity Index
+
+Finds students with identical or near-identical code without comparing every
+pair. Each student's code is tokenized (comments dropped, identifiers and
+string literals normalized so renaming variables does not hide a copy),
+split into overlapping token shingles and summarized by a MinHash signature
+of SIMILARITY_PERMUTATIONS values. The fraction of equal signature values
+estimates the Jaccard similarity of two shingle sets.
+
+Signatures are cut into SIMILARITY_BANDS bands (locality-sensitive hashing).
+Students sharing any band hash are candidates; only candidates are compared,
+so a lookup costs roughly the size of the student's buckets instead of the
+size of the room.
+
+Signatures are computed in a worker thread after code_change; if a student
+types again while their signature is being computed, only the latest code is
+indexed.
+"""
+
+import os
+import re
+import zlib
+import random
+import asyncio
+import keyword
+import builtins
+from concurrent.futures import ThreadPoolExecutor
+
+# Tokens per shingle
+SIMILARITY_SHINGLE_SIZE = int(os.environ.get('SIMILARITY_SHINGLE_SIZE', 5))
+
+# MinHash signature length; must be divisible by SIMILARITY_BANDS
+SIMILARITY_PERMUTATIONS = int(os.environ.get('SIMILARITY_PERMUTATIONS', 64))
+SIMILARITY_BANDS = int(os.environ.get('SIMILARITY_BANDS', 16))
+
+# Code with fewer shingles than this is not indexed (starter code, a few lines)
+SIMILARITY_MIN_SHINGLES = int(os.environ.get('SIMILARITY_MIN_SHINGLES', 8))
+
+# Default estimated similarity for matches and clusters
+SIMILARITY_THRESHOLD = float(os.environ.get('SIMILARITY_THRESHOLD', 0.8))
+
+_ROWS = SIMILARITY_PERMUTATIONS // SIMILARITY_BANDS
+_PRIME = (1 << 61) - 1
+_rng = random.Random(0x5EED)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+                 for _ in range(SIMILARITY_PERMUTATIONS)]
+
+_JS_KEYWORDS = {
+    'break', 'case', 'catch', 'class', 'const', 'continue', 'default', 'do',
+    'else', 'export', 'extends', 'finally', 'for', 'function', 'if', 'import',
+    'in', 'instanceof', 'let', 'new', 'of', 'return', 'switch', 'this',
+    'throw', 'try', 'typeof', 'var', 'while', 'yield', 'async', 'await',
+    'null', 'undefined', 'true', 'false', 'console', 'log', 'length', 'push',
+}
+_KEPT_NAMES = set(keyword.kwlist) | set(dir(builtins)) | _JS_KEYWORDS
+
+_COMMENT = re.compile(r'#[^\n]*|//[^\n]*|/\*.*?\*/', re.S)
+_TOKEN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|`[^`]*`|[A-Za-z_]\w*|\d+(?:\.\d+)?|[^\s\w]')
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='similarity')
+
+# {room_id: SimilarityIndex}
+_indexes = {}
+
+# {(room_id, sid): latest code waiting to be indexed}
+_pending = {}
+
+
+def tokenize(code):
+    """Tokens with comments removed, identifiers and strings normalized."""
+    tokens = []
+    for token in _TOKEN.findall(_COMMENT.sub('', code)):
+        first = token[0]
+        if first in '"\'`':
+            tokens.append('"')
+        elif (first.isalpha() or first == '_') and token not in _KEPT_NAMES:
+            tokens.append('id')
+        else:
+            tokens.append(token)
+    return tokens
+
+
+def shingles(code):
+    """Set of 32-bit hashes of every SIMILARITY_SHINGLE_SIZE-token window."""
+    tokens = tokenize(code)
+    k = SIMILARITY_SHINGLE_SIZE
+    return {
+        zlib.crc32(' '.join(tokens[i:i + k]).encode('utf-8'))
+        for i in range(max(0, len(tokens) - k + 1))
+    }
+
+
+def signature(code):
+    """MinHash signature of the code's shingles, or None if it is too short."""
+    shingle_set = shingles(code)
+    if len(shingle_set) < SIMILARITY_MIN_SHINGLES:
+        return None
+    return tuple(
+        min((a * x + b) % _PRIME for x in shingle_set)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def estimate(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / len(sig_a)
+
+
+class SimilarityIndex:
+    """MinHash signatures of one room's students, bucketed by LSH band."""
+
+    def __init__(self):
+        self.signatures = {}   # {sid: signature}
+        self.band_keys = {}    # {sid: [band hash per band]}
+        self.buckets = [{} for _ in range(SIMILARITY_BANDS)]  # [{band hash: set(sid)}]
+
+    def update(self, sid, sig):
+        """Replace a student's signature (None removes them)."""
+        self.remove(sid)
+        if sig is None:
+            return
+        keys = [hash(sig[i * _ROWS:(i + 1) * _ROWS]) for i in range(SIMILARITY_BANDS)]
+        self.signatures[sid] = sig
+        self.band_keys[sid] = keys
+        for band, key in zip(self.buckets, keys):
+            band.setdefault(key, set()).add(sid)
+
+    def remove(self, sid):
+        self.signatures.pop(sid, None)
+        keys = self.band_keys.pop(sid, None)
+        if keys is None:
+            return
+        for band, key in zip(self.buckets, keys):
+            bucket = band.get(key)
+            if bucket is not None:
+                bucket.discard(sid)
+                if not bucket:
+                    del band[key]
+
+    def rename(self, old_sid, new_sid):
+        sig = self.signatures.get(old_sid)
+        self.remove(old_sid)
+        if sig is not None:
+            self.update(new_sid, sig)
+
+    def candidates(self, sid):
+        """Students sharing at least one band with sid."""
+        found = set()
+        for band, key in zip(self.buckets, self.band_keys.get(sid, ())):
+            found |= band.get(key, set())
+        found.discard(sid)
+        return found
+
+    def similar_to(self, sid, threshold=SIMILARITY_THRESHOLD):
+        """[(other_sid, similarity)] at or above threshold, most similar first."""
+        sig = self.signatures.get(sid)
+        if sig is None:
+            return []
+        matches = []
+        for other in self.candidates(sid):
+            similarity = estimate(sig, self.signatures[other])
+            if similarity >= threshold:
+                matches.append((other, similarity))
+        matches.sort(key=lambda m: -m[1])
+        return matches
+
+    def clusters(self, threshold=SIMILARITY_THRESHOLD):
+        """Groups of two or more students linked by similarity >= threshold."""
+        parent = {}
+
+        def find(x):
+            while parent.get(x, x) != x:
+                parent[x] = parent.get(parent[x], parent[x])
+                x = parent[x]
+            return x
+
+        edges = {}
+        for sid in self.signatures:
+            for other, similarity in self.similar_to(sid, threshold):
+                if sid < other:
+                    edges[(sid, other)] = similarity
+                    parent[find(sid)] = find(other)
+
+        groups = {}
+        for a, b in edges:
+            groups.setdefault(find(a), set()).update((a, b))
+        result = []
+        for members in groups.values():
+            scores = [s for (a, b), s in edges.items() if a in members]
+            result.append({
+                'students': sorted(members),
+                'similarity': round(sum(scores) / len(scores), 3),
+            })
+        result.sort(key=lambda c: (-len(c['students']), -c['similarity']))
+        return result
+
+
+def get_index(room_id):
+    """The room's index (created on first use)."""
+    index = _indexes.get(room_id)
+    if index is None:
+        index = _indexes[room_id] = SimilarityIndex()
+    return index
+
+
+def schedule_update(room_id, sid, code):
+    """Re-index a student's code in the background (latest code wins)."""
+    key = (room_id, sid)
+    in_flight = key in _pending
+    _pending[key] = code
+    if not in_flight:
+        asyncio.create_task(_update_worker(key))
+
+
+async def _update_worker(key):
+    loop = asyncio.get_event_loop()
+    while key in _pending:
+        code = _pending[key]
+        try:
+            sig = await loop.run_in_executor(_executor, signature, code)
+        except Exception as e:
+            print(f'[SIMILARITY] Signature failed for {key[1]}: {e}')
+            if _pending.get(key) is code:
+                del _pending[key]
+                return
+            continue  # newer code arrived meanwhile — try that
+        if _pending.get(key) is code:
+            del _pending[key]
+            get_index(key[0]).update(key[1], sig)
+            return
+        # Newer code arrived meanwhile (or the student left) — go again
+
+
+def remove_student(room_id, sid):
+    """Forget a student who left the room."""
+    _pending.pop((room_id, sid), None)
+    index = _indexes.get(room_id)
+    if index is not None:
+        index.remove(sid)
+
+
+def rename_student(room_id, old_sid, new_sid):
+    """Keep a resumed student's signature (and pending code) under their new sid."""
+    code = _pending.pop((room_id, old_sid), None)
+    index = _indexes.get(room_id)
+    if index is not None:
+        index.rename(old_sid, new_sid)
+    if code is not None and (room_id, new_sid) not in _pending:
+        schedule_update(room_id, new_sid, code)
+
+
+def drop_room(room_id):
+    """Free a closed room's index."""
+    _indexes.pop(room_id, None)
+    for key in [k for k in _pending if k[0] == room_id]:
+        del _pending[key]
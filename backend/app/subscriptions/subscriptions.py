@@ -0,0 +1,210 @@
+"""
+Teacher Visibility Subscriptions
+
+The teacher dashboard shows one student at a time in full (the viewer or
+edit modal, a shared or controlled student); everyone else is a row in the
+student list. The teacher declares this with set_visibility and gets, per
+student:
+
+- full:    code_update with the whole code on every change (as before)
+- summary: student_summary {studentId, lines, chars, lastEdit, errorCount,
+           warningCount}, only when the line count or error state changes
+           or at most every SUMMARY_INTERVAL seconds while typing; a change
+           held back inside that window is sent when it closes, so the
+           last edit is never lost
+- hidden:  nothing
+
+A student that becomes full gets their current code pushed right away, so
+opening a student never shows stale code. Roster updates
+(student_list_update) omit the code of students that are not full.
+
+Teachers that never send set_visibility (older clients) get everything in
+full.
+"""
+
+import time
+import asyncio
+
+from app.outbound.outbound import send
+
+FULL, SUMMARY, HIDDEN = 'full', 'summary', 'hidden'
+LEVELS = (FULL, SUMMARY, HIDDEN)
+
+# Seconds between summaries for a student whose lines/errors didn't change
+SUMMARY_INTERVAL = 2.0
+
+# Student fields only sent to a teacher that sees the student in full
+_FULL_ONLY_FIELDS = ('code', 'diagnostics')
+
+# {teacher_sid: {'levels': {student_sid: level}, 'default': level,
+#                'sent': {student_sid: (summary key, monotonic time)},
+#                'trailing': {student_sid: (TimerHandle, sio, student)}}}
+_views = {}
+
+_counters = {'full': 0, 'summaries': 0, 'suppressed': 0, 'fullBytes': 0, 'savedBytes': 0}
+
+
+def set_visibility(teacher_sid, room, data):
+    """
+    Apply a set_visibility request. Returns {student_sid: new level} for
+    the students whose level changed.
+
+    data: {full: [ids], summary: [ids], hidden: [ids], default: level}
+    Students not listed get `default` (summary unless given).
+    """
+    default = data.get('default', SUMMARY)
+    if default not in LEVELS:
+        default = SUMMARY
+    levels = {}
+    for level in LEVELS:
+        for student_sid in data.get(level) or []:
+            if student_sid in room['students']:
+                levels[student_sid] = level
+
+    previous = _views.get(teacher_sid)
+    before = {s: level_of(teacher_sid, s) for s in room['students']}
+    _views[teacher_sid] = {
+        'levels': levels,
+        'default': default,
+        'sent': previous['sent'] if previous else {},
+        'trailing': previous['trailing'] if previous else {},
+    }
+    changed = {}
+    for student_sid in room['students']:
+        level = level_of(teacher_sid, student_sid)
+        if level != before[student_sid]:
+            changed[student_sid] = level
+    return changed
+
+
+def level_of(teacher_sid, student_sid):
+    view = _views.get(teacher_sid)
+    if view is None:
+        return FULL
+    return view['levels'].get(student_sid, view['default'])
+
+
+def summary_of(student_sid, student):
+    code = student.get('code') or ''
+    return {
+        'studentId': student_sid,
+        'lines': code.count('\n') + 1 if code else 0,
+        'chars': len(code),
+        'lastEdit': student.get('lastEdit'),
+        'errorCount': student.get('errorCount', 0),
+        'warningCount': student.get('warningCount', 0),
+    }
+
+
+def publish_code(sio, teacher_sid, student_sid, student, forward):
+    """
+    Tell the teacher a student's code changed, at the teacher's level for
+    that student. `forward(sio, teacher_sid, student_sid, code)` sends a full
+    code_update.
+    """
+    level = level_of(teacher_sid, student_sid)
+    code = student.get('code') or ''
+    if level == FULL:
+        _counters['full'] += 1
+        _counters['fullBytes'] += len(code)
+        forward(sio, teacher_sid, student_sid, code)
+        return
+    _counters['savedBytes'] += len(code)
+    if level == SUMMARY:
+        publish_summary(sio, teacher_sid, student_sid, student)
+    else:
+        _counters['suppressed'] += 1
+
+
+def publish_summary(sio, teacher_sid, student_sid, student, force=False):
+    """Send a student_summary if it changed meaningfully or is due."""
+    view = _views.get(teacher_sid)
+    if view is None or level_of(teacher_sid, student_sid) != SUMMARY:
+        return
+    summary = summary_of(student_sid, student)
+    key = (summary['lines'], summary['errorCount'], summary['warningCount'])
+    now = time.monotonic()
+    last = view['sent'].get(student_sid)
+    if not force and last and last[0] == key and now - last[1] < SUMMARY_INTERVAL:
+        _counters['suppressed'] += 1
+        # Like a superseded outbound slot: one pending send per student that
+        # carries whatever the student looks like when the window closes
+        if student_sid not in view['trailing']:
+            _schedule_trailing(view, sio, teacher_sid, student_sid, student,
+                               last[1] + SUMMARY_INTERVAL - now)
+        return
+    _cancel_trailing(view, student_sid)
+    view['sent'][student_sid] = (key, now)
+    _counters['summaries'] += 1
+    send(sio, teacher_sid, 'student_summary', summary)
+
+
+def _schedule_trailing(view, sio, teacher_sid, student_sid, student, delay):
+    handle = asyncio.get_running_loop().call_later(
+        max(0.0, delay), _send_trailing, teacher_sid, student_sid)
+    view['trailing'][student_sid] = (handle, sio, student)
+
+
+def _send_trailing(teacher_sid, student_sid):
+    view = _views.get(teacher_sid)
+    if view is None:
+        return
+    entry = view['trailing'].pop(student_sid, None)
+    if entry is not None:
+        _handle, sio, student = entry
+        publish_summary(sio, teacher_sid, student_sid, student, force=True)
+
+
+def _cancel_trailing(view, student_sid):
+    entry = view['trailing'].pop(student_sid, None)
+    if entry is not None:
+        entry[0].cancel()
+
+
+def roster(teacher_sid, students):
+    """student_list_update payload: code only for students the teacher sees in full."""
+    result = {}
+    for student_sid, student in students.items():
+        if level_of(teacher_sid, student_sid) == FULL:
+            result[student_sid] = student
+        else:
+            entry = {k: v for k, v in student.items() if k not in _FULL_ONLY_FIELDS}
+            entry.update(summary_of(student_sid, student))
+            del entry['studentId']
+            result[student_sid] = entry
+    return {'students': result}
+
+
+def rename_student(teacher_sid, old_sid, new_sid):
+    """Keep a resumed student's visibility under their new sid."""
+    view = _views.get(teacher_sid)
+    if view is None:
+        return
+    if old_sid in view['levels']:
+        view['levels'][new_sid] = view['levels'].pop(old_sid)
+    if old_sid in view['sent']:
+        view['sent'][new_sid] = view['sent'].pop(old_sid)
+    if old_sid in view['trailing']:
+        handle, sio, student = view['trailing'][old_sid]
+        _cancel_trailing(view, old_sid)
+        _schedule_trailing(view, sio, teacher_sid, new_sid, student,
+                           handle.when() - asyncio.get_running_loop().time())
+
+
+def remove_student(teacher_sid, student_sid):
+    view = _views.get(teacher_sid)
+    if view is not None:
+        view['levels'].pop(student_sid, None)
+        view['sent'].pop(student_sid, None)
+        _cancel_trailing(view, student_sid)
+
+
+def drop_teacher(teacher_sid):
+    view = _views.pop(teacher_sid, None)
+    if view is not None:
+        for entry in view['trailing'].values():
+            entry[0].cancel()
+
+
+def stats():
+    return dict(_counters, teachers=len(_views))
@@ -0,0 +1,150 @@
+"""
+Execution Telemetry
+
+Aggregates the per-run telemetry produced by start_interactive (CPU time,
+peak RSS, wall time, output volume, spawn latency, how the run ended):
+
+- per room, for the teacher: totals, how runs ended, and the heaviest
+  students by CPU and memory (get_run_stats event);
+- process-wide histograms in the Prometheus text format (GET /metrics).
+"""
+
+import threading
+
+# Histogram buckets per metric (upper bounds; +Inf is implicit)
+HISTOGRAMS = {
+    'wallMs': ('orca_run_wall_seconds', 0.001, (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+    'spawnMs': ('orca_run_spawn_seconds', 0.001, (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)),
+    'cpuMs': ('orca_run_cpu_seconds', 0.001, (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)),
+    'peakRssKb': ('orca_run_peak_rss_bytes', 1024, tuple(mb * 1024 * 1024 for mb in (16, 32, 64, 128, 256, 512, 1024))),
+    'outputBytes': ('orca_run_output_bytes', 1, (1024, 16384, 131072, 1048576, 8388608)),
+}
+
+# Heaviest students listed per room
+TOP_STUDENTS = 5
+
+_lock = threading.Lock()
+
+# {metric: {'buckets': [count per bound], 'count': n, 'sum': total}} in base units
+_histograms = {
+    metric: {'buckets': [0] * len(bounds), 'count': 0, 'sum': 0.0}
+    for metric, (_, _, bounds) in HISTOGRAMS.items()
+}
+
+# {termination: count}
+_terminations = {}
+
+# {room_id: {'runs', 'cpuMs', 'wallMs', 'outputBytes', 'terminations', 'students'}}
+_rooms = {}
+
+
+def _values(telemetry):
+    """Metric values (in the units of HISTOGRAMS keys) present in a run's telemetry."""
+    values = {
+        'wallMs': telemetry.get('wallMs'),
+        'spawnMs': telemetry.get('spawnMs'),
+        'outputBytes': telemetry.get('stdoutBytes', 0) + telemetry.get('stderrBytes', 0),
+        'peakRssKb': telemetry.get('peakRssKb'),
+    }
+    if telemetry.get('cpuUserMs') is not None:
+        values['cpuMs'] = telemetry['cpuUserMs'] + (telemetry.get('cpuSysMs') or 0)
+    return {k: v for k, v in values.items() if v is not None}
+
+
+def record_run(room_id, sid, name, telemetry):
+    """
+    Add one finished run to the histograms and (if in a room) the room stats.
+
+    Args:
+        room_id: Room the run belongs to, or None
+        sid: Socket ID of whoever ran it
+        name: Their display name
+        telemetry: Dict produced by start_interactive
+    """
+    if not telemetry:
+        return
+    values = _values(telemetry)
+    termination = telemetry.get('termination', 'exit')
+    with _lock:
+        for metric, value in values.items():
+            _, scale, bounds = HISTOGRAMS[metric]
+            hist = _histograms[metric]
+            base = value * scale
+            for i, bound in enumerate(bounds):
+                if base <= bound:
+                    hist['buckets'][i] += 1
+            hist['count'] += 1
+            hist['sum'] += base
+        _terminations[termination] = _terminations.get(termination, 0) + 1
+
+        if room_id is None:
+            return
+        room = _rooms.setdefault(room_id, {
+            'runs': 0, 'cpuMs': 0.0, 'wallMs': 0.0, 'outputBytes': 0,
+            'terminations': {}, 'students': {},
+        })
+        room['runs'] += 1
+        room['cpuMs'] += values.get('cpuMs', 0)
+        room['wallMs'] += values.get('wallMs', 0)
+        room['outputBytes'] += values.get('outputBytes', 0)
+        room['terminations'][termination] = room['terminations'].get(termination, 0) + 1
+
+        student = room['students'].setdefault(sid, {
+            'name': name, 'runs': 0, 'cpuMs': 0.0, 'maxPeakRssKb': 0, 'killed': 0,
+        })
+        student['name'] = name
+        student['runs'] += 1
+        student['cpuMs'] += values.get('cpuMs', 0)
+        student['maxPeakRssKb'] = max(student['maxPeakRssKb'], values.get('peakRssKb', 0))
+        if termination != 'exit':
+            student['killed'] += 1
+        student['last'] = telemetry
+
+
+def room_stats(room_id):
+    """Run totals for a room plus its heaviest students by CPU and by memory."""
+    with _lock:
+        room = _rooms.get(room_id)
+        if room is None:
+            return {'runs': 0, 'cpuMs': 0.0, 'wallMs': 0.0, 'outputBytes': 0,
+                    'terminations': {}, 'topCpu': [], 'topMemory': []}
+        students = [dict(s, studentId=sid) for sid, s in room['students'].items()]
+        result = {k: room[k] for k in ('runs', 'outputBytes')}
+        result['cpuMs'] = round(room['cpuMs'], 2)
+        result['wallMs'] = round(room['wallMs'], 2)
+        result['terminations'] = dict(room['terminations'])
+    result['topCpu'] = sorted(students, key=lambda s: -s['cpuMs'])[:TOP_STUDENTS]
+    result['topMemory'] = sorted(students, key=lambda s: -s['maxPeakRssKb'])[:TOP_STUDENTS]
+    return result
+
+
+def rename_student(room_id, old_sid, new_sid):
+    """Keep a resumed student's run stats under their new sid."""
+    with _lock:
+        room = _rooms.get(room_id)
+        if room and old_sid in room['students']:
+            room['students'][new_sid] = room['students'].pop(old_sid)
+
+
+def drop_room(room_id):
+    """Forget a closed room's stats (process-wide histograms are kept)."""
+    with _lock:
+        _rooms.pop(room_id, None)
+
+
+def metrics_text():
+    """Histograms and termination counts in the Prometheus text format."""
+    lines = []
+    with _lock:
+        for metric, (name, _, bounds) in HISTOGRAMS.items():
+            hist = _histograms[metric]
+            lines.append(f'# TYPE {name} histogram')
+            for bound, count in zip(bounds, hist['buckets']):
+                lines.append(f'{name}_bucket{{le="{bound:g}"}} {count}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {hist["count"]}')
+            lines.append(f'{name}_sum {hist["sum"]:g}')
+            lines.append(f'{name}_count {hist["count"]}')
+        lines.append('# TYPE orca_runs_total counter')
+        for termination, count in sorted(_terminations.items()):
+            lines.append(f'orca_runs_total{{termination="{termination}"}} {count}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,207 @@
+"""
+Event Latency Tracing (opt-in)
+
+Records spans for Socket.IO handlers, the emits they make, and the stages of
+start_interactive (spawn, first byte, EOF, on_done), tagged with room and
+event name. Spans are written in the Chrome Trace Event format (a JSON array
+of "X" complete events), which loads directly in Perfetto or chrome://tracing.
+
+Enable by setting TRACE_FILE to an output path. TRACE_SAMPLE_RATE (0.0-1.0)
+controls the fraction of handler invocations and runs that are traced; spans
+started inside a sampled handler (emits, execution stages) follow its
+decision. The tracer measures the time it spends recording and reports it in
+stats().
+
+Spans are serialized and appended by a writer thread, so the event loop
+never waits on the file. An existing trace file is appended to (the array
+is only opened when the file is new), so restarts keep it valid.
+"""
+
+import os
+import json
+import time
+import queue
+import atexit
+import random
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+
+TRACE_FILE = os.environ.get('TRACE_FILE')
+TRACE_SAMPLE_RATE = float(os.environ.get('TRACE_SAMPLE_RATE', 1.0))
+
+# Spans buffered in memory before being appended to the trace file
+TRACE_FLUSH_EVERY = 512
+
+# Whether the current handler invocation / run is being traced
+_sampled = contextvars.ContextVar('trace_sampled', default=False)
+
+
+class Tracer:
+    """Collects spans and appends them to a Chrome trace file."""
+
+    def __init__(self, path, sample_rate):
+        self.path = path
+        self.sample_rate = max(0.0, min(1.0, sample_rate))
+        self._origin = time.perf_counter_ns()
+        self._pid = os.getpid()
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._pending = queue.Queue()
+        self._writer = None
+        self.spans = 0
+        self.unsampled = 0
+        self.overhead_ns = 0
+        if self.enabled:
+            atexit.register(self.close)
+            print(f"[TRACE] Tracing to {path} at sample rate {self.sample_rate}")
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    def now(self):
+        """Current time in the tracer's clock (ns)."""
+        return time.perf_counter_ns()
+
+    def sample(self):
+        """Decide whether to trace a new root (handler call or run) and remember it."""
+        sampled = self.enabled and random.random() < self.sample_rate
+        if self.enabled and not sampled:
+            self.unsampled += 1
+        _sampled.set(sampled)
+        return sampled
+
+    def is_sampled(self):
+        return _sampled.get()
+
+    def record(self, name, start_ns, end_ns, cat, **tags):
+        """Record a finished span (timestamps from now())."""
+        if not _sampled.get():
+            return
+        t0 = time.perf_counter_ns()
+        event = {
+            'name': name,
+            'cat': cat,
+            'ph': 'X',
+            'ts': (start_ns - self._origin) / 1000,
+            'dur': max(0, end_ns - start_ns) / 1000,
+            'pid': self._pid,
+            'tid': _task_id(),
+            'args': {k: v for k, v in tags.items() if v is not None},
+        }
+        with self._lock:
+            self._buffer.append(event)
+            self.spans += 1
+            flush = len(self._buffer) >= TRACE_FLUSH_EVERY
+        if flush:
+            self.flush()
+        self.overhead_ns += time.perf_counter_ns() - t0
+
+    @contextmanager
+    def span(self, name, cat, **tags):
+        """Context manager that records its body as a span."""
+        start = self.now()
+        try:
+            yield tags
+        finally:
+            self.record(name, start, self.now(), cat, **tags)
+
+    def flush(self):
+        """Hand buffered spans to the writer thread."""
+        with self._lock:
+            events, self._buffer = self._buffer, []
+            if not events or not self.path:
+                return
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, name='trace-writer',
+                                                daemon=True)
+                self._writer.start()
+        self._pending.put(events)
+
+    def close(self):
+        """Flush and wait until everything is on disk (at exit)."""
+        self.flush()
+        if self._writer is not None:
+            self._pending.join()
+
+    def _write_loop(self):
+        # JSON array format; the closing bracket is optional for trace viewers,
+        # so later writes (and later server runs) just keep appending events
+        while True:
+            events = self._pending.get()
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    if f.tell() == 0:
+                        f.write('[\n')
+                    f.write(''.join(json.dumps(event) + ',\n' for event in events))
+            except OSError as e:
+                print(f"[TRACE] Could not write {self.path}: {e}")
+            finally:
+                self._pending.task_done()
+
+    def stats(self):
+        """Span counts and recording overhead."""
+        return {
+            'enabled': self.enabled,
+            'sampleRate': self.sample_rate,
+            'spans': self.spans,
+            'unsampled': self.unsampled,
+            'overheadMs': round(self.overhead_ns / 1e6, 3),
+            'overheadPerSpanUs': round(self.overhead_ns / self.spans / 1000, 2) if self.spans else 0.0,
+        }
+
+
+def _task_id():
+    """Group spans by asyncio task so concurrent handlers get separate tracks."""
+    try:
+        task = asyncio.current_task()
+    except RuntimeError:
+        task = None
+    return id(task) % 100000 if task else threading.get_ident() % 100000
+
+
+tracer = Tracer(TRACE_FILE, TRACE_SAMPLE_RATE)
+
+
+def instrument_socketio(sio, room_of):
+    """
+    Wrap every registered Socket.IO handler and sio.emit with spans.
+
+    Args:
+        sio: The AsyncServer whose handlers are already registered
+        room_of: callable(sid, data) -> room id or None, used for tags
+    """
+    if not tracer.enabled:
+        return
+
+    handlers = sio.handlers.get('/', {})
+    for event, handler in list(handlers.items()):
+        handlers[event] = _wrap_handler(event, handler, room_of)
+
+    original_emit = sio.emit
+
+    async def traced_emit(event, data=None, *args, **kwargs):
+        if not _sampled.get():
+            return await original_emit(event, data, *args, **kwargs)
+        with tracer.span(f'emit:{event}', 'emit',
+                         to=kwargs.get('to'), room=kwargs.get('room')):
+            return await original_emit(event, data, *args, **kwargs)
+
+    sio.emit = traced_emit
+    print(f"[TRACE] Instrumented {len(handlers)} Socket.IO handlers")
+
+
+def _wrap_handler(event, handler, room_of):
+    async def traced_handler(*args):
+        if not tracer.sample():
+            return await handler(*args)
+        sid = args[0] if args else None
+        data = args[1] if len(args) > 1 else None
+        room_id = room_of(sid, data)
+        with tracer.span(f'handler:{event}', 'handler', sid=sid, room=room_id):
+            return await handler(*args)
+
+    traced_handler.__name__ = getattr(handler, '__name__', event)
+    return traced_handler
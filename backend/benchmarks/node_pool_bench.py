@@ -0,0 +1,68 @@
+"""
+Node Worker Pool Benchmark
+
+Runs the same JavaScript programs through start_interactive with a cold
+`node` subprocess per run and with the worker pool, and reports time to
+first output byte and total wall time per run (what a student waits for
+after pressing Run).
+
+Usage (from backend/):
+    python -m benchmarks.node_pool_bench [runs]
+"""
+
+import sys
+import time
+import asyncio
+import statistics
+
+from app.execution import execution, nodepool
+
+PROGRAMS = {
+    'hello': 'console.log("hello")',
+    'loop': 'let s = 0; for (let i = 0; i < 1e6; i++) s += i; console.log(s)',
+    'modules': 'const util = require("util"); const path = require("path");\n'
+               'console.log(util.format("%s/%d", path.basename("/a/b.js"), 42))',
+}
+
+
+async def time_run(code, session_id):
+    started = time.perf_counter()
+    first = []
+
+    async def on_output(text, is_error):
+        if not first:
+            first.append(time.perf_counter())
+
+    await execution.start_interactive(code, session_id, 10, 'javascript', on_output)
+    finished = time.perf_counter()
+    return ((first[0] if first else finished) - started) * 1000, (finished - started) * 1000
+
+
+async def measure(pooled, runs):
+    nodepool.NODE_POOL_ENABLED = pooled
+    results = {}
+    for name, code in PROGRAMS.items():
+        await time_run(code, 'warmup')
+        samples = [await time_run(code, f'bench-{i}') for i in range(runs)]
+        results[name] = ([s[0] for s in samples], [s[1] for s in samples])
+    return results
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    nodepool.NODE_POOL_ENABLED = True
+    nodepool.warm()
+    cold = asyncio.run(measure(False, runs))
+    pooled = asyncio.run(measure(True, runs))
+    print(f'\n{runs} runs per program (median ms)')
+    print(f'{"program":<10}{"cold first":>12}{"pool first":>12}{"cold total":>12}{"pool total":>12}{"speedup":>9}')
+    for name in PROGRAMS:
+        cold_first, cold_total = (statistics.median(v) for v in cold[name])
+        pool_first, pool_total = (statistics.median(v) for v in pooled[name])
+        print(f'{name:<10}{cold_first:12.1f}{pool_first:12.1f}{cold_total:12.1f}'
+              f'{pool_total:12.1f}{cold_total / pool_total:8.1f}x')
+    print(nodepool.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""
+Large Output Benchmark (disk spill + get_output_range)
+
+Starts a server, runs a program that prints N MB and reports what the run
+costs: bytes streamed to the client (code_output), the code_done payload,
+and the server's resident memory afterwards. Then pages through the whole
+spilled output with get_output_range and checks it byte for byte.
+
+Runs once with spilling disabled (OUTPUT_SPILL_BYTES very large, the old
+behaviour) and once with the default threshold.
+
+Usage (from backend/):
+    python -m benchmarks.output_spill_bench [megabytes]
+"""
+
+import sys
+import json
+import time
+import threading
+
+from benchmarks.shard_bench import SioClient
+from benchmarks.visibility_bench import start_server
+
+PAGE_BYTES = 256 * 1024
+LINE = 'x' * 63 + '\n'
+
+
+def server_rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def measure(megabytes, spill_bytes):
+    proc, port = start_server({'OUTPUT_SPILL_BYTES': str(spill_bytes)})
+    try:
+        streamed = {'bytes': 0}
+        done = threading.Event()
+        result = {}
+
+        def on_event(event, data):
+            if event == 'code_output':
+                streamed['bytes'] += len(json.dumps(data))
+            elif event == 'code_done':
+                result.update(data, payload=len(json.dumps(data)))
+                done.set()
+
+        client = SioClient(port, 'output-bench', on_event)
+        rss_before = server_rss_mb(proc.pid)
+        lines = megabytes * 1024 * 1024 // len(LINE)
+        code = f'import sys\nfor _ in range({lines}):\n    sys.stdout.write({LINE!r})\n'
+        started = time.perf_counter()
+        client.emit('run_code', {'code': code, 'timeout': 120})
+        done.wait(180)
+        elapsed = time.perf_counter() - started
+        rss_after = server_rss_mb(proc.pid)
+
+        paged = ''
+        page_time = 0.0
+        info = result.get('outputInfo')
+        if info:
+            paged_started = time.perf_counter()
+            offset = 0
+            while offset < info['size']:
+                page = client.call('get_output_range',
+                                   {'id': info['id'], 'offset': offset, 'length': PAGE_BYTES})
+                paged += page['text']
+                offset = page['end']
+            page_time = time.perf_counter() - paged_started
+        client.close()
+        return {'elapsed': elapsed, 'streamed': streamed['bytes'], 'payload': result.get('payload', 0),
+                'rssGrowth': rss_after - rss_before, 'info': info,
+                'pagedOk': paged == LINE * lines if info else None, 'pageTime': page_time}
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f'Program printing {megabytes} MB')
+    for label, spill in (('no spill', 1 << 40), ('spill', 1024 * 1024)):
+        r = measure(megabytes, spill)
+        print(f'  {label:<9} run {r["elapsed"]:6.2f}s  streamed {r["streamed"] / 1e6:7.2f} MB  '
+              f'code_done {r["payload"] / 1e6:7.2f} MB  server RSS +{r["rssGrowth"]:6.1f} MB')
+        if r['info']:
+            print(f'            paged {r["info"]["size"] / 1e6:.1f} MB in {r["pageTime"]:.2f}s '
+                  f'({PAGE_BYTES // 1024} KB pages), identical: {r["pagedOk"]}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Output Throughput Benchmark (many small writes)
+
+Starts a server and runs programs that print many short lines, the case
+where a run's output arrives as lots of small pipe reads: N lines of
+print(), and about 2.3 MB of print() that goes past the spill threshold.
+Reports wall time from run_code to code_done, lines per second, how many
+code_output events the client received, and whether the output (live
+code_output for the small run, pages from get_output_range for the spilled
+one) matches what the program printed.
+
+Run it on a checkout before and after a change to the output path to
+compare throughput.
+
+Usage (from backend/):
+    python -m benchmarks.output_throughput_bench [lines]
+"""
+
+import sys
+import time
+import threading
+
+from benchmarks.shard_bench import SioClient
+from benchmarks.visibility_bench import start_server
+
+PAGE_BYTES = 256 * 1024
+SPILL_LINES = 110000
+
+
+def expected_output(lines):
+    return ''.join(f'{"x" * 20} {i}\n' for i in range(lines))
+
+
+def measure(client, lines):
+    received = {'text': '', 'events': 0}
+    done = threading.Event()
+    result = {}
+
+    def on_event(event, data):
+        if event == 'code_output':
+            received['events'] += 1
+            received['text'] += data.get('text', '')
+        elif event == 'code_done':
+            result.update(data)
+            done.set()
+
+    client.on_event = on_event
+    code = f'for i in range({lines}):\n    print("x" * 20, i)\n'
+    started = time.perf_counter()
+    client.emit('run_code', {'code': code, 'timeout': 120})
+    done.wait(180)
+    elapsed = time.perf_counter() - started
+
+    expected = expected_output(lines)
+    info = result.get('outputInfo')
+    if info:
+        paged, offset = '', 0
+        while offset < info['size']:
+            page = client.call('get_output_range',
+                               {'id': info['id'], 'offset': offset, 'length': PAGE_BYTES})
+            paged += page['text']
+            offset = page['end']
+        identical = paged == expected
+    else:
+        identical = received['text'] == expected
+    return {'elapsed': elapsed, 'events': received['events'], 'spilled': bool(info),
+            'bytes': len(expected), 'identical': identical}
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 30000
+    proc, port = start_server()
+    try:
+        client = SioClient(port, 'throughput-bench')
+        for count in (lines, SPILL_LINES):
+            r = measure(client, count)
+            print(f'  {count:>7} lines ({r["bytes"] / 1e6:4.1f} MB{", spilled" if r["spilled"] else ""}): '
+                  f'{r["elapsed"]:6.2f}s  {count / r["elapsed"]:9.0f} lines/s  '
+                  f'{r["events"]:6d} code_output events  identical: {r["identical"]}')
+        client.close()
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Session Replay
+
+Re-drives an event log recorded with RECORD_DIR (app/recording/recording.py)
+against a server and reports handler latency per event (time until the
+Socket.IO ack) and throughput.
+
+Every recorded socket gets its own connection, and events are sent in
+recorded order at their recorded times divided by --speed (0 = as fast as
+possible). Room ids get a per-replay suffix so replays never collide, and
+recorded socket ids inside payloads (studentId, ...) are mapped to the
+replaying sockets' ids. Logs recorded with sizes only replay the same
+event mix with synthetic payloads of the recorded sizes.
+
+Usage (from backend/):
+    python -m benchmarks.replay LOG [--speed 1|10|0] [--port PORT]
+
+Without --port a local server (app.main:socket_app) is started.
+"""
+
+import sys
+import json
+import time
+import secrets
+import argparse
+import threading
+import statistics
+
+from app.recording.recording import read_log
+from benchmarks.shard_bench import SioClient
+from benchmarks.visibility_bench import start_server
+
+# Seconds to wait for outstanding acks once everything has been sent
+DRAIN_SECONDS = 10
+
+
+class Replay:
+    def __init__(self, events, port, speed):
+        self.events = events
+        self.port = port
+        self.speed = speed
+        self.suffix = '-r' + secrets.token_hex(2)
+        self.clients = {}
+        self.sid_map = {}
+        self.latencies = {}
+        self.sent = 0
+        self.acked = 0
+        self.received = 0
+        self.max_lag = 0.0
+        self._lock = threading.Lock()
+        # First room of each recorded socket, for the connection's routing key
+        self.first_room = {}
+        for event in events:
+            if event['room']:
+                self.first_room.setdefault(event['sid'], event['room'])
+
+    def _room(self, room_id):
+        return room_id + self.suffix if room_id else None
+
+    def _on_event(self, event, data):
+        with self._lock:
+            self.received += 1
+
+    def _on_ack(self, event, sent_at):
+        def record(result):
+            latency = (time.perf_counter() - sent_at) * 1000
+            with self._lock:
+                self.acked += 1
+                self.latencies.setdefault(event, []).append(latency)
+        return record
+
+    def _remap(self, value, key=None):
+        if isinstance(value, dict):
+            return {k: self._remap(v, k) for k, v in value.items()}
+        if isinstance(value, list):
+            return [self._remap(v) for v in value]
+        if isinstance(value, str):
+            if key == 'roomId':
+                return self._room(value)
+            return self.sid_map.get(value, value)
+        return value
+
+    def _payload(self, event):
+        if event['data'] is not None:
+            return self._remap(event['data'])
+        data = {'roomId': self._room(event['room'])} if event['room'] else {}
+        if event['event'] == 'join_room':
+            data['userName'] = 'user-' + event['sid'][:6]
+            return data
+        filler = event['size'] - len(json.dumps(data)) - len('"code":"",')
+        if filler > 0:
+            data['code'] = ('x = 1\n' * (filler // 6 + 1))[:filler]
+        return data
+
+    def _client(self, sid):
+        client = self.clients.get(sid)
+        if client is None:
+            started = time.perf_counter()
+            client = SioClient(self.port, self._room(self.first_room.get(sid, '')) or '',
+                               self._on_event)
+            with self._lock:
+                self.latencies.setdefault('connect', []).append(
+                    (time.perf_counter() - started) * 1000)
+            self.clients[sid] = client
+            self.sid_map[sid] = client.sid
+        return client
+
+    def _close_when_answered(self, client):
+        """Close a recorded disconnect's socket once its events were acked."""
+        deadline = time.perf_counter() + DRAIN_SECONDS
+        while client._acks and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        client.close()
+
+    def run(self):
+        started = time.perf_counter()
+        origin = self.events[0]['t']
+        for event in self.events:
+            if self.speed:
+                due = started + (event['t'] - origin) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    self.max_lag = max(self.max_lag, -delay)
+            name = event['event']
+            if name == 'disconnect':
+                client = self.clients.pop(event['sid'], None)
+                if client:
+                    threading.Thread(target=self._close_when_answered, args=(client,),
+                                     daemon=True).start()
+                continue
+            client = self._client(event['sid'])
+            if name == 'connect':
+                continue
+            client.emit(name, self._payload(event), self._on_ack(name, time.perf_counter()))
+            self.sent += 1
+        sent_in = time.perf_counter() - started
+        deadline = time.perf_counter() + DRAIN_SECONDS
+        while self.acked < self.sent and time.perf_counter() < deadline:
+            time.sleep(0.05)
+        elapsed = time.perf_counter() - started
+        for client in self.clients.values():
+            client.close()
+        return sent_in, elapsed
+
+
+def report(replay, log_seconds, sent_in, elapsed):
+    speed = f'{replay.speed:g}x' if replay.speed else 'as fast as possible'
+    print(f'Replayed {replay.sent} events from {len(replay.sid_map)} sockets '
+          f'({log_seconds:.1f}s recorded) at {speed}')
+    print(f'  sent in {sent_in:.2f}s ({replay.sent / max(sent_in, 1e-9):.0f} events/s), '
+          f'{replay.acked} acked, {replay.sent - replay.acked} unanswered, '
+          f'{replay.received} server events received in {elapsed:.2f}s')
+    if replay.speed:
+        print(f'  max scheduling lag {replay.max_lag * 1000:.1f} ms')
+    print(f'  {"event":<26}{"count":>7}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"max ms":>9}')
+    for event, samples in sorted(replay.latencies.items(), key=lambda kv: -len(kv[1])):
+        samples.sort()
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+        print(f'  {event:<26}{len(samples):7d}{statistics.median(samples):9.1f}'
+              f'{pick(0.95):9.1f}{pick(0.99):9.1f}{samples[-1]:9.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay a recorded event log')
+    parser.add_argument('log')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='time scale (1 = recorded pace, 10 = ten times faster, 0 = no waiting)')
+    parser.add_argument('--port', type=int, help='server to replay against (default: start one)')
+    args = parser.parse_args()
+
+    header, events = read_log(args.log)
+    if not events:
+        sys.exit(f'{args.log} has no events')
+    print(f'{args.log}: {len(events)} events, payloads: {header["mode"]}')
+    proc = None
+    port = args.port
+    if port is None:
+        proc, port = start_server()
+    try:
+        replay = Replay(events, port, args.speed)
+        sent_in, elapsed = replay.run()
+        report(replay, events[-1]['t'] - events[0]['t'], sent_in, elapsed)
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait(10)
+
+
+if __name__ == '__main__':
+    main()
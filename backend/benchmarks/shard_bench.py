@@ -0,0 +1,264 @@
+"""
+Room Isolation Benchmark (sharding mode)
+
+Starts the shard router twice, once with a single worker and once with
+several, and in each measures code_change -> code_update latency in a few
+quiet rooms (one student typing, teacher watching) before and while one
+noisy room is running: many students sending large edits as fast as they can
+while the teacher streams a long program output.
+
+With one worker the noisy room shares the event loop with everyone; with
+several, the quiet rooms are chosen to hash to other workers and should keep
+their p99.
+
+Usage (from backend/):
+    python -m benchmarks.shard_bench [shards] [noisy_students]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import itertools
+import threading
+import statistics
+import subprocess
+import urllib.request
+import multiprocessing
+
+import simple_websocket
+
+from app.sharding.sharding import shard_for
+
+QUIET_ROOMS = 6
+QUIET_INTERVAL = 0.05        # seconds between quiet-room edits
+PHASE_SECONDS = 8
+NOISY_CODE_SIZE = 20000      # bytes per noisy edit
+NOISY_PROGRAM = 'for i in range(300000):\n    print(i, "x" * 40)\n'
+
+
+class SioClient:
+    """Just enough of the Socket.IO protocol over a raw WebSocket."""
+
+    def __init__(self, port, room_id, on_event=None):
+        self.ws = simple_websocket.Client.connect(
+            f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket&roomId={room_id}')
+        # Socket.IO connect goes out before the engine.io open is read:
+        # simple_websocket leaves a frame that arrived together with the
+        # handshake response unread until more data comes in
+        self.ws.send('40')
+        self.ws.receive()            # engine.io open
+        ack = self.ws.receive()      # connect ack: 40{"sid": ...}
+        self.sid = json.loads(ack[2:]).get('sid') if ack.startswith('40{') else None
+        self.on_event = on_event
+        self.closed = False
+        self._acks = {}
+        self._ack_ids = itertools.count(1)
+        threading.Thread(target=self._reader, daemon=True).start()
+
+    def _reader(self):
+        while not self.closed:
+            try:
+                message = self.ws.receive()
+            except Exception:
+                return
+            if message == '2':
+                self.ws.send('3')
+            elif isinstance(message, str) and message.startswith('42') and self.on_event:
+                event, *args = json.loads(message[2:])
+                self.on_event(event, args[0] if args else None)
+            elif isinstance(message, str) and message.startswith('43'):
+                body = message[2:]
+                split = body.index('[')
+                callback = self._acks.pop(int(body[:split]), None)
+                if callback:
+                    args = json.loads(body[split:])
+                    callback(args[0] if args else None)
+
+    def emit(self, event, data, callback=None):
+        """Send an event; callback(result) runs on the reader thread when acked."""
+        if callback is None:
+            self.ws.send('42' + json.dumps([event, data]))
+            return
+        ack_id = next(self._ack_ids)
+        self._acks[ack_id] = callback
+        self.ws.send(f'42{ack_id}' + json.dumps([event, data]))
+
+    def call(self, event, data, timeout=10):
+        """Send an event and wait for its callback result."""
+        done = threading.Event()
+        result = []
+        self.emit(event, data, lambda r: (result.append(r), done.set()))
+        if not done.wait(timeout):
+            raise TimeoutError(event)
+        return result[0]
+
+    def close(self):
+        self.closed = True
+        try:
+            self.ws.close()
+        except Exception:
+            pass
+
+
+def _free_port_block(count):
+    """A port whose next `count` ports are free too."""
+    while True:
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            base = s.getsockname()[1]
+        if base + count < 65535 and all(_port_free(base + i) for i in range(count + 1)):
+            return base
+
+
+def _port_free(port):
+    with socket.socket() as s:
+        try:
+            s.bind(('127.0.0.1', port))
+            return True
+        except OSError:
+            return False
+
+
+def _room_ids(shards):
+    """A noisy room on shard 0 and quiet rooms on the other shards."""
+    noisy = next(f'noisy-{i}' for i in range(10000) if shard_for(f'noisy-{i}', shards) == 0)
+    quiet, i = [], 0
+    while len(quiet) < QUIET_ROOMS:
+        room = f'quiet-{i}'
+        if shards == 1 or shard_for(room, shards) != 0:
+            quiet.append(room)
+        i += 1
+    return noisy, quiet
+
+
+def start_router(shards):
+    port = _free_port_block(shards + 1)
+    env = dict(os.environ, PORT=str(port), SHARDS=str(shards), SHARD_BASE_PORT=str(port + 1))
+    proc = subprocess.Popen([sys.executable, '-m', 'app.sharding.router'], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health', timeout=1) as r:
+                if json.loads(r.read())['status'] == 'healthy':
+                    return proc, port
+        except Exception:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError('router did not become healthy')
+
+
+def noisy_room(port, room_id, students, stop):
+    """Load generator (own process): big edits from many students plus output spam."""
+    teacher = SioClient(port, room_id)
+    teacher.emit('join_room', {'roomId': room_id, 'userName': 'Noisy Teacher'})
+    time.sleep(0.3)
+    clients = []
+    for i in range(students):
+        client = SioClient(port, room_id)
+        client.emit('join_room', {'roomId': room_id, 'userName': f'noisy{i}'})
+        clients.append(client)
+
+    def typist(client, seed):
+        n = 0
+        while not stop.is_set():
+            n += 1
+            client.emit('code_change', {'roomId': room_id, 'language': 'python',
+                                        'code': f'# {seed} {n}\n' + 'x = 1\n' * (NOISY_CODE_SIZE // 6)})
+            time.sleep(0.005)
+
+    for i, client in enumerate(clients):
+        threading.Thread(target=typist, args=(client, i), daemon=True).start()
+    while not stop.is_set():
+        teacher.emit('run_code', {'code': NOISY_PROGRAM, 'language': 'python', 'timeout': 10})
+        stop.wait(3)
+    for client in clients + [teacher]:
+        client.close()
+
+
+def measure(port, quiet_rooms, seconds):
+    """Per-edit latency (ms) from a quiet student's code_change to its teacher's code_update."""
+    sent, latencies = {}, []
+    lock = threading.Lock()
+
+    def on_teacher_event(event, data):
+        if event == 'code_update':
+            now = time.perf_counter()
+            with lock:
+                started = sent.pop(data.get('code'), None)
+                if started is not None:
+                    latencies.append((now - started) * 1000)
+
+    pairs = []
+    for room in quiet_rooms:
+        teacher = SioClient(port, room, on_teacher_event)
+        teacher.emit('join_room', {'roomId': room, 'userName': 'Teacher'})
+        time.sleep(0.1)
+        student = SioClient(port, room)
+        student.emit('join_room', {'roomId': room, 'userName': 'Student'})
+        pairs.append((teacher, student, room))
+    time.sleep(0.5)
+
+    deadline = time.perf_counter() + seconds
+    n = 0
+    while time.perf_counter() < deadline:
+        for _, student, room in pairs:
+            n += 1
+            code = f'print({n})  # {room}'
+            with lock:
+                sent[code] = time.perf_counter()
+            student.emit('code_change', {'roomId': room, 'code': code})
+        time.sleep(QUIET_INTERVAL)
+    time.sleep(1)
+
+    for teacher, student, _ in pairs:
+        student.close()
+        teacher.close()
+    lost = len(sent)
+    return latencies, lost
+
+
+def _summary(latencies, lost):
+    if not latencies:
+        return 'no samples'
+    ordered = sorted(latencies)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    return (f'p50 {statistics.median(ordered):7.2f} ms   p99 {p99:8.2f} ms   '
+            f'max {ordered[-1]:8.2f} ms   samples {len(ordered)}   unanswered {lost}')
+
+
+def run(shards, noisy_students):
+    noisy, quiet = _room_ids(shards)
+    proc, port = start_router(shards)
+    try:
+        baseline = measure(port, quiet, PHASE_SECONDS)
+        stop = multiprocessing.Event()
+        load = multiprocessing.Process(target=noisy_room, args=(port, noisy, noisy_students, stop))
+        load.start()
+        time.sleep(2)
+        loaded = measure(port, quiet, PHASE_SECONDS)
+        stop.set()
+        load.join(10)
+        if load.is_alive():
+            load.kill()
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    print(f'\n{shards} shard(s):')
+    print(f'  quiet rooms, no noise:    {_summary(*baseline)}')
+    print(f'  quiet rooms, noisy room:  {_summary(*loaded)}')
+
+
+def main():
+    shards = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    noisy_students = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    print(f'{QUIET_ROOMS} quiet rooms, 1 noisy room with {noisy_students} students, '
+          f'{PHASE_SECONDS}s per phase')
+    run(1, noisy_students)
+    run(shards, noisy_students)
+
+
+if __name__ == '__main__':
+    main()
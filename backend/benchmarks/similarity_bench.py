@@ -0,0 +1,198 @@
+"""
+Similarity Index Benchmark
+
+Builds a room of N students (default 500) from a handful of base solutions:
+some students copy a solution verbatim, some copy it and rename variables or
+add a line, the rest write their own. Measures signature time per
+code_change, index update time, similar_to() and clusters() latency, and
+compares the LSH matches with an exhaustive pairwise Jaccard scan.
+
+Usage (from backend/):
+    python -m benchmarks.similarity_bench [students]
+"""
+
+import sys
+import time
+import random
+import statistics
+
+from app.similarity.similarity import (
+    SimilarityIndex, signature, shingles, SIMILARITY_THRESHOLD
+)
+
+BASE_SOLUTIONS = [
+    '''
+def fizzbuzz(n):
+    result = []
+    for i in range(1, n + 1):
+        if i % 15 == 0:
+            result.append("FizzBuzz")
+        elif i % 3 == 0:
+            result.append("Fizz")
+        elif i % 5 == 0:
+            result.append("Buzz")
+        else:
+            result.append(str(i))
+    return result
+
+print("\\n".join(fizzbuzz(int(input()))))
+''',
+    '''
+def is_prime(n):
+    if n < 2:
+        return False
+    d = 2
+    while d * d <= n:
+        if n % d == 0:
+            return False
+        d += 1
+    return True
+
+count = int(input())
+primes = [x for x in range(count) if is_prime(x)]
+print(len(primes), primes[-5:])
+''',
+    '''
+def reverse_words(text):
+    words = text.split()
+    out = []
+    for w in reversed(words):
+        out.append(w[::-1])
+    return " ".join(out)
+
+line = input("Enter a sentence: ")
+print(reverse_words(line))
+print(len(line.split()))
+''',
+    '''
+def fib(n):
+    a, b = 0, 1
+    seq = []
+    while len(seq) < n:
+        seq.append(a)
+        a, b = b, a + b
+    return seq
+
+total = 0
+for value in fib(int(input())):
+    total += value
+print("sum", total)
+''',
+]
+
+NAMES = ['alpha', 'beta', 'gamma', 'delta', 'eps', 'zeta', 'theta', 'kappa']
+
+
+def _rename(code, rng):
+    """Rename a few identifiers (what a student hiding a copy would do)."""
+    for old in ('result', 'words', 'seq', 'total', 'count', 'd', 'out', 'line'):
+        if rng.random() < 0.6:
+            code = code.replace(old, rng.choice(NAMES) + str(rng.randint(0, 9)))
+    return code
+
+
+def _original(rng):
+    """A unique program built from random statements."""
+    lines = []
+    for i in range(rng.randint(8, 20)):
+        kind = rng.randint(0, 4)
+        v = f'v{i}'
+        if kind == 0:
+            lines.append(f'{v} = {rng.randint(0, 999)} * {rng.randint(1, 9)}')
+        elif kind == 1:
+            lines.append(f'for k in range({rng.randint(2, 50)}):\n    print(k ** {rng.randint(1, 4)})')
+        elif kind == 2:
+            lines.append(f'if {rng.randint(0, 9)} > {rng.randint(0, 9)}:\n    {v} = [x for x in range({rng.randint(1, 30)})]')
+        elif kind == 3:
+            lines.append(f'def f{i}(a, b):\n    return a {rng.choice("+-*%")} b {rng.choice("+-*")} {rng.randint(1, 99)}')
+        else:
+            lines.append(f'while {rng.randint(1, 5)} < {rng.randint(0, 9)}:\n    break')
+    return '\n'.join(lines)
+
+
+def build_room(n, rng):
+    codes = {}
+    for i in range(n):
+        roll = rng.random()
+        base = rng.choice(BASE_SOLUTIONS)
+        if roll < 0.15:
+            code = base
+        elif roll < 0.30:
+            code = _rename(base, rng)
+        elif roll < 0.40:
+            code = base + f'\nprint("done {rng.randint(0, 99)}")\n'
+        else:
+            code = _original(rng)
+        codes[f'student{i:03d}'] = code
+    return codes
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(42)
+    codes = build_room(n, rng)
+
+    index = SimilarityIndex()
+    sig_times, update_times = [], []
+    for sid, code in codes.items():
+        t0 = time.perf_counter()
+        sig = signature(code)
+        t1 = time.perf_counter()
+        index.update(sid, sig)
+        t2 = time.perf_counter()
+        sig_times.append(t1 - t0)
+        update_times.append(t2 - t1)
+
+    # A second round of edits: re-index everyone (incremental update cost)
+    t0 = time.perf_counter()
+    for sid, code in codes.items():
+        index.update(sid, signature(code + '\n# edited\n'))
+    reindex = time.perf_counter() - t0
+
+    query_times = []
+    for sid in list(codes)[:100]:
+        t0 = time.perf_counter()
+        index.similar_to(sid)
+        query_times.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    clusters = index.clusters()
+    cluster_time = time.perf_counter() - t0
+
+    # Exhaustive pairwise Jaccard for comparison
+    t0 = time.perf_counter()
+    sets = {sid: shingles(code) for sid, code in codes.items()}
+    sids = [sid for sid in sets if sid in index.signatures]
+    exact_pairs = set()
+    for i, a in enumerate(sids):
+        for b in sids[i + 1:]:
+            union = len(sets[a] | sets[b])
+            if union and len(sets[a] & sets[b]) / union >= SIMILARITY_THRESHOLD:
+                exact_pairs.add((a, b))
+    brute_time = time.perf_counter() - t0
+
+    lsh_pairs = set()
+    for sid in sids:
+        for other, _ in index.similar_to(sid):
+            lsh_pairs.add(tuple(sorted((sid, other))))
+    recall = len(exact_pairs & lsh_pairs) / len(exact_pairs) if exact_pairs else 1.0
+
+    print(f'Students:                 {n} ({len(index.signatures)} indexed)')
+    print(f'Signature per change:     median {_ms(statistics.median(sig_times))} ms, '
+          f'max {_ms(max(sig_times))} ms')
+    print(f'Index update:             median {_ms(statistics.median(update_times))} ms')
+    print(f'Re-index whole room:      {_ms(reindex)} ms')
+    print(f'similar_to():             median {_ms(statistics.median(query_times))} ms, '
+          f'max {_ms(max(query_times))} ms')
+    print(f'clusters():               {_ms(cluster_time)} ms, {len(clusters)} clusters, '
+          f'largest {max((len(c["students"]) for c in clusters), default=0)}')
+    print(f'Pairwise Jaccard scan:    {_ms(brute_time)} ms ({len(exact_pairs)} pairs >= {SIMILARITY_THRESHOLD})')
+    print(f'LSH recall vs pairwise:   {recall:.3f} ({len(lsh_pairs)} pairs found)')
+
+
+if __name__ == '__main__':
+    main()
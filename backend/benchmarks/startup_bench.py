@@ -0,0 +1,127 @@
+"""
+Startup Benchmark
+
+Starts the server a few times and measures, from process spawn:
+
+- import:  `python -c "import app.main"` on its own (module import cost)
+- live:    first 200 from GET /health/live
+- ready:   first 200 from GET /health/ready
+- socket:  first completed Socket.IO handshake over WebSocket
+- settled: optional backends (Docker, fork server) finished initializing
+
+By default DOCKER_HOST points at a non-routable address, the worst case for
+a host without a reachable daemon: only `settled` should pay the Docker
+timeout, while `ready` stays at a few hundred milliseconds.
+
+Usage (from backend/):
+    python -m benchmarks.startup_bench [runs]
+"""
+
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+import simple_websocket
+
+from benchmarks.shard_bench import _free_port_block
+
+POLL_INTERVAL = 0.005
+STARTUP_TIMEOUT = 60
+BLACKHOLE_DOCKER_HOST = 'tcp://10.255.255.1:2375'
+
+
+def _status(url):
+    try:
+        with urllib.request.urlopen(url, timeout=0.5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except Exception:
+        return None, None
+
+
+def _socket_ok(port):
+    try:
+        ws = simple_websocket.Client.connect(
+            f'ws://127.0.0.1:{port}/socket.io/?EIO=4&transport=websocket')
+    except Exception:
+        return False
+    try:
+        ws.receive(timeout=1)      # engine.io open
+        ws.send('40')              # socket.io connect
+        return (ws.receive(timeout=1) or '').startswith('40')
+    finally:
+        ws.close()
+
+
+def time_import(env):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import app.main'], env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+    return (time.perf_counter() - started) * 1000
+
+
+def time_startup(env):
+    """Milliseconds from spawn to live / ready / socket / settled."""
+    port = _free_port_block(0)
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:socket_app',
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base = f'http://127.0.0.1:{port}'
+    marks = {}
+    try:
+        while len(marks) < 4:
+            elapsed = (time.perf_counter() - started) * 1000
+            if elapsed > STARTUP_TIMEOUT * 1000:
+                raise RuntimeError(f'server not settled after {STARTUP_TIMEOUT}s: {marks}')
+            if 'live' not in marks:
+                if _status(base + '/health/live')[0] == 200:
+                    marks['live'] = elapsed
+            else:
+                status, body = _status(base + '/health/ready')
+                if status == 200 and 'ready' not in marks:
+                    marks['ready'] = elapsed
+                if 'socket' not in marks and _socket_ok(port):
+                    marks['socket'] = (time.perf_counter() - started) * 1000
+                if body and body.get('backendsSettled') and 'settled' not in marks:
+                    marks['settled'] = elapsed
+                    marks['backends'] = body['backends']
+            time.sleep(POLL_INTERVAL)
+    finally:
+        proc.terminate()
+        proc.wait(10)
+    return marks
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    env = dict(os.environ)
+    env.setdefault('DOCKER_HOST', BLACKHOLE_DOCKER_HOST)
+    print(f'{runs} runs, DOCKER_HOST={env["DOCKER_HOST"]}, '
+          f'EXECUTION_FORKSERVER={env.get("EXECUTION_FORKSERVER", "0")}')
+
+    imports = [time_import(env) for _ in range(runs)]
+    results = [time_startup(env) for _ in range(runs)]
+
+    def row(label, values):
+        print(f'  {label:<8} median {statistics.median(values):8.1f} ms   '
+              f'min {min(values):8.1f} ms   max {max(values):8.1f} ms')
+
+    row('import', imports)
+    for key in ('live', 'ready', 'socket', 'settled'):
+        row(key, [r[key] for r in results])
+    for name, entry in results[-1]['backends'].items():
+        detail = f" ({entry['error']})" if entry.get('error') else ''
+        init = f" in {entry['initMs']:.0f} ms" if 'initMs' in entry else ''
+        print(f'  backend {name}: {entry["status"]}{init}{detail}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""
+Stdin Throughput Benchmark (buffered stdin channels)
+
+Starts a server and pipes N MB of input into running programs through
+code_input the way the client sends a paste: raw pieces of PASTE_CHARS,
+each acked and retried after a short wait while the input buffer is full or
+the event is rate limited, then code_eof. Reports throughput and checks
+what the program read (byte count and MD5), for a Python program reading
+everything at once, one reading line by line, and a Node program.
+
+A second socket sends a cheap callback event every PROBE_INTERVAL while the
+paste runs, to show the event loop stays responsive. Last, input sent right
+after run_code (before the process exists) must reach the program.
+
+Usage (from backend/):
+    python -m benchmarks.stdin_bench [megabytes]
+"""
+
+import sys
+import time
+import hashlib
+import threading
+import statistics
+
+from benchmarks.shard_bench import SioClient
+from benchmarks.visibility_bench import start_server
+
+PASTE_CHARS = 128 * 1024
+PROBE_INTERVAL = 0.05
+RETRY_SECONDS = 0.01
+
+PROGRAMS = {
+    'python, read()': ('python', (
+        'import sys, hashlib\n'
+        'data = sys.stdin.buffer.read()\n'
+        'print(len(data), hashlib.md5(data).hexdigest())\n')),
+    'python, by line': ('python', (
+        'import sys, hashlib\n'
+        'digest, size = hashlib.md5(), 0\n'
+        'for line in sys.stdin.buffer:\n'
+        '    digest.update(line)\n'
+        '    size += len(line)\n'
+        'print(size, digest.hexdigest())\n')),
+    'javascript': ('javascript', (
+        "const digest = require('crypto').createHash('md5');\n"
+        'let size = 0;\n'
+        "process.stdin.on('data', (d) => { size += d.length; digest.update(d); });\n"
+        "process.stdin.on('end', () => console.log(size, digest.digest('hex')));\n")),
+}
+
+
+def payload(megabytes):
+    lines, size, i = [], 0, 0
+    while size < megabytes * 1024 * 1024:
+        line = f'{i:08d} the quick brown fox jumps over the lazy dog\n'
+        lines.append(line)
+        size += len(line)
+        i += 1
+    return ''.join(lines)
+
+
+class Runner:
+    """One socket running programs and collecting their output."""
+
+    def __init__(self, port):
+        self.output = []
+        self.done = threading.Event()
+        self.client = SioClient(port, 'stdin-bench', self._on_event)
+
+    def _on_event(self, event, data):
+        if event == 'code_output' and not data['isError']:
+            self.output.append(data['text'])
+        elif event == 'code_done':
+            self.done.set()
+
+    def start(self, code, language):
+        self.output.clear()
+        self.done.clear()
+        self.client.emit('run_code', {'code': code, 'language': language, 'timeout': 120})
+
+    def paste(self, text):
+        """Send text as acked raw pieces, then EOF. Returns retries needed."""
+        retries = 0
+        for start in range(0, len(text), PASTE_CHARS):
+            piece = {'text': text[start:start + PASTE_CHARS], 'raw': True}
+            while True:
+                result = self.client.call('code_input', piece, 30)
+                if 'error' not in result:
+                    break
+                if result['error'] not in ('Input buffer full', 'rate_limited'):
+                    raise RuntimeError(result['error'])
+                retries += 1
+                time.sleep(result.get('retryAfter', RETRY_SECONDS))
+        self.client.call('code_eof', {})
+        return retries
+
+    def result(self, timeout=180):
+        self.done.wait(timeout)
+        return ''.join(self.output)
+
+
+def probe(port, stop, samples):
+    client = SioClient(port, 'stdin-bench-probe')
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.call('get_output_range', {'id': 'probe', 'offset': 0, 'length': 1})
+        samples.append((time.perf_counter() - started) * 1000)
+        time.sleep(PROBE_INTERVAL)
+    client.close()
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    text = payload(megabytes)
+    data = text.encode()
+    expected = f'{len(data)} {hashlib.md5(data).hexdigest()}'
+    proc, port = start_server()
+    try:
+        runner = Runner(port)
+        print(f'Piping {len(data) / 1e6:.1f} MB of stdin ({PASTE_CHARS // 1024} KB pieces)')
+        for label, (language, code) in PROGRAMS.items():
+            stop, samples = threading.Event(), []
+            prober = threading.Thread(target=probe, args=(port, stop, samples))
+            prober.start()
+            started = time.perf_counter()
+            runner.start(code, language)
+            retries = runner.paste(text)
+            sent = time.perf_counter() - started
+            output = runner.result().strip()
+            elapsed = time.perf_counter() - started
+            stop.set()
+            prober.join()
+            samples.sort()
+            print(f'  {label:<16} sent in {sent:5.2f}s, read in {elapsed:5.2f}s '
+                  f'({len(data) / 1e6 / elapsed:6.1f} MB/s, {retries} retries)  '
+                  f'intact: {output == expected}  '
+                  f'loop probe p50 {statistics.median(samples):.1f} ms, max {samples[-1]:.1f} ms')
+
+        time.sleep(1)  # run_code is rate limited (1/s after a burst of 3)
+        runner.start('print(input())\nprint(input())\n', 'python')
+        runner.client.emit('code_input', {'text': 'first'})
+        runner.client.emit('code_input', {'text': 'second'})
+        arrived = runner.result(30) == 'first\nsecond\n'
+        print(f'  input sent before the process started arrived: {arrived}')
+        runner.client.close()
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+if __name__ == '__main__':
+    main()
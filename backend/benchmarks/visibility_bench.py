@@ -0,0 +1,106 @@
+"""
+Teacher Bandwidth Benchmark (visibility subscriptions)
+
+Starts a server, joins a teacher and N students, has every student type
+(one edit per student every TYPING_INTERVAL seconds) and counts the
+payload bytes the teacher receives:
+
+- legacy:  teacher never sends set_visibility (everything in full)
+- summary: teacher has no student open, everyone on summary
+
+Usage (from backend/):
+    python -m benchmarks.visibility_bench [students...]
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+import urllib.request
+
+from benchmarks.shard_bench import SioClient, _free_port_block
+
+TYPING_SECONDS = 5
+TYPING_INTERVAL = 0.1
+CODE_LINES = 40
+
+
+def start_server(env=None):
+    """Start app.main:socket_app on a free port (extra env vars in env)."""
+    port = _free_port_block(0)
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'app.main:socket_app',
+         '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        env=dict(os.environ, **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/health/ready', timeout=1):
+                return proc, port
+        except Exception:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError('server did not become ready')
+
+
+def run(port, room, students, subscribe):
+    received = {'bytes': 0, 'messages': 0}
+    lock = threading.Lock()
+
+    def on_teacher_event(event, data):
+        with lock:
+            received['bytes'] += len(json.dumps([event, data]))
+            received['messages'] += 1
+
+    teacher = SioClient(port, room, on_teacher_event)
+    teacher.emit('join_room', {'roomId': room, 'userName': 'Teacher'})
+    time.sleep(0.3)
+    clients = []
+    for i in range(students):
+        client = SioClient(port, room)
+        client.emit('join_room', {'roomId': room, 'userName': f'student{i}'})
+        clients.append(client)
+    time.sleep(1)
+    if subscribe:
+        # Dashboard with no student open: everyone on summary
+        teacher.emit('set_visibility', {'roomId': room, 'full': [], 'default': 'summary'})
+        time.sleep(0.3)
+
+    with lock:
+        received.update(bytes=0, messages=0)
+    body = '\n'.join(f'value_{n} = {n} * 2' for n in range(CODE_LINES))
+    deadline = time.perf_counter() + TYPING_SECONDS
+    n = 0
+    while time.perf_counter() < deadline:
+        n += 1
+        for i, client in enumerate(clients):
+            client.emit('code_change', {'roomId': room, 'code': f'# {i} edit {n}\n{body}'})
+        time.sleep(TYPING_INTERVAL)
+    time.sleep(1)
+    for client in clients + [teacher]:
+        client.close()
+    return received
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 30, 60]
+    proc, port = start_server({'RATE_LIMITS': 'code_change=100:100'})
+    try:
+        print(f'{TYPING_SECONDS}s of typing, one edit per student every {TYPING_INTERVAL}s')
+        for students in sizes:
+            legacy = run(port, f'legacy-{students}', students, subscribe=False)
+            summary = run(port, f'summary-{students}', students, subscribe=True)
+            ratio = legacy['bytes'] / max(summary['bytes'], 1)
+            print(f'  {students:4d} students: legacy {legacy["bytes"] / 1024:8.1f} KiB '
+                  f'({legacy["messages"]} msgs)   summary {summary["bytes"] / 1024:7.1f} KiB '
+                  f'({summary["messages"]} msgs)   {ratio:5.1f}x less')
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,9 +10,10 @@
  * @param {boolean} props.readOnly - Whether editor is read-only
  * @param {number} props.fontSize - Font size in pixels
  * @param {boolean} props.showMinimap - Show minimap
+ * @param {Array} props.diagnostics - Server analysis results [{line, column, message, severity}], shown as markers
  * @param {string} props.className - Additional wrapper classes
  */
-import React, { useRef } from 'react';
+import React, { useRef, useEffect } from 'react';
 import Editor from '@monaco-editor/react';
 import { cn } from '@/utils/cn';
 
@@ -174,6 +175,30 @@ const JS_SNIPPETS = [
     { label: 'template', insertText: '`${${1:expression}}`', detail: 'Template literal', doc: 'String with embedded expression.' },
 ];
 
+/**
+ * Show server diagnostics as editor markers (squiggles from the reported
+ * column to the end of the line)
+ */
+function applyDiagnostics(monaco, editor, diagnostics) {
+    const model = editor.getModel();
+    if (!model) return;
+    const lineCount = model.getLineCount();
+    const markers = (diagnostics || []).map((d) => {
+        const line = Math.min(Math.max(1, d.line || 1), lineCount);
+        return {
+            startLineNumber: line,
+            endLineNumber: line,
+            startColumn: Math.max(1, d.column || 1),
+            endColumn: model.getLineMaxColumn(line),
+            message: d.message,
+            severity: d.severity === 'error'
+                ? monaco.MarkerSeverity.Error
+                : monaco.MarkerSeverity.Warning,
+        };
+    });
+    monaco.editor.setModelMarkers(model, 'analysis', markers);
+}
+
 /**
  * Register language-specific autocomplete suggestions
  */
@@ -295,9 +320,18 @@ const CodeEditor = ({
     readOnly = false,
     fontSize = 14,
     showMinimap = true,
+    diagnostics = null,
     className,
 }) => {
     const providersRegistered = useRef(false);
+    const editorRef = useRef(null);
+    const monacoRef = useRef(null);
+
+    useEffect(() => {
+        if (editorRef.current && monacoRef.current) {
+            applyDiagnostics(monacoRef.current, editorRef.current, diagnostics);
+        }
+    }, [diagnostics]);
 
     /**
      * Called when editor is mounted
@@ -345,6 +379,10 @@ const CodeEditor = ({
             registerCompletionProviders(monaco);
             providersRegistered.current = true;
         }
+
+        editorRef.current = editor;
+        monacoRef.current = monaco;
+        applyDiagnostics(monaco, editor, diagnostics);
     };
 
     return (
@@ -22,11 +22,11 @@ const StudentDashboard = ({ onBackToRoleSelect }) => {
   const {
     code, language, sharedCode, sharedLabel, sharedOutput, sharedError,
     isSharedMinimized, setCode, setLanguage, toggleSharedMinimized,
-    isControlledByTeacher,
+    isControlledByTeacher, diagnostics,
   } = useStudentStore();
 
   const { isConnected } = useSocketStore();
-  const { runCode, output, error, isRunning, clearOutput, sendInput, stopExecution } = useCodeExecution();
+  const { runCode, output, outputInfo, error, isRunning, clearOutput, sendInput, pasteInput, sendEof, stopExecution } = useCodeExecution();
 
   useEffect(() => {
     if (isConnected && code) sendCodeChange(code);
@@ -166,6 +166,7 @@ const StudentDashboard = ({ onBackToRoleSelect }) => {
               fontSize={fontSize}
               showMinimap={false}
               readOnly={isControlledByTeacher}
+              diagnostics={diagnostics}
             />
           </div>
 
@@ -180,8 +181,8 @@ const StudentDashboard = ({ onBackToRoleSelect }) => {
 
           <div style={{ height: `${terminalHeight}px` }} className="shrink-0">
             <OutputPanel
-              output={output} error={error} isRunning={isRunning}
-              onClear={clearOutput} onSendInput={sendInput} onStop={stopExecution}
+              output={output} outputInfo={outputInfo} error={error} isRunning={isRunning}
+              onClear={clearOutput} onSendInput={sendInput} onPasteInput={pasteInput} onSendEof={sendEof} onStop={stopExecution}
               className="h-full"
             />
           </div>
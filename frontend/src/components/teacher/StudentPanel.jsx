@@ -2,7 +2,7 @@
  * StudentPanel Component
  */
 
-import React, { useState, useMemo } from "react";
+import React, { useState, useMemo, useEffect } from "react";
 import { motion, AnimatePresence } from "framer-motion";
 import {
   X,
@@ -24,12 +24,18 @@ const StudentPanel = ({
   onEditCode,
   onPromoteStudent,
   promotedStudentId,
+  onPreviewChange,
 }) => {
   const [searchQuery, setSearchQuery] = useState("");
   const [sortBy, setSortBy] = useState("name");
   const [expandedId, setExpandedId] = useState(null);
   const [previewStudentId, setPreviewStudentId] = useState(null);
 
+  // Let the dashboard know which student is open (it subscribes to their code)
+  useEffect(() => {
+    onPreviewChange?.(previewStudentId);
+  }, [previewStudentId, onPreviewChange]);
+
   // Derive live student data from the students prop so it stays reactive
   const previewStudent = useMemo(
     () => students.find((s) => s.id === previewStudentId) || null,
@@ -56,6 +62,7 @@ const StudentPanel = ({
   }, [students, searchQuery, sortBy]);
 
   const onlineCount = students.filter((s) => s.isOnline).length;
+  const withErrorsCount = students.filter((s) => s.errorCount > 0).length;
 
   return (
     <>
@@ -92,6 +99,14 @@ const StudentPanel = ({
                 <span className="px-2 py-0.5 rounded-full bg-accent-blue/20 text-accent-blue text-xs font-medium">
                   {onlineCount}/{students.length}
                 </span>
+                {withErrorsCount > 0 && (
+                  <span
+                    className="px-2 py-0.5 rounded-full bg-red-500/20 text-red-400 text-xs font-medium"
+                    title="Students whose code currently has syntax errors"
+                  >
+                    {withErrorsCount} with errors
+                  </span>
+                )}
               </div>
               <button
                 onClick={onClose}
@@ -165,6 +180,16 @@ const StudentPanel = ({
                           }`}>
                           {student.name}
                         </span>
+                        {/* Live syntax state of the code being typed */}
+                        {student.errorCount > 0 ? (
+                          <span className="px-1.5 py-0.5 rounded bg-red-500/20 text-red-400 text-[10px] font-medium">
+                            {student.errorCount} {student.errorCount === 1 ? 'error' : 'errors'}
+                          </span>
+                        ) : student.warningCount > 0 && (
+                          <span className="px-1.5 py-0.5 rounded bg-amber-500/20 text-amber-400 text-[10px] font-medium">
+                            {student.warningCount} {student.warningCount === 1 ? 'warning' : 'warnings'}
+                          </span>
+                        )}
                       </div>
                       <ChevronDown
                         className={`w-4 h-4 transition-transform ${isExpanded ? "rotate-180" : ""
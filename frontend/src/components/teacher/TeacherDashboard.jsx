@@ -7,6 +7,7 @@ import React, { useCallback, useEffect, useState, useRef } from "react";
 import useEditorStore from "@/store/editorStore";
 import useTeacherStore from "@/store/teacherStore";
 import useSocketStore from "@/store/socketStore";
+import useSessionStore from "@/store/sessionStore";
 import socketService from "@/services/socketService";
 import { useCodeExecution } from "@/hooks/useCodeExecution";
 import { useKeyboardShortcuts } from "@/hooks/useKeyboardShortcuts";
@@ -36,7 +37,9 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
   } = useTeacherStore();
 
   const { isConnected } = useSocketStore();
+  const { sessionId } = useSessionStore();
   const [isTeacherVisible, setIsTeacherVisible] = useState(true);
+  const [previewStudentId, setPreviewStudentId] = useState(null);
 
   // Send code to students when they join
   useEffect(() => {
@@ -45,6 +48,16 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
     }
   }, [isConnected, students.length]);
 
+  // Only students on screen get full code updates; the rest send summaries
+  const selectedStudentId = selectedStudent?.id;
+  useEffect(() => {
+    if (!isConnected || !sessionId) return;
+    const full = [...new Set(
+      [selectedStudentId, previewStudentId, controlledStudentId, promotedStudentId].filter(Boolean)
+    )];
+    socketService.emit('set_visibility', { roomId: sessionId, full, default: 'summary' });
+  }, [isConnected, sessionId, selectedStudentId, previewStudentId, controlledStudentId, promotedStudentId]);
+
   // ── Horizontal split ──
   const [splitRatio, setSplitRatio] = useState(50);
   const containerRef = useRef(null);
@@ -123,18 +136,13 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
     };
   }, [handleMouseMove, handleMouseUp, handleTerminalDrag, handleStudentTerminalDrag]);
 
-  const { runCode, output, error, isRunning, clearOutput, sendInput, stopExecution } = useCodeExecution();
+  const { runCode, output, outputInfo, error, isRunning, clearOutput, sendInput, pasteInput, sendEof, stopExecution } = useCodeExecution();
 
   const handleRunCode = useCallback(() => {
     runCode(code, language);
   }, [code, language, runCode]);
 
-  // Broadcast teacher output
-  useEffect(() => {
-    if (isConnected && (output || error)) {
-      socketService.emit('teacher_output', { output, error });
-    }
-  }, [output, error, isConnected]);
+  // Teacher output reaches students straight from the server's run (teacher_output_chunk)
 
   const handleTeacherCodeChange = useCallback((newCode) => {
     setCode(newCode);
@@ -163,6 +171,7 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
       const student = students.find(s => s.id === studentId);
       if (student) {
         socketService.emit('share_student_code', {
+          studentId,
           code: student.code || '',
           label: `Shared: ${student.name}`
         });
@@ -225,8 +234,8 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
 
               <div style={{ height: `${terminalHeight}px` }} className="shrink-0">
                 <OutputPanel
-                  output={output} error={error} isRunning={isRunning}
-                  onClear={clearOutput} onSendInput={sendInput} onStop={stopExecution}
+                  output={output} outputInfo={outputInfo} error={error} isRunning={isRunning}
+                  onClear={clearOutput} onSendInput={sendInput} onPasteInput={pasteInput} onSendEof={sendEof} onStop={stopExecution}
                   className="h-full"
                 />
               </div>
@@ -331,6 +340,7 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
               <div style={{ height: `${studentTerminalHeight}px` }} className="shrink-0">
                 <OutputPanel
                   output={selectedStudent.output}
+                  outputInfo={selectedStudent.outputInfo}
                   error={selectedStudent.error}
                   isRunning={false}
                   onClear={() => { }}
@@ -350,6 +360,7 @@ const TeacherDashboard = ({ onBackToRoleSelect }) => {
         onEditCode={selectStudent}
         onPromoteStudent={handlePromoteStudent}
         promotedStudentId={promotedStudentId}
+        onPreviewChange={setPreviewStudentId}
       />
     </div>
   );
@@ -1,28 +1,59 @@
 /**
  * OutputPanel — Terminal output with interactive input
+ * Large outputs the server spilled to disk (outputInfo) can be paged through.
+ * Multi-line pastes go to the program as-is; Ctrl-D ends its input.
  */
 import React, { useRef, useEffect, useState } from 'react';
-import { Trash2, Terminal as TerminalIcon, Loader2, CornerDownLeft, Square } from 'lucide-react';
+import { Trash2, Terminal as TerminalIcon, Loader2, CornerDownLeft, Square, ChevronLeft, ChevronRight } from 'lucide-react';
 import { cn } from '@/utils/cn';
+import { fetchOutputRange } from '@/services/codeExecutor';
+
+/** Bytes fetched per page of a spilled output */
+const PAGE_BYTES = 64 * 1024;
+
+const formatBytes = (n) => (n >= 1024 * 1024 ? `${(n / 1024 / 1024).toFixed(1)} MB` : `${Math.round(n / 1024)} KB`);
 
 const OutputPanel = ({
     output = '',
+    outputInfo = null,
     error = null,
     isRunning = false,
     onClear,
     onSendInput,
+    onPasteInput,
+    onSendEof,
     onStop,
     className,
 }) => {
     const outputRef = useRef(null);
     const inputRef = useRef(null);
     const [inputValue, setInputValue] = useState('');
+    // Page of a spilled output being viewed ({offset, end, text}); null shows head + tail
+    const [page, setPage] = useState(null);
+    const [pageError, setPageError] = useState(null);
+
+    useEffect(() => {
+        setPage(null);
+        setPageError(null);
+    }, [outputInfo?.id]);
 
     useEffect(() => {
-        if (outputRef.current) {
+        if (outputRef.current && !page) {
             outputRef.current.scrollTop = outputRef.current.scrollHeight;
         }
-    }, [output, error]);
+    }, [output, error, page]);
+
+    const loadPage = (offset) => {
+        fetchOutputRange(outputInfo.id, Math.max(0, offset), PAGE_BYTES)
+            .then((range) => {
+                setPage(range);
+                setPageError(null);
+                if (outputRef.current) outputRef.current.scrollTop = 0;
+            })
+            .catch((e) => setPageError(e.message));
+    };
+
+    const shownOutput = page ? page.text : output;
 
     useEffect(() => {
         if (isRunning && inputRef.current) inputRef.current.focus();
@@ -39,6 +70,22 @@ const OutputPanel = ({
         if (e.key === 'Enter') {
             e.preventDefault();
             handleSubmitInput();
+        } else if (e.ctrlKey && e.key === 'd' && onSendEof) {
+            // Like a terminal: a partly typed line is sent without a newline first
+            e.preventDefault();
+            if (inputValue && onPasteInput) onPasteInput(inputValue);
+            setInputValue('');
+            onSendEof();
+        }
+    };
+
+    const handlePaste = (e) => {
+        const text = e.clipboardData.getData('text');
+        // A single-line input box would drop the newlines; send the lines instead
+        if (onPasteInput && text.includes('\n')) {
+            e.preventDefault();
+            onPasteInput(inputValue + text);
+            setInputValue('');
         }
     };
 
@@ -77,6 +124,42 @@ const OutputPanel = ({
                 </div>
             </div>
 
+            {/* Paging bar for outputs spilled on the server */}
+            {outputInfo && !isRunning && (
+                <div className="flex items-center justify-between px-3 h-7 shrink-0 border-b border-white/[0.04] text-[10px] text-neutral-500">
+                    <span>
+                        {page
+                            ? `${formatBytes(page.offset)} – ${formatBytes(page.end)} of ${formatBytes(outputInfo.size)}`
+                            : `Large output (${formatBytes(outputInfo.size)}), showing start and end`}
+                        {pageError && <span className="text-red-400/70 ml-2">{pageError}</span>}
+                    </span>
+                    <div className="flex items-center gap-1">
+                        <button
+                            onClick={() => loadPage(page ? page.offset - PAGE_BYTES : outputInfo.tailStart - PAGE_BYTES)}
+                            disabled={page?.offset === 0}
+                            className="p-0.5 rounded hover:text-neutral-300 hover:bg-white/[0.04] disabled:opacity-30"
+                        >
+                            <ChevronLeft className="w-3 h-3" />
+                        </button>
+                        <button
+                            onClick={() => loadPage(page ? page.end : outputInfo.head)}
+                            disabled={page?.end >= outputInfo.size}
+                            className="p-0.5 rounded hover:text-neutral-300 hover:bg-white/[0.04] disabled:opacity-30"
+                        >
+                            <ChevronRight className="w-3 h-3" />
+                        </button>
+                        {page && (
+                            <button
+                                onClick={() => setPage(null)}
+                                className="px-1.5 py-0.5 rounded hover:text-neutral-300 hover:bg-white/[0.04]"
+                            >
+                                Start &amp; end
+                            </button>
+                        )}
+                    </div>
+                </div>
+            )}
+
             {/* Output */}
             <div
                 ref={outputRef}
@@ -88,8 +171,8 @@ const OutputPanel = ({
                     </div>
                 )}
 
-                {output && (
-                    <pre className="text-neutral-300 whitespace-pre-wrap break-words">{output}</pre>
+                {shownOutput && (
+                    <pre className="text-neutral-300 whitespace-pre-wrap break-words">{shownOutput}</pre>
                 )}
 
                 {error && (
@@ -118,7 +201,8 @@ const OutputPanel = ({
                         value={inputValue}
                         onChange={(e) => setInputValue(e.target.value)}
                         onKeyDown={handleKeyDown}
-                        placeholder="stdin..."
+                        onPaste={handlePaste}
+                        placeholder={onSendEof ? 'stdin... (Ctrl-D: end of input)' : 'stdin...'}
                         className="flex-1 bg-transparent text-[12px] text-white font-mono placeholder:text-neutral-700 focus:outline-none"
                         autoComplete="off"
                         spellCheck="false"
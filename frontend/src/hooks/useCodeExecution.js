@@ -3,16 +3,23 @@
  * Wraps the code executor service with React state management.
  * Supports interactive input/output streaming.
  *
- * @returns {{ runCode, output, error, isRunning, clearOutput, sendInput, stopExecution }}
+ * @returns {{ runCode, output, outputInfo, error, isRunning, clearOutput, sendInput, pasteInput, sendEof, stopExecution }}
  */
 import { useState, useCallback, useRef } from 'react';
-import { executeCodeInteractive, sendCodeInput, stopCodeExecution } from '@/services/codeExecutor';
+import { executeCodeInteractive, sendCodeInput, pasteCodeInput, sendCodeEof, stopCodeExecution } from '@/services/codeExecutor';
+
+/** Pastes longer than this are echoed as a size note instead of their text */
+const PASTE_ECHO_CHARS = 4096;
 
 export function useCodeExecution() {
     const [output, setOutput] = useState('');
+    // Set when the server spilled a large output to disk (see OutputPanel paging)
+    const [outputInfo, setOutputInfo] = useState(null);
     const [error, setError] = useState(null);
     const [isRunning, setIsRunning] = useState(false);
     const cleanupRef = useRef(null);
+    // Pending pastes; later pastes and EOF wait so input stays in order
+    const inputChainRef = useRef(Promise.resolve());
 
     /**
      * Execute code interactively with streaming output
@@ -27,6 +34,7 @@ export function useCodeExecution() {
 
         setIsRunning(true);
         setOutput('');
+        setOutputInfo(null);
         setError(null);
 
         const cleanup = executeCodeInteractive(code, language, {
@@ -41,6 +49,11 @@ export function useCodeExecution() {
             onDone: (result) => {
                 setIsRunning(false);
                 cleanupRef.current = null;
+                if (result.outputInfo) {
+                    // Streaming stopped at the spill threshold; show head + tail
+                    setOutput(result.output);
+                    setOutputInfo(result.outputInfo);
+                }
                 if (result.error) {
                     setError(result.error);
                 }
@@ -62,6 +75,30 @@ export function useCodeExecution() {
         }
     }, [isRunning]);
 
+    /**
+     * Send pasted (possibly multi-line, possibly large) input as-is
+     * @param {string} text - Pasted text
+     */
+    const pasteInput = useCallback((text) => {
+        if (!isRunning) return;
+        inputChainRef.current = inputChainRef.current
+            .then(() => pasteCodeInput(text))
+            .catch((e) => setError(`Input not sent: ${e.message}`));
+        setOutput((prev) => prev + (text.length > PASTE_ECHO_CHARS
+            ? `[pasted ${(text.length / 1024).toFixed(0)} KB of input]\n`
+            : text));
+    }, [isRunning]);
+
+    /**
+     * End the program's input (Ctrl-D): reads then see end of file
+     */
+    const sendEof = useCallback(() => {
+        if (isRunning) {
+            inputChainRef.current = inputChainRef.current.then(sendCodeEof);
+            setOutput((prev) => prev + '^D\n');
+        }
+    }, [isRunning]);
+
     /**
      * Stop the running execution
      */
@@ -77,8 +114,9 @@ export function useCodeExecution() {
     /** Clear the output console */
     const clearOutput = useCallback(() => {
         setOutput('');
+        setOutputInfo(null);
         setError(null);
     }, []);
 
-    return { runCode, output, error, isRunning, clearOutput, sendInput, stopExecution };
+    return { runCode, output, outputInfo, error, isRunning, clearOutput, sendInput, pasteInput, sendEof, stopExecution };
 }
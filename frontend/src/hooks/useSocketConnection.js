@@ -1,7 +1,8 @@
 /**
  * useSocketConnection Hook
  * Manages Socket.IO connection lifecycle and integrates with stores.
- * Handles auto-rejoin on reconnect/refresh, timer sync, and room closure.
+ * Handles auto-rejoin on reconnect/refresh, timer sync, room closure and
+ * admission control notices (join rejected, rate limited, server overloaded).
  */
 import { useEffect, useRef } from 'react';
 import socketService from '@/services/socketService';
@@ -10,13 +11,13 @@ import useSessionStore from '@/store/sessionStore';
 import useStudentStore from '@/store/studentStore';
 
 export const useSocketConnection = () => {
-    const { setConnected, resetReconnect, incrementReconnect } = useSocketStore();
+    const { setConnected, resetReconnect, incrementReconnect, setServerLoad } = useSocketStore();
     const { sessionId, role, userName, isActive, rejoinSession, endSession, receiveTimerSync } = useSessionStore();
     const hasRejoined = useRef(false);
 
     useEffect(() => {
-        // Initialize socket connection
-        const socket = socketService.connect();
+        // Initialize socket connection (routed by room when the backend is sharded)
+        const socket = socketService.connect(sessionId);
 
         // Connection event handlers
         socket.on('connect', () => {
@@ -56,6 +57,14 @@ export const useSocketConnection = () => {
         // Handle role assignment from backend
         socket.on('role_assigned', (data) => {
             console.log('[SOCKET] Role assigned from backend:', data.role);
+            if (data.sessionToken) {
+                useSessionStore.getState().setSessionToken(data.sessionToken);
+            }
+        });
+
+        // Reconnected into the same session — missed events are replayed after this
+        socket.on('session_resumed', (data) => {
+            console.log('[SOCKET] Session resumed, replaying', data.missed, 'missed events');
         });
 
         // Handle code restoration (for students rejoining)
@@ -67,10 +76,10 @@ export const useSocketConnection = () => {
             }
         });
 
-        // ───── Timer sync from server (students receive host time) ─────
+        // ───── Timer state from server (sent on start/pause/resume/expiry) ─────
         socket.on('timer_sync', (data) => {
             console.log('[SOCKET] Timer sync received:', data.timeRemaining);
-            receiveTimerSync(data.timeRemaining);
+            receiveTimerSync(data);
         });
 
         // ───── Room closed by host ─────
@@ -81,6 +90,22 @@ export const useSocketConnection = () => {
             endSession();
         });
 
+        // ───── Admission control ─────
+        socket.on('join_rejected', (data) => {
+            console.warn('[SOCKET] Join rejected:', data.reason);
+            alert(data.reason || 'The server could not admit you to this session.');
+            endSession();
+        });
+
+        socket.on('rate_limited', (data) => {
+            console.warn(`[SOCKET] Rate limited: ${data.event} (retry in ${data.retryAfter}s)`);
+        });
+
+        socket.on('server_load', (data) => {
+            console.log('[SOCKET] Server load:', data);
+            setServerLoad(data.overloaded, data.reason);
+        });
+
         // Cleanup on unmount
         return () => {
             console.log('[SOCKET] Cleaning up connection');
@@ -90,12 +115,16 @@ export const useSocketConnection = () => {
             socket.off('reconnect_attempt');
             socket.off('reconnect');
             socket.off('role_assigned');
+            socket.off('session_resumed');
             socket.off('restore_code');
             socket.off('timer_sync');
             socket.off('room_closed');
+            socket.off('join_rejected');
+            socket.off('rate_limited');
+            socket.off('server_load');
             socketService.disconnect();
         };
-    }, [setConnected, resetReconnect, incrementReconnect, sessionId, role, userName, isActive, rejoinSession, endSession, receiveTimerSync]);
+    }, [setConnected, resetReconnect, incrementReconnect, sessionId, role, userName, isActive, rejoinSession, endSession, receiveTimerSync, setServerLoad]);
 
     return socketService;
 };
@@ -6,6 +6,7 @@ import { useEffect } from 'react';
 import socketService from '@/services/socketService';
 import useStudentStore from '@/store/studentStore';
 import useSessionStore from '@/store/sessionStore';
+import useEditorStore from '@/store/editorStore';
 
 export const useStudentSocket = () => {
     const { setCode, setSharedCode, setControlled } = useStudentStore();
@@ -31,7 +32,8 @@ export const useStudentSocket = () => {
             if (sessionId) {
                 socketService.emit('code_change', {
                     roomId: sessionId,
-                    code: code
+                    code: code,
+                    language: useEditorStore.getState().language
                 });
             }
         };
@@ -68,12 +70,24 @@ export const useStudentSocket = () => {
             setSharedOutput(data.output || '', data.error || null);
         };
 
+        // Live chunks of the teacher's run, relayed by the server as they are produced
+        const handleTeacherOutputChunk = (data) => {
+            const { appendSharedOutput } = useStudentStore.getState();
+            appendSharedOutput(data.text || '');
+        };
+
         // Listen for teacher editing student's code directly
         const handleTeacherEditCode = (data) => {
             console.log('[STUDENT] Teacher edited my code');
             setCode(data.code);
         };
 
+        // Server analysis of the code we last sent (syntax errors, lint warnings)
+        const handleCodeDiagnostics = (data) => {
+            const { setDiagnostics } = useStudentStore.getState();
+            setDiagnostics(data.diagnostics || []);
+        };
+
         // Listen for unshare — revert back to teacher's code
         const handleUnshareCode = () => {
             console.log('[STUDENT] Unshare received — reverting to teacher code');
@@ -87,8 +101,10 @@ export const useStudentSocket = () => {
         socket.on('shared_code', handleSharedCode);
         socket.on('teacher_code_change', handleTeacherCodeChange);
         socket.on('teacher_output', handleTeacherOutput);
+        socket.on('teacher_output_chunk', handleTeacherOutputChunk);
         socket.on('teacher_edit_code', handleTeacherEditCode);
         socket.on('unshare_code', handleUnshareCode);
+        socket.on('code_diagnostics', handleCodeDiagnostics);
 
         // Cleanup
         return () => {
@@ -97,8 +113,10 @@ export const useStudentSocket = () => {
             socket.off('shared_code', handleSharedCode);
             socket.off('teacher_code_change', handleTeacherCodeChange);
             socket.off('teacher_output', handleTeacherOutput);
+            socket.off('teacher_output_chunk', handleTeacherOutputChunk);
             socket.off('teacher_edit_code', handleTeacherEditCode);
             socket.off('unshare_code', handleUnshareCode);
+            socket.off('code_diagnostics', handleCodeDiagnostics);
         };
     }, [role, sessionId, userName, setCode, setSharedCode, setControlled]);
 
@@ -107,7 +125,8 @@ export const useStudentSocket = () => {
             if (role === 'participant' && sessionId) {
                 socketService.emit('code_change', {
                     roomId: sessionId,
-                    code: code
+                    code: code,
+                    language: useEditorStore.getState().language
                 });
             }
         }
@@ -1,6 +1,8 @@
 /**
  * useTeacherSocket Hook
- * Handles Socket.IO events specific to teacher role
+ * Handles Socket.IO events specific to teacher role.
+ * Full code only arrives for students the dashboard has on screen (see
+ * set_visibility in TeacherDashboard); the rest get student_summary.
  */
 import { useEffect } from 'react';
 import socketService from '@/services/socketService';
@@ -8,7 +10,7 @@ import useTeacherStore from '@/store/teacherStore';
 import useSessionStore from '@/store/sessionStore';
 
 export const useTeacherSocket = () => {
-    const { setStudents, updateStudent, updateStudentCode, updateStudentOutput, removeStudent } = useTeacherStore();
+    const { setStudents, updateStudent, updateStudentCode, updateStudentOutput, removeStudent, renameStudent } = useTeacherStore();
     const { role } = useSessionStore();
 
     useEffect(() => {
@@ -29,11 +31,17 @@ export const useTeacherSocket = () => {
             console.log('[TEACHER] Students object:', data.students);
             console.log('[TEACHER] Students entries:', Object.entries(data.students || {}));
 
-            // Convert backend student format to frontend format
+            // Convert backend student format to frontend format. Students not
+            // on screen come without code — keep whatever we already have.
+            const known = new Map(useTeacherStore.getState().students.map((s) => [s.id, s]));
             const students = Object.entries(data.students || {}).map(([id, student]) => ({
                 id,
                 name: student.name || 'Anonymous',
-                code: student.code || '',
+                code: student.code ?? known.get(id)?.code ?? '',
+                lines: student.lines,
+                lastEdit: student.lastEdit,
+                errorCount: student.errorCount || 0,
+                warningCount: student.warningCount || 0,
                 output: student.output || '',
                 error: student.error || null,
                 outputPreview: student.output ? student.output.substring(0, 50) + '...' : 'No output yet',
@@ -53,10 +61,39 @@ export const useTeacherSocket = () => {
             updateStudentCode(data.studentId, data.code);
         };
 
+        // Summary for a student that is not on screen (no code)
+        const handleStudentSummary = (data) => {
+            updateStudent(data.studentId, {
+                lines: data.lines,
+                lastEdit: data.lastEdit,
+                errorCount: data.errorCount,
+                warningCount: data.warningCount,
+            });
+        };
+
+        // A student's syntax error / warning counts changed
+        const handleStudentDiagnostics = (data) => {
+            updateStudent(data.studentId, {
+                errorCount: data.errorCount,
+                warningCount: data.warningCount,
+            });
+        };
+
         // Handle output updates from students
         const handleStudentOutput = (data) => {
             console.log('[TEACHER] Output from student:', data.studentId, data);
-            updateStudentOutput(data.studentId, data.output || '', data.error || null);
+            updateStudentOutput(data.studentId, data.output || '', data.error || null, data.outputInfo || null);
+        };
+
+        // Student resumed their session on a new socket id
+        const handleStudentReconnected = (data) => {
+            console.log('[TEACHER] Student reconnected:', data.oldId, '->', data.newId);
+            renameStudent(data.oldId, data.newId);
+        };
+
+        // Student connection dropped (kept for a short resume window)
+        const handleStudentStatus = (data) => {
+            updateStudent(data.studentId, { isOnline: data.connected });
         };
 
         // Handle role assignment
@@ -68,8 +105,12 @@ export const useTeacherSocket = () => {
         console.log('[TEACHER_SOCKET] Registering event listeners...');
         socket.on('student_list_update', handleStudentListUpdate);
         socket.on('code_update', handleCodeUpdate);
+        socket.on('student_summary', handleStudentSummary);
         socket.on('student_output', handleStudentOutput);
+        socket.on('student_diagnostics', handleStudentDiagnostics);
         socket.on('role_assigned', handleRoleAssigned);
+        socket.on('student_reconnected', handleStudentReconnected);
+        socket.on('student_status', handleStudentStatus);
         console.log('[TEACHER_SOCKET] Event listeners registered successfully');
 
         // Cleanup
@@ -77,8 +118,12 @@ export const useTeacherSocket = () => {
             console.log('[TEACHER_SOCKET] Cleaning up event listeners');
             socket.off('student_list_update', handleStudentListUpdate);
             socket.off('code_update', handleCodeUpdate);
+            socket.off('student_summary', handleStudentSummary);
             socket.off('student_output', handleStudentOutput);
+            socket.off('student_diagnostics', handleStudentDiagnostics);
             socket.off('role_assigned', handleRoleAssigned);
+            socket.off('student_reconnected', handleStudentReconnected);
+            socket.off('student_status', handleStudentStatus);
         };
-    }, [role, setStudents, updateStudent, updateStudentCode, updateStudentOutput, removeStudent]);
+    }, [role, setStudents, updateStudent, updateStudentCode, updateStudentOutput, removeStudent, renameStudent]);
 };
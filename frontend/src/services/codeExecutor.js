@@ -9,6 +9,12 @@ import socketService from './socketService';
 /** Maximum execution time in milliseconds */
 const EXECUTION_TIMEOUT = 30000;
 
+/** Characters per code_input message when pasting (well under the server's 1 MB message limit) */
+const PASTE_CHUNK_CHARS = 128 * 1024;
+
+/** Wait before resending a paste piece the server refused (input buffer full) */
+const PASTE_RETRY_MS = 50;
+
 /**
  * Execute code interactively on the backend server via Socket.IO.
  * Output is streamed line-by-line via onOutput callback.
@@ -61,7 +67,10 @@ export function executeCodeInteractive(code, language, { onOutput, onDone }) {
             onDone({
                 output: data.output || '',
                 error: data.error || null,
-                exit_code: data.exit_code || 0
+                exit_code: data.exit_code || 0,
+                telemetry: data.telemetry || null,
+                outputInfo: data.outputInfo || null,
+                errorInfo: data.errorInfo || null
             });
         }
     };
@@ -97,6 +106,44 @@ export function sendCodeInput(text) {
     }
 }
 
+/**
+ * Send a pasted blob to a running process as-is, in pieces. Each piece waits
+ * for the server's ack and is resent after a short wait while the program's
+ * input buffer is full or the event is rate limited, so large pastes never
+ * flood the server.
+ * @param {string} text - Pasted text (sent without an added newline)
+ * @returns {Promise<void>}
+ */
+export async function pasteCodeInput(text) {
+    const socket = socketService.socket;
+    const sendPiece = (piece) => new Promise((resolve) => {
+        socket.emit('code_input', { text: piece, raw: true }, resolve);
+    });
+    for (let start = 0; start < text.length; start += PASTE_CHUNK_CHARS) {
+        const piece = text.slice(start, start + PASTE_CHUNK_CHARS);
+        for (;;) {
+            if (!socket || !socket.connected) throw new Error('Not connected to server');
+            const response = await sendPiece(piece);
+            if (!response?.error) break;
+            if (response.error !== 'Input buffer full' && response.error !== 'rate_limited') {
+                throw new Error(response.error);
+            }
+            const waitMs = response.retryAfter ? response.retryAfter * 1000 : PASTE_RETRY_MS;
+            await new Promise((resolve) => setTimeout(resolve, waitMs));
+        }
+    }
+}
+
+/**
+ * Close the running process's stdin (Ctrl-D) once pending input is written.
+ */
+export function sendCodeEof() {
+    const socket = socketService.socket;
+    if (socket && socket.connected) {
+        socket.emit('code_eof', {});
+    }
+}
+
 /**
  * Stop a running code execution.
  */
@@ -106,3 +153,28 @@ export function stopCodeExecution() {
         socket.emit('stop_code', {});
     }
 }
+
+/**
+ * Fetch a byte range of a run output the server spilled to disk
+ * (outputInfo.id from code_done, student_output or teacher_output).
+ * @param {string} id - Spilled output id
+ * @param {number} offset - Byte offset
+ * @param {number} length - Number of bytes
+ * @returns {Promise<{offset: number, end: number, size: number, text: string}>}
+ */
+export function fetchOutputRange(id, offset, length) {
+    const socket = socketService.socket;
+    return new Promise((resolve, reject) => {
+        if (!socket || !socket.connected) {
+            reject(new Error('Not connected to server'));
+            return;
+        }
+        socket.emit('get_output_range', { id, offset, length }, (response) => {
+            if (!response || response.error) {
+                reject(new Error(response?.error || 'No response'));
+            } else {
+                resolve(response);
+            }
+        });
+    });
+}
@@ -13,24 +13,42 @@ class SocketService {
         this.socket = null;
         /** Connection state */
         this.connected = false;
+        /** Highest server event sequence number seen (for replay after reconnect) */
+        this.lastSeq = 0;
+        /** Room the current connection was opened for (routing key) */
+        this.roomId = null;
+        /** Called with lastSeq whenever it advances (persisted with the session token) */
+        this.seqListener = null;
 
         console.log('[WS] Socket service initialized');
     }
 
     /**
      * Connect to the backend server
+     * @param {string} [roomId] - Room this connection is for. Sent in the query
+     *   string so a sharded backend routes it to the room's worker.
      */
-    connect() {
-        if (this.socket?.connected) {
+    connect(roomId = null) {
+        if (this.socket?.connected && this.roomId === roomId) {
             console.log('[WS] Already connected');
             return this.socket;
         }
+        if (this.socket) {
+            this.socket.disconnect();
+        }
 
+        if (this.roomId !== null && roomId !== this.roomId) {
+            // Sequence numbers are counted per room on the server; on the
+            // first connect after a refresh the persisted value is kept
+            this.setLastSeq(0);
+        }
+        this.roomId = roomId;
         this.socket = io(BACKEND_URL, {
             transports: ['websocket', 'polling'],
             reconnection: true,
             reconnectionDelay: 1000,
             reconnectionAttempts: 5,
+            query: roomId ? { roomId } : {},
         });
 
         this.socket.on('connect', () => {
@@ -47,9 +65,34 @@ class SocketService {
             console.error('[WS] Connection error:', error);
         });
 
+        // Track sequenced events so a resumed session only replays what we missed
+        this.socket.onAny((event, data) => {
+            if (data && typeof data._seq === 'number' && data._seq > this.lastSeq) {
+                this.setLastSeq(data._seq);
+            }
+        });
+
         return this.socket;
     }
 
+    /**
+     * Set the highest sequence number seen (0 when starting a new session)
+     * @param {number} seq - Sequence number
+     */
+    setLastSeq(seq) {
+        this.lastSeq = seq;
+        if (this.seqListener) this.seqListener(seq);
+    }
+
+    /**
+     * Register the callback notified when lastSeq changes
+     * @param {Function} listener - Called with the new lastSeq
+     */
+    onSeq(listener) {
+        this.seqListener = listener;
+        return this;
+    }
+
     /**
      * Register an event listener
      * @param {string} event - Event name
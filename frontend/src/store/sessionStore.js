@@ -3,9 +3,10 @@
  * Manages session state: session ID, role (host/participant),
  * 1-hour countdown timer, and participant list
  * 
- * Timer sync: The teacher is the source of truth for the timer.
- * Every 10 seconds the teacher broadcasts its time to the backend,
- * which relays it to all students so everyone stays in sync.
+ * Timer sync: The server is the source of truth for the timer.
+ * The host starts it once (start_timer); the server stores an absolute
+ * deadline and only sends timer_sync when the timer state changes.
+ * Every client counts down locally from that deadline.
  * 
  * Uses localStorage persistence so sessions survive page refresh.
  */
@@ -30,8 +31,6 @@ const generateSessionId = () => {
 /** Session duration: 1 hour in seconds */
 const SESSION_DURATION = 60 * 60;
 
-/** How often the teacher syncs its timer to students (ms) */
-const TIMER_SYNC_INTERVAL = 10_000;
 
 const useSessionStore = create(
     devtools(
@@ -42,10 +41,15 @@ const useSessionStore = create(
                 role: null,
                 timeRemaining: SESSION_DURATION,
                 _timerId: null,
-                _syncTimerId: null,
+                _timerDeadline: null,
+                _timerRunning: true,
                 isActive: false,
                 hostName: '',
                 userName: '',
+                /** Server-issued token used to resume after a reconnect (students) */
+                sessionToken: null,
+                /** Highest event sequence number seen in this session (sent with sessionToken) */
+                lastSeq: 0,
 
                 // ---- Actions ----
 
@@ -53,6 +57,7 @@ const useSessionStore = create(
                 createSession: (hostName) => {
                     const sessionId = generateSessionId();
                     console.log('[SESSION] createSession called - hostName:', hostName);
+                    socketService.setLastSeq(0);
 
                     set({
                         sessionId,
@@ -61,6 +66,8 @@ const useSessionStore = create(
                         userName: hostName || 'Host',
                         isActive: true,
                         timeRemaining: SESSION_DURATION,
+                        _timerDeadline: Date.now() + SESSION_DURATION * 1000,
+                        _timerRunning: true,
                     }, false, 'createSession');
 
                     // Start the countdown timer
@@ -75,6 +82,7 @@ const useSessionStore = create(
                             };
                             console.log('[SESSION] Socket connected, emitting join_room with payload:', payload);
                             socketService.emit('join_room', payload);
+                            socketService.emit('start_timer', { duration: SESSION_DURATION });
                         } else {
                             console.log('[SESSION] Socket not connected yet, waiting...');
                             setTimeout(waitForSocketAndEmit, 100);
@@ -90,13 +98,17 @@ const useSessionStore = create(
                 /** Join an existing session (user becomes participant) */
                 joinSession: (sessionId, userName) => {
                     console.log('[SESSION] joinSession called - sessionId:', sessionId, 'userName:', userName);
+                    socketService.setLastSeq(0);
 
                     set({
                         sessionId,
                         role: 'participant',
                         userName: userName || 'Student',
+                        sessionToken: null,
                         isActive: true,
                         timeRemaining: SESSION_DURATION,
+                        _timerDeadline: Date.now() + SESSION_DURATION * 1000,
+                        _timerRunning: true,
                     }, false, 'joinSession');
 
                     // Start the countdown timer (will be overridden by server sync)
@@ -124,12 +136,16 @@ const useSessionStore = create(
 
                 /** Rejoin the current session after page refresh */
                 rejoinSession: () => {
-                    const { sessionId, role, userName, isActive } = get();
+                    const { sessionId, role, userName, isActive, sessionToken, lastSeq } = get();
                     if (!sessionId || !role || !isActive) return;
 
                     console.log('[SESSION] Rejoining session:', sessionId, 'as', role);
 
-                    // Restart the timer
+                    // Restart the timer from the persisted remaining time
+                    set({
+                        _timerDeadline: Date.now() + get().timeRemaining * 1000,
+                        _timerRunning: true,
+                    }, false, 'rejoinSession');
                     get()._startTimer();
 
                     // Wait for socket to be connected before emitting
@@ -139,8 +155,18 @@ const useSessionStore = create(
                                 roomId: sessionId,
                                 userName: userName || (role === 'host' ? 'Host' : 'Student')
                             };
+                            if (sessionToken) {
+                                // Resume the previous session and replay missed events
+                                payload.sessionToken = sessionToken;
+                                // After a page refresh only the persisted value is known
+                                payload.lastSeq = Math.max(socketService.lastSeq, lastSeq);
+                            }
                             console.log('[SESSION] Rejoining room with payload:', payload);
                             socketService.emit('join_room', payload);
+                            if (role === 'host') {
+                                // Host rejoin recreates the room, so restart its timer
+                                socketService.emit('start_timer', { duration: get().timeRemaining });
+                            }
                         } else {
                             console.log('[SESSION] Socket not connected yet, waiting for rejoin...');
                             setTimeout(waitForSocketAndEmit, 100);
@@ -152,9 +178,8 @@ const useSessionStore = create(
 
                 /** Leave / end the current session */
                 endSession: () => {
-                    const { _timerId, _syncTimerId } = get();
+                    const { _timerId } = get();
                     if (_timerId) clearInterval(_timerId);
-                    if (_syncTimerId) clearInterval(_syncTimerId);
 
                     // Notify the backend that we're explicitly leaving
                     if (socketService.isConnected()) {
@@ -167,59 +192,62 @@ const useSessionStore = create(
                         isActive: false,
                         timeRemaining: SESSION_DURATION,
                         _timerId: null,
-                        _syncTimerId: null,
+                        _timerDeadline: null,
+                        _timerRunning: true,
                         hostName: '',
                         userName: '',
+                        sessionToken: null,
                     }, false, 'endSession');
 
                     socketService.disconnect();
+                    socketService.setLastSeq(0);
                     console.log('[SESSION] Session ended');
                 },
 
-                /** Receive timer sync from server (students only) */
-                receiveTimerSync: (serverTimeRemaining) => {
-                    const { role } = get();
-                    if (role !== 'participant') return; // Only students sync from server
-                    console.log('[TIMER_SYNC] Received server time:', serverTimeRemaining);
-                    set({ timeRemaining: serverTimeRemaining }, false, 'timerSync');
+                /** Store the resume token issued by the server */
+                setSessionToken: (sessionToken) => set({ sessionToken }, false, 'setSessionToken'),
+
+                /** Receive timer state from server (sent only when it changes) */
+                receiveTimerSync: (data) => {
+                    console.log('[TIMER_SYNC] Received server timer:', data);
+                    if (data.running && data.deadline) {
+                        // Convert the server deadline to a local one, independent of clock skew
+                        const localDeadline = Date.now() + (data.deadline - data.serverTime) * 1000;
+                        set({
+                            _timerDeadline: localDeadline,
+                            _timerRunning: true,
+                            timeRemaining: data.timeRemaining,
+                        }, false, 'timerSync');
+                    } else {
+                        set({
+                            _timerDeadline: null,
+                            _timerRunning: false,
+                            timeRemaining: data.timeRemaining,
+                        }, false, 'timerSync');
+                    }
                 },
 
-                /** Internal: start the 1-second countdown timer */
+                /** Internal: start the 1-second countdown timer (computed from the deadline) */
                 _startTimer: () => {
-                    const { _timerId, _syncTimerId } = get();
+                    const { _timerId } = get();
                     if (_timerId) clearInterval(_timerId);
-                    if (_syncTimerId) clearInterval(_syncTimerId);
 
-                    // Countdown every second
                     const timerId = setInterval(() => {
-                        const { timeRemaining } = get();
-                        if (timeRemaining <= 0) {
+                        const { _timerDeadline, _timerRunning, timeRemaining } = get();
+                        if (!_timerRunning || !_timerDeadline) return;
+                        const remaining = Math.max(0, Math.ceil((_timerDeadline - Date.now()) / 1000));
+                        if (remaining <= 0) {
                             clearInterval(timerId);
-                            set({ isActive: false, _timerId: null }, false, 'timerExpired');
+                            set({ timeRemaining: 0, isActive: false, _timerId: null }, false, 'timerExpired');
                             console.log('[SESSION] Session time expired');
                             return;
                         }
-                        set({ timeRemaining: timeRemaining - 1 }, false, 'tick');
+                        if (remaining !== timeRemaining) {
+                            set({ timeRemaining: remaining }, false, 'tick');
+                        }
                     }, 1000);
 
                     set({ _timerId: timerId }, false, '_startTimer');
-
-                    // If this user is the host, broadcast timer to students every 10s
-                    const { role } = get();
-                    if (role === 'host') {
-                        const syncTimerId = setInterval(() => {
-                            const { timeRemaining, isActive } = get();
-                            if (!isActive) {
-                                clearInterval(syncTimerId);
-                                return;
-                            }
-                            if (socketService.isConnected()) {
-                                socketService.emit('sync_timer', { timeRemaining });
-                            }
-                        }, TIMER_SYNC_INTERVAL);
-
-                        set({ _syncTimerId: syncTimerId }, false, '_startTimerSync');
-                    }
                 },
             }),
             {
@@ -232,6 +260,8 @@ const useSessionStore = create(
                     hostName: state.hostName,
                     userName: state.userName,
                     timeRemaining: state.timeRemaining,
+                    sessionToken: state.sessionToken,
+                    lastSeq: state.lastSeq,
                 }),
             }
         ),
@@ -239,4 +269,7 @@ const useSessionStore = create(
     )
 );
 
+// Keep the persisted sequence number in step with the socket
+socketService.onSeq((lastSeq) => useSessionStore.setState({ lastSeq }, false, 'setLastSeq'));
+
 export default useSessionStore;
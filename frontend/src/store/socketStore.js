@@ -17,6 +17,10 @@ const useSocketStore = create(
             lastEvent: 'Disconnected',
             /** Whether we are in mock mode (no real server) */
             isMockMode: false,
+            /** Whether the server is in overload mode (updates are slowed down) */
+            serverOverloaded: false,
+            /** Why the server entered overload mode */
+            serverLoadReason: null,
 
             // ---- Actions ----
 
@@ -35,6 +39,10 @@ const useSocketStore = create(
             /** Set last event message */
             setLastEvent: (lastEvent) =>
                 set({ lastEvent }, false, 'setLastEvent'),
+
+            /** Set overload mode from a server_load event */
+            setServerLoad: (serverOverloaded, serverLoadReason) =>
+                set({ serverOverloaded, serverLoadReason: serverLoadReason || null }, false, 'setServerLoad'),
         }),
         { name: 'SocketStore' }
     )
@@ -27,6 +27,9 @@ const useStudentStore = create(
             // Whether the teacher has locked this student's editor
             isControlledByTeacher: false,
 
+            // Syntax errors / lint warnings for the current code (code_diagnostics)
+            diagnostics: [],
+
             setCode: (code) => set({ code }),
             setLanguage: (language) =>
                 set({
@@ -54,6 +57,10 @@ const useStudentStore = create(
                 set({ sharedOutput: output, sharedError: error });
             },
 
+            // Append a live chunk of the teacher's running program
+            appendSharedOutput: (text) =>
+                set((s) => ({ sharedOutput: s.sharedOutput + text })),
+
             // Revert shared view back to teacher's code
             revertToTeacherCode: () => {
                 const { teacherCode } = get();
@@ -64,6 +71,8 @@ const useStudentStore = create(
                 set((s) => ({ isSharedMinimized: !s.isSharedMinimized })),
 
             setControlled: (val) => set({ isControlledByTeacher: val }),
+
+            setDiagnostics: (diagnostics) => set({ diagnostics }),
         }),
         { name: 'StudentStore' }
     )
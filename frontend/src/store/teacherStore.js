@@ -46,6 +46,22 @@ const useTeacherStore = create(
                 }));
             },
 
+            // A student reconnected and resumed their session under a new socket id
+            renameStudent: (oldId, newId) => {
+                const rename = (id) => (id === oldId ? newId : id);
+                set((s) => ({
+                    students: s.students.map((stu) =>
+                        stu.id === oldId ? { ...stu, id: newId, isOnline: true } : stu
+                    ),
+                    selectedStudent:
+                        s.selectedStudent?.id === oldId
+                            ? { ...s.selectedStudent, id: newId }
+                            : s.selectedStudent,
+                    promotedStudentId: rename(s.promotedStudentId),
+                    controlledStudentId: rename(s.controlledStudentId),
+                }));
+            },
+
             openPanel: () => set({ isPanelOpen: true }),
             closePanel: () => set({ isPanelOpen: false }),
 
@@ -72,16 +88,16 @@ const useTeacherStore = create(
                 }));
             },
 
-            updateStudentOutput: (studentId, output, error) => {
+            updateStudentOutput: (studentId, output, error, outputInfo = null) => {
                 set((s) => ({
                     students: s.students.map((stu) =>
                         stu.id === studentId
-                            ? { ...stu, output, error, outputPreview: output ? output.substring(0, 50) + '...' : 'No output yet' }
+                            ? { ...stu, output, error, outputInfo, outputPreview: output ? output.substring(0, 50) + '...' : 'No output yet' }
                             : stu
                     ),
                     selectedStudent:
                         s.selectedStudent?.id === studentId
-                            ? { ...s.selectedStudent, output, error }
+                            ? { ...s.selectedStudent, output, error, outputInfo }
                             : s.selectedStudent,
                 }));
             },